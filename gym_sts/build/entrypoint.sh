@@ -0,0 +1,27 @@
+#!/bin/bash
+
+# Run the given command (the game) under a virtual X server.
+#
+# STS_PROFILE selects how the game's surroundings are configured:
+#   default: A 24-bit screen, with audio routed to the loopback sound card created by
+#            the host.
+#   lean:    A 16-bit screen, with audio output disabled and a single-threaded GC,
+#            which cuts per-game CPU and memory when frames aren't needed, e.g. with
+#            animate=False. No loopback sound card is needed on the host.
+# XVFB_SCREEN overrides the screen geometry and depth of either profile. The geometry
+# must fit the game window configured in info.displayconfig.
+
+case "$STS_PROFILE" in
+    lean)
+        screen="1024x576x16"
+        # OpenAL mixes into a null device instead of opening ALSA
+        export ALSOFT_DRIVERS=null
+        export JAVA_TOOL_OPTIONS="-XX:+UseSerialGC $JAVA_TOOL_OPTIONS"
+        ;;
+    *)
+        screen="1024x576x24"
+        ;;
+esac
+screen=${XVFB_SCREEN:-$screen}
+
+exec xvfb-run -e /dev/stdout -f /tmp/sts.xauth -s "-screen 0 $screen" "$@"
@@ -1,20 +1,11 @@
 #!/bin/bash
 
-# Pipe CommunicationMod IO to FIFOs provided by the host
+# Pipe CommunicationMod IO to FIFOs (or a socket) provided by the host
 
-INPUT=$1
-OUTPUT=$2
+source "$(dirname "$0")/relay.sh"
 
-function cleanup() {
-    kill $BG_PID
-}
-
-trap cleanup EXIT
-
-cat $INPUT &
-BG_PID=$!
-
-# Sleep to allow time for the background process to start
-sleep 0.2
-
-cat > $OUTPUT
+if [ "$STS_TRANSPORT" = "socket" ]; then
+    relay_socket "$3"
+else
+    relay "$1" "$2"
+fi
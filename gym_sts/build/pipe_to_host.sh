@@ -1,17 +1,12 @@
 #!/bin/bash
-INPUT="out/stsai_input"
-OUTPUT="out/stsai_output"
 
-function cleanup() {
-    kill $BG_PID
-}
+# Pipe CommunicationMod IO to FIFOs (or a socket) in the output volume shared with the
+# host
 
-trap cleanup EXIT
+source /game/relay.sh
 
-cat $INPUT &
-BG_PID=$!
-
-# Sleep to allow time for the background process to start
-sleep 0.2
-
-cat > $OUTPUT
+if [ "$STS_TRANSPORT" = "socket" ]; then
+    relay_socket out/stsai.sock
+else
+    relay out/stsai_input out/stsai_output
+fi
@@ -0,0 +1,100 @@
+#!/bin/bash
+
+# Relay CommunicationMod IO between the game and the host.
+#
+# Usage: relay INPUT OUTPUT
+#        relay_socket SOCKET
+#
+# relay copies IO to and from a pair of FIFOs. relay_socket connects it to a Unix
+# domain socket the host is listening on instead, which requires socat.
+#
+# If STS_SEQUENCED=1, each command written to INPUT must be prefixed with a sequence
+# id, e.g. "12 STATE". The id is stripped before the command is forwarded to the game,
+# and every message the game emits is prefixed with the id of the command it responds
+# to, so the host can discard stale messages by id. CommunicationMod sends exactly one
+# message that's ready for a command in response to each command, so the nth such
+# message is tagged with the id of the nth command forwarded. Other messages keep the
+# previous message's id.
+
+# mawk only reads pipes line by line in interactive mode
+AWK="awk"
+if command -v mawk > /dev/null; then
+    AWK="mawk -W interactive"
+fi
+
+function relay() {
+    local input=$1
+    local output=$2
+
+    if [ "$STS_SEQUENCED" = "1" ]; then
+        # The ids of forwarded commands, in order
+        QUEUE_FILE=$(mktemp)
+
+        $AWK -v queue="$QUEUE_FILE" '{
+            seq = $1
+            print seq >> queue
+            fflush(queue)
+            print substr($0, length(seq) + 2)
+            fflush()
+        }' < "$input" &
+        BG_PID=$!
+
+        # Sleep to allow time for the background process to start
+        sleep 0.2
+
+        $AWK -v queue="$QUEUE_FILE" '
+        function next_seq(    line, i) {
+            if ((getline line < queue) > 0) {
+                taken++
+                return line
+            }
+            # Reading past the end of a file that has since grown is not portable,
+            # so reopen it and skip the ids already taken
+            close(queue)
+            for (i = 0; i < taken; i++)
+                getline line < queue
+            if ((getline line < queue) > 0) {
+                taken++
+                return line
+            }
+            # Not a response to a command
+            return seq
+        }
+        BEGIN { seq = 0; taken = 0 }
+        /"ready_for_command": *true/ { seq = next_seq() }
+        {
+            print seq " " $0
+            fflush()
+        }' > "$output"
+    else
+        cat "$input" &
+        BG_PID=$!
+
+        # Sleep to allow time for the background process to start
+        sleep 0.2
+
+        cat > "$output"
+    fi
+}
+
+function relay_socket() {
+    local sock=$1
+
+    # The host may not be listening yet
+    while [ ! -S "$sock" ]; do
+        sleep 0.05
+    done
+
+    exec socat STDIO UNIX-CONNECT:"$sock"
+}
+
+function cleanup() {
+    if [ -n "$BG_PID" ]; then
+        kill $BG_PID 2> /dev/null
+    fi
+    if [ -n "$QUEUE_FILE" ]; then
+        rm -f "$QUEUE_FILE"
+    fi
+}
+
+trap cleanup EXIT
@@ -0,0 +1,170 @@
+"""Finds the fastest SuperFastMode settings that keep the game stable.
+
+Each candidate plays the same seeded games with the same seeded choice of actions, so
+the runs are comparable. Pushing the game too fast shows up as desyncs (actions whose
+validity didn't match the game's response), waits for the game to settle, or errors.
+The fastest candidate without errors or desyncs, and within the retry budget, is
+written as a JSON profile:
+
+    python -m gym_sts.calibrate lib mods --output profile.json
+
+which the env can then use:
+
+    env = SlayTheSpireGymEnv(lib_dir, mods_dir, headless=True, **load_profile(path))
+"""
+
+import argparse
+import itertools
+import json
+import pathlib
+import random
+import time
+from typing import Optional
+
+from pydantic import BaseModel
+
+from gym_sts.envs.base import SlayTheSpireGymEnv
+from gym_sts.envs.types import SuperFastModeConfig
+
+
+class CalibrationResult(BaseModel):
+    superfastmode: SuperFastModeConfig
+    animate: bool
+    sps: float
+    desyncs: int
+    stability_retries: int
+    observe_retries: int
+    error: Optional[str]
+
+    def is_stable(self, max_retries: int) -> bool:
+        retries = self.stability_retries + self.observe_retries
+        return self.error is None and self.desyncs == 0 and retries <= max_retries
+
+
+def load_profile(path: pathlib.Path) -> dict:
+    """
+    Env kwargs for a profile written by this script.
+    """
+
+    with open(path) as f:
+        profile = json.load(f)
+
+    return {
+        "superfastmode": SuperFastModeConfig(**profile["superfastmode"]),
+        "animate": profile["animate"],
+    }
+
+
+def candidates(
+    multipliers: list[float], animate: list[bool]
+) -> list[tuple[SuperFastModeConfig, bool]]:
+    configs = [SuperFastModeConfig(delta_multiplied=False, instant_lerp=False)]
+    for multiplier, instant_lerp in itertools.product(multipliers, [False, True]):
+        configs.append(
+            SuperFastModeConfig(delta_multiplier=multiplier, instant_lerp=instant_lerp)
+        )
+    return list(itertools.product(configs, animate))
+
+
+def measure(
+    args: argparse.Namespace, superfastmode: SuperFastModeConfig, animate: bool
+) -> CalibrationResult:
+    env = SlayTheSpireGymEnv(
+        args.lib_dir,
+        args.mods_dir,
+        headless=True,
+        animate=animate,
+        superfastmode=superfastmode,
+        profile=args.profile,
+    )
+
+    error = None
+    num_steps = 0
+    run_time = 0.0
+    try:
+        env.reset(seed=args.seed)
+        rng = random.Random(args.seed)
+
+        start_time = time.perf_counter()
+        while num_steps < args.steps:
+            action = rng.choice(env.valid_actions())
+            _, _, done, _, _ = env.step(action._id)
+            if done:
+                env.reset()
+            num_steps += 1
+        run_time = time.perf_counter() - start_time
+    except Exception as e:
+        error = repr(e)
+    finally:
+        env.close()
+
+    return CalibrationResult(
+        superfastmode=superfastmode,
+        animate=animate,
+        sps=num_steps / run_time if run_time > 0 else 0.0,
+        desyncs=env.counters["desyncs"],
+        stability_retries=env.counters["stability_retries"],
+        observe_retries=env.counters["observe_retries"],
+        error=error,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("lib_dir")
+    parser.add_argument("mods_dir")
+    parser.add_argument("--output", default="superfastmode_profile.json")
+    parser.add_argument("--steps", default=500, type=int)
+    parser.add_argument("--seed", default=42, type=int)
+    parser.add_argument(
+        "--multipliers",
+        default=[25.0, 50.0, 100.0, 200.0, 400.0],
+        nargs="+",
+        type=float,
+    )
+    parser.add_argument(
+        "--animate",
+        default=["false"],
+        nargs="+",
+        choices=["true", "false"],
+        help="Rendering settings to try",
+    )
+    parser.add_argument(
+        "--max_retries",
+        default=0,
+        type=int,
+        help="Stability retries tolerated before a candidate is considered unstable",
+    )
+    parser.add_argument("--profile", default=None, help="See build/entrypoint.sh")
+    args = parser.parse_args()
+
+    animate = [a == "true" for a in args.animate]
+
+    results = []
+    for superfastmode, anim in candidates(args.multipliers, animate):
+        result = measure(args, superfastmode, anim)
+        results.append(result)
+        print(result.json())
+
+    stable = [r for r in results if r.is_stable(args.max_retries)]
+    if not stable:
+        print("No stable candidates")
+        return
+
+    best = max(stable, key=lambda r: r.sps)
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "superfastmode": best.superfastmode.dict(),
+                "animate": best.animate,
+                "results": [r.dict() for r in results],
+            },
+            f,
+            indent=2,
+        )
+    print(f"Best: {best.json()}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
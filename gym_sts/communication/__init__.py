@@ -1 +1,8 @@
 from gym_sts.communication.communicator import Communicator  # noqa: F401
+from gym_sts.communication.timeouts import AdaptiveTimeouts, TimeoutPolicy  # noqa: F401
+from gym_sts.communication.transports import (  # noqa: F401
+    FifoTransport,
+    SocketTransport,
+    Transport,
+)
+from gym_sts.communication.watchdog import Watchdog  # noqa: F401
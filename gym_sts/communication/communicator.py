@@ -1,80 +1,129 @@
-import os
 import time
-from pathlib import Path
+from typing import Optional
 
 from gym_sts.communication.receiver import Receiver
 from gym_sts.communication.sender import Sender
+from gym_sts.communication.timeouts import AdaptiveTimeouts
+from gym_sts.communication.transports import Transport
+from gym_sts.communication.watchdog import Watchdog
 from gym_sts.spaces.observations import Observation
 
 
-def init_fifos(filenames):
-    # Create fifos for communication
-    for f in filenames:
-        if os.path.exists(f):
-            os.remove(f)
-        os.mkfifo(f)
+class Communicator:
+    def __init__(
+        self,
+        transport: Transport,
+        decoder: str = "json",
+        sequenced: bool = False,
+        watchdog: Optional[Watchdog] = None,
+        timeouts: Optional[AdaptiveTimeouts] = None,
+    ):
+        """
+        Blocks until the game's relay script has connected to the transport.
+
+        Args:
+            transport: How messages are exchanged with the relay, e.g. fifos or a
+                Unix domain socket.
+            decoder: See gym_sts.communication.decoding.make_decoder().
+            sequenced: If True, commands and responses are tagged with sequence ids by
+                the relay script (which must be run with STS_SEQUENCED=1), so stale
+                responses are discarded by id instead of by draining the fifo before
+                each command. The relay pairs responses with commands in order, which
+                relies on the game answering every command exactly once.
+            watchdog: See Receiver.
+            timeouts: If provided, the latency of each type of command is recorded, and
+                the receiver's timeout is replaced by a deadline derived from them.
+        """
 
+        self.transport = transport
+        self.sequenced = sequenced
+        self.timeouts = timeouts
 
-class Communicator:
-    def __init__(self, input_path: Path, output_path: Path):
-        self.input_path = input_path
-        self.output_path = output_path
-        init_fifos([self.input_path, self.output_path])
-        self.receiver = Receiver(self.output_path)
-        self.sender = Sender(self.input_path)
+        reader, writer = self.transport.connect()
+        self.receiver = Receiver(
+            reader, decoder=decoder, sequenced=sequenced, watchdog=watchdog
+        )
+        self.sender = Sender(writer, sequenced=sequenced)
+
+    def _discard_stale(self) -> None:
+        # Sequenced responses are filtered by id when they're received instead
+        if not self.sequenced:
+            self.receiver.empty_fifo()
+
+    def send(self, command: str) -> int:
+        """
+        Send a command without waiting for the response.
+
+        Returns the command's sequence id, which can be passed to receive(). When
+        sequenced, several commands can be sent back to back and only the response to
+        the last one awaited, since receive() skips responses to earlier commands.
+        """
+
+        self._discard_stale()
+        return self.sender._send_message(command)
+
+    def receive(self, seq: int = 0) -> Observation:
+        """
+        Wait for the response to the command with the given sequence id (or a later
+        one).
+        """
+
+        return Observation(self._receive_state(seq))
+
+    def _receive_state(self, seq: int) -> dict:
+        command_type = self.sender.last_command
+        if self.timeouts is None or command_type is None:
+            return self.receiver.receive_game_state(seq=seq)
+
+        timeout = self.timeouts.timeout(command_type, self.receiver.timeout)
+        state = self.receiver.receive_game_state(seq=seq, timeout=timeout)
+        self.timeouts.record(command_type, time.monotonic() - self.sender.last_sent_at)
+        return state
 
     def _manual_command(self, action: str) -> Observation:
-        self.receiver.empty_fifo()
-        self.sender._send_message(action)
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        seq = self.send(action)
+        return self.receive(seq)
 
     def ready(self) -> None:
         self.sender.send_ready()
 
     def choose(self, choice) -> Observation:
-        self.receiver.empty_fifo()
-        self.sender.send_choose(choice)
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        self._discard_stale()
+        seq = self.sender.send_choose(choice)
+        return self.receive(seq)
 
     def click(self, x: int, y: int, left: bool = True) -> Observation:
-        self.receiver.empty_fifo()
-        self.sender.send_click(x, y, left=left)
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        self._discard_stale()
+        seq = self.sender.send_click(x, y, left=left)
+        return self.receive(seq)
 
     def end(self) -> Observation:
-        self.receiver.empty_fifo()
-        self.sender.send_end()
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        self._discard_stale()
+        seq = self.sender.send_end()
+        return self.receive(seq)
 
     def potion(self, action, slot, target) -> Observation:
-        self.receiver.empty_fifo()
-        self.sender.send_potion(action, slot, target)
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        self._discard_stale()
+        seq = self.sender.send_potion(action, slot, target)
+        return self.receive(seq)
 
     def proceed(self) -> Observation:
-        self.receiver.empty_fifo()
-        self.sender.send_proceed()
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        self._discard_stale()
+        seq = self.sender.send_proceed()
+        return self.receive(seq)
 
     def resign(self) -> Observation:
-        self.receiver.empty_fifo()
-        self.sender.send_resign()
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        self._discard_stale()
+        seq = self.sender.send_resign()
+        return self.receive(seq)
 
     def start(self, player_class: str, ascension: int, seed: str) -> Observation:
-        self.receiver.empty_fifo()
-        self.sender.send_start(player_class, ascension, seed)
+        self._discard_stale()
+        seq = self.sender.send_start(player_class, ascension, seed)
 
         tries = 3
         for _ in range(tries):
-            state = self.receiver.receive_game_state()
+            state = self._receive_state(seq)
             if state["in_game"]:
                 return Observation(state)
 
@@ -88,16 +137,14 @@ class Communicator:
         not the game is "stable." This method is valid in all game states.
         """
 
-        self.receiver.empty_fifo()
-        self.sender.send_state()
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        self._discard_stale()
+        seq = self.sender.send_state()
+        return self.receive(seq)
 
     def wait(self, frames: int) -> Observation:
-        self.receiver.empty_fifo()
-        self.sender.send_wait(frames)
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        self._discard_stale()
+        seq = self.sender.send_wait(frames)
+        return self.receive(seq)
 
     def basemod(self, command: str) -> Observation:
         """
@@ -108,10 +155,9 @@ class Communicator:
         CommunicationMod does not wait for before sending the next state.
         """
 
-        self.receiver.empty_fifo()
-        self.sender.send_basemod(command)
-        state = self.receiver.receive_game_state()
-        return Observation(state)
+        self._discard_stale()
+        seq = self.sender.send_basemod(command)
+        return self.receive(seq)
 
     def render(self, render: bool) -> None:
         """
@@ -121,3 +167,8 @@ class Communicator:
         """
 
         self.sender.send_render(render)
+
+    def close(self) -> None:
+        self.sender.fh.close()
+        self.receiver.fh.close()
+        self.transport.close()
@@ -0,0 +1,55 @@
+import json
+import logging
+from typing import Any, Callable, Union
+
+
+logger = logging.getLogger(__name__)
+
+Decoder = Callable[[Union[str, bytes]], Any]
+
+
+class SchemaDecoder:
+    """
+    Decodes messages directly into the typed structs defined in schema.py.
+
+    Messages that don't match the schema (e.g. because CommunicationMod sent a field
+    with an unexpected type) fall back to plain dicts, so the env keeps working when
+    the schema is incomplete.
+    """
+
+    def __init__(self):
+        try:
+            import msgspec
+        except ImportError as e:
+            raise ImportError(
+                "The schema decoder requires msgspec. Install it with the fast "
+                "extra, e.g. `pip install gym-sts[fast]`, or use the json decoder."
+            ) from e
+
+        from gym_sts.communication import schema
+
+        self._error = msgspec.DecodeError
+        self._decoder = msgspec.json.Decoder(schema.Message)
+
+    def __call__(self, message: Union[str, bytes]) -> Any:
+        try:
+            return self._decoder.decode(message)
+        except self._error as e:
+            # Malformed JSON raises json.JSONDecodeError here, like the json decoder
+            logger.debug(f"Message did not match schema ({e}), decoding as dict")
+            return json.loads(message)
+
+
+def make_decoder(name: str) -> Decoder:
+    """
+    Args:
+        name: "json" to decode messages into dicts with the standard library, or
+            "schema" to decode them into typed structs (requires msgspec).
+    """
+
+    if name == "json":
+        return json.loads
+    elif name == "schema":
+        return SchemaDecoder()
+
+    raise ValueError(f"Unrecognized decoder {name}")
@@ -1,22 +1,113 @@
-import fcntl
 import json
 import os
+import re
+import select
 import time
+from typing import Any, Optional
 
 from gym_sts import exceptions
+from gym_sts.communication.decoding import make_decoder
+from gym_sts.communication.watchdog import Watchdog
+
+
+READY_PATTERN = re.compile(rb'"ready_for_command":\s*(true|false)')
+
+
+def peek_ready(message: bytes) -> Optional[bool]:
+    """
+    Cheaply read the ready_for_command flag of a raw message without parsing it.
+
+    Returns None if the flag couldn't be found, in which case the message should be
+    parsed to find out. The key can't appear inside a JSON string since its quotes
+    would be escaped. CommunicationMod happens to write it before the (large) game
+    state, so the search usually ends within the first hundred bytes.
+    """
+
+    match = READY_PATTERN.search(message)
+    if match is None:
+        return None
+    return match.group(1) == b"true"
 
 
 class Receiver:
-    def __init__(self, fn, timeout: float = 50):
-        self.fh = open(fn, "r")
+    def __init__(
+        self,
+        fh: Any,
+        timeout: float = 50,
+        decoder: str = "json",
+        sequenced: bool = False,
+        watchdog: Optional[Watchdog] = None,
+    ):
+        """
+        Args:
+            fh: A non-blocking readable object with a fileno(), e.g. a fifo or socket.
+                See gym_sts.communication.transports.
+            watchdog: If provided, waits are aborted as soon as it decides the game
+                has hung.
+        """
+
+        self.fh = fh
+        self.fd = fh.fileno()
+        self.decode = make_decoder(decoder)
 
-        # Reading the pipe does not block if there are no contents
-        flag = fcntl.fcntl(self.fh, fcntl.F_GETFD)
-        fcntl.fcntl(self.fh, fcntl.F_SETFL, flag | os.O_NONBLOCK)
+        # Bytes read from the pipe that don't form a complete line yet
+        self._buffer = bytearray()
+
+        # If sequenced, each message is prefixed with the sequence id of the command
+        # it responds to. See Sender.
+        self.sequenced = sequenced
+        self.num_stale = 0  # Messages discarded for responding to earlier commands
+
+        # Messages that aren't ready for a command are skipped without being parsed
+        self.num_skipped = 0
+        self.num_parsed = 0
 
         self.timeout = timeout
         self.sleep_time = 0.05
-        self.num_steps = int(timeout / self.sleep_time)
+        self.watchdog = watchdog
+
+    def _read_available(self) -> bool:
+        """
+        Append whatever can be read without blocking to the buffer. Returns False if
+        nothing was available.
+        """
+
+        try:
+            chunk = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return False
+
+        if not chunk:
+            # Nothing written yet, or the writer hung up
+            return False
+
+        self._buffer += chunk
+        return True
+
+    def _readline(self) -> Optional[bytes]:
+        """
+        Returns the next complete line, or None if there isn't one yet.
+        """
+
+        while True:
+            end = self._buffer.find(b"\n")
+            if end >= 0:
+                line = bytes(self._buffer[:end])
+                del self._buffer[: end + 1]
+                return line
+
+            if not self._read_available():
+                return None
+
+    def _wait(self, timeout: float) -> None:
+        """
+        Sleep until there's something to read, for at most `timeout` seconds.
+        """
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable and not self._read_available():
+            # Readable with no data means the writer hung up, so don't spin
+            time.sleep(timeout)
 
     def empty_fifo(self) -> None:
         """
@@ -26,28 +117,70 @@ class Receiver:
         corresponds to the result of the next action sent to the game.
         """
 
-        self.fh.readlines()
+        while self._read_available():
+            pass
+        self._buffer.clear()
 
-    def receive_game_state(self) -> dict:
+    def receive_game_state(self, seq: int = 0, timeout: Optional[float] = None) -> dict:
         """
         Continues reading game state until the game is waiting for action from
         the agent
+
+        Args:
+            seq: If messages are sequenced, messages tagged with a lower sequence id
+                are responses to earlier commands, and are discarded.
+            timeout: Overrides the receiver's timeout for this call.
         """
-        for _ in range(self.num_steps):
-            message = self.fh.readline()
-            if len(message) > 0:
-                try:
-                    state = json.loads(message)
-                    if state["ready_for_command"]:
-                        return state
-                except json.decoder.JSONDecodeError:
-                    print(
-                        "W: Message not in valid JSON, retrying. Contents: " + message
-                    )
 
-            time.sleep(self.sleep_time)
+        if timeout is None:
+            timeout = self.timeout
+
+        started = time.monotonic()
+        deadline = started + timeout
+        if self.watchdog is not None:
+            self.watchdog.start()
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            message = self._readline()
+            if message is None:
+                self._wait(min(self.sleep_time, remaining))
+                if self.watchdog is not None:
+                    self.watchdog.check(time.monotonic() - started)
+                continue
+            if len(message) == 0:
+                continue
+
+            if self.sequenced:
+                msg_seq, _, message = message.partition(b" ")
+                if not msg_seq.isdigit():
+                    print("W: Message has no sequence id, skipping.")
+                    continue
+                if int(msg_seq) < seq:
+                    self.num_stale += 1
+                    continue
+
+            if peek_ready(message) is False:
+                self.num_skipped += 1
+                continue
+
+            try:
+                self.num_parsed += 1
+                state = self.decode(message)
+                if state["ready_for_command"]:
+                    if self.watchdog is not None:
+                        self.watchdog.record(time.monotonic() - started)
+                    return state
+            except json.decoder.JSONDecodeError:
+                print(
+                    "W: Message not in valid JSON, retrying. Contents: "
+                    + message.decode("utf-8", errors="replace")
+                )
 
         raise exceptions.StSTimeoutError(
-            f"Waited {self.timeout} seconds for game state to be ready "
+            f"Waited {timeout} seconds for game state to be ready "
             "for command, but it didn't happen."
         )
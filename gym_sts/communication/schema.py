@@ -0,0 +1,251 @@
+"""
+Typed description of the messages CommunicationMod sends to the env.
+
+Decoding a message into these structs parses and type-checks it in a single pass. The
+structs implement the read-only parts of the dict interface (``[]``, ``in``, ``get()``
+and ``keys()``) so the rest of the library, including the Pydantic components, can
+consume them exactly like the dicts produced by ``json.loads``.
+
+Fields that CommunicationMod only sends in some game states default to ``UNSET`` and
+behave like missing dict keys. Fields that aren't declared here are dropped.
+
+Requires the optional msgspec dependency.
+"""
+
+from __future__ import annotations
+
+import functools
+from typing import Any, Union
+
+import msgspec
+from msgspec import UNSET, UnsetType
+
+
+@functools.lru_cache(maxsize=None)
+def _attribute_names(cls: type[msgspec.Struct]) -> dict[str, str]:
+    """
+    Maps the JSON names of a struct's fields to their attribute names.
+    """
+
+    return dict(zip(cls.__struct_encode_fields__, cls.__struct_fields__))
+
+
+class _Struct(msgspec.Struct, kw_only=True):
+    def _lookup(self, key: object) -> Any:
+        attr = _attribute_names(type(self)).get(key)  # type: ignore[call-overload]
+        if attr is None:
+            return UNSET
+        return getattr(self, attr)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._lookup(key)
+        if value is UNSET:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return self._lookup(key) is not UNSET
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._lookup(key)
+        return default if value is UNSET else value
+
+    def keys(self) -> list[str]:
+        names = _attribute_names(type(self))
+        return [k for k, attr in names.items() if getattr(self, attr) is not UNSET]
+
+
+class Card(_Struct):
+    id: str
+    name: str
+    cost: int
+    upgrades: int
+    has_target: bool
+    exhausts: bool
+    ethereal: bool
+    uuid: Union[str, UnsetType] = UNSET
+    type: Union[str, UnsetType] = UNSET
+    rarity: Union[str, UnsetType] = UNSET
+    misc: Union[int, UnsetType] = UNSET
+    is_playable: Union[bool, UnsetType] = UNSET
+    price: Union[int, UnsetType] = UNSET
+
+
+class Relic(_Struct):
+    id: str
+    name: str
+    counter: Union[int, UnsetType] = UNSET
+    price: Union[int, UnsetType] = UNSET
+
+
+class Potion(_Struct):
+    id: str
+    name: str
+    requires_target: bool
+    can_use: Union[bool, UnsetType] = UNSET
+    can_discard: Union[bool, UnsetType] = UNSET
+    price: Union[int, UnsetType] = UNSET
+
+
+class Keys(_Struct):
+    emerald: bool = False
+    ruby: bool = False
+    sapphire: bool = False
+
+
+class MapCoordinates(_Struct):
+    x: int
+    y: int
+
+
+class MapNode(MapCoordinates):
+    symbol: str
+    children: list[MapCoordinates] = []
+    parents: Union[list[MapCoordinates], UnsetType] = UNSET
+    # Only sent by our CommunicationMod fork
+    is_burning: Union[bool, UnsetType] = UNSET
+
+
+class Power(_Struct):
+    id: str
+    amount: int
+    name: Union[str, UnsetType] = UNSET
+    damage: Union[int, UnsetType] = UNSET
+    misc: Union[int, UnsetType] = UNSET
+    just_applied: Union[bool, UnsetType] = UNSET
+    card: Union[Card, UnsetType] = UNSET
+
+
+class Orb(_Struct):
+    # STS seems to have a bug where empty orbs sometimes have no ID
+    id: Union[str, UnsetType] = UNSET
+    name: Union[str, UnsetType] = UNSET
+    evoke_amount: Union[int, UnsetType] = UNSET
+    passive_amount: Union[int, UnsetType] = UNSET
+
+
+class Monster(_Struct):
+    id: str
+    name: str
+    intent: str
+    current_hp: int
+    max_hp: int
+    block: int
+    powers: list[Power] = []
+    is_gone: Union[bool, UnsetType] = UNSET
+    half_dead: Union[bool, UnsetType] = UNSET
+    move_id: Union[int, UnsetType] = UNSET
+    last_move_id: Union[int, UnsetType] = UNSET
+    second_last_move_id: Union[int, UnsetType] = UNSET
+    # These attributes may not be set if the player has runic dome
+    move_base_damage: Union[int, UnsetType] = UNSET
+    move_adjusted_damage: Union[int, UnsetType] = UNSET
+    move_hits: Union[int, UnsetType] = UNSET
+
+
+class Player(_Struct):
+    current_hp: int
+    max_hp: int
+    block: int
+    energy: int
+    powers: list[Power] = []
+    orbs: list[Orb] = []
+
+
+class CombatState(_Struct):
+    turn: int
+    player: Player
+    monsters: list[Monster] = []
+    hand: list[Card] = []
+    draw_pile: list[Card] = []
+    discard_pile: list[Card] = []
+    exhaust_pile: list[Card] = []
+    limbo: Union[list[Card], UnsetType] = UNSET
+    card_in_play: Union[Card, UnsetType] = UNSET
+    cards_discarded_this_turn: Union[int, UnsetType] = UNSET
+    times_damaged: Union[int, UnsetType] = UNSET
+
+
+class EventOption(_Struct):
+    text: str
+    label: Union[str, UnsetType] = UNSET
+    disabled: Union[bool, UnsetType] = UNSET
+    choice_index: Union[int, UnsetType] = UNSET
+
+
+class Reward(_Struct):
+    reward_type: str
+    gold: Union[int, UnsetType] = UNSET
+    relic: Union[Relic, UnsetType] = UNSET
+    potion: Union[Potion, UnsetType] = UNSET
+    link: Union[Relic, UnsetType] = UNSET
+
+
+class ScreenState(_Struct):
+    """
+    The union of the screen_state variants we consume. Which fields are set depends on
+    the sibling screen_type, e.g. rest_options is only sent for REST screens.
+    """
+
+    # EVENT
+    event_id: Union[str, UnsetType] = UNSET
+    event_name: Union[str, UnsetType] = UNSET
+    body_text: Union[str, UnsetType] = UNSET
+    options: Union[list[EventOption], UnsetType] = UNSET
+
+    # SHOP_SCREEN, CARD_REWARD, GRID and BOSS_REWARD
+    cards: Union[list[Card], UnsetType] = UNSET
+    relics: Union[list[Relic], UnsetType] = UNSET
+    potions: Union[list[Potion], UnsetType] = UNSET
+    purge_available: Union[bool, UnsetType] = UNSET
+    purge_cost: Union[int, UnsetType] = UNSET
+    bowl_available: Union[bool, UnsetType] = UNSET
+    skip_available: Union[bool, UnsetType] = UNSET
+
+    # REST
+    rest_options: Union[list[str], UnsetType] = UNSET
+    has_rested: Union[bool, UnsetType] = UNSET
+
+    # COMBAT_REWARD
+    rewards: Union[list[Reward], UnsetType] = UNSET
+
+    # HAND_SELECT
+    hand: Union[list[Card], UnsetType] = UNSET
+    selected: Union[list[Card], UnsetType] = UNSET
+    max_cards: Union[int, UnsetType] = UNSET
+    can_pick_zero: Union[bool, UnsetType] = UNSET
+
+
+class GameState(_Struct):
+    screen_type: str
+    screen_state: ScreenState = msgspec.field(default_factory=ScreenState)
+    screen_name: Union[str, UnsetType] = UNSET
+    room_phase: Union[str, UnsetType] = UNSET
+    room_type: Union[str, UnsetType] = UNSET
+    action_phase: Union[str, UnsetType] = UNSET
+    floor: Union[int, UnsetType] = UNSET
+    act: Union[int, UnsetType] = UNSET
+    act_boss: Union[str, UnsetType] = UNSET
+    seed: Union[int, UnsetType] = UNSET
+    # Renamed since class is a keyword
+    class_: Union[str, UnsetType] = msgspec.field(default=UNSET, name="class")
+    ascension_level: Union[int, UnsetType] = UNSET
+    current_hp: Union[int, UnsetType] = UNSET
+    max_hp: Union[int, UnsetType] = UNSET
+    gold: Union[int, UnsetType] = UNSET
+    potions: Union[list[Potion], UnsetType] = UNSET
+    relics: Union[list[Relic], UnsetType] = UNSET
+    deck: Union[list[Card], UnsetType] = UNSET
+    # Renamed so it doesn't shadow keys(), which ** unpacking relies on
+    keys_: Union[Keys, UnsetType] = msgspec.field(default=UNSET, name="keys")
+    map: Union[list[MapNode], UnsetType] = UNSET
+    choice_list: Union[list[str], UnsetType] = UNSET
+    combat_state: Union[CombatState, UnsetType] = UNSET
+
+
+class Message(_Struct):
+    ready_for_command: bool = False
+    in_game: Union[bool, UnsetType] = UNSET
+    available_commands: Union[list[str], UnsetType] = UNSET
+    game_state: Union[GameState, UnsetType] = UNSET
+    error: Union[str, UnsetType] = UNSET
@@ -1,55 +1,85 @@
+import time
+from typing import IO, Optional
+
+
 class Sender:
-    def __init__(self, fn):
-        self.fh = open(fn, "w")
+    def __init__(self, fh: IO[str], sequenced: bool = False):
+        """
+        Args:
+            fh: A writable text file. See gym_sts.communication.transports.
+        """
+
+        self.fh = fh
+
+        # If sequenced, each message is prefixed with an increasing sequence id, which
+        # the relay strips and then echoes on the game's response to the message.
+        self.sequenced = sequenced
+        self.seq = 0
 
-    def _send_message(self, msg: str) -> None:
-        self.fh.write(f"{msg}\n")
+        # The type of the last command sent (e.g. "STATE") and when it was sent
+        self.last_command: Optional[str] = None
+        self.last_sent_at = 0.0
+
+    def _send_message(self, msg: str) -> int:
+        """
+        Returns the sequence id of the message (always 0 if not sequenced).
+        """
+
+        if self.sequenced:
+            self.seq += 1
+            self.fh.write(f"{self.seq} {msg}\n")
+        else:
+            self.fh.write(f"{msg}\n")
         self.fh.flush()
 
-    def send_ready(self) -> None:
-        self._send_message("READY")
+        self.last_command = msg.split(" ", 1)[0]
+        self.last_sent_at = time.monotonic()
+        return self.seq
+
+    def send_ready(self) -> int:
+        return self._send_message("READY")
 
-    def send_start(self, player_class: str, ascension: int, seed: str) -> None:
-        self._send_message(f"START {player_class} {ascension} {seed}")
+    def send_start(self, player_class: str, ascension: int, seed: str) -> int:
+        return self._send_message(f"START {player_class} {ascension} {seed}")
 
-    def send_proceed(self) -> None:
-        self._send_message("PROCEED")
+    def send_proceed(self) -> int:
+        return self._send_message("PROCEED")
 
-    def send_choose(self, choice) -> None:
-        self._send_message(f"CHOOSE {choice}")
+    def send_choose(self, choice) -> int:
+        return self._send_message(f"CHOOSE {choice}")
 
-    def send_click(self, x: int, y: int, left: bool = True) -> None:
+    def send_click(self, x: int, y: int, left: bool = True) -> int:
         side = "left" if left else "right"
-        self._send_message(f"CLICK {side} {x} {y}")
+        return self._send_message(f"CLICK {side} {x} {y}")
 
-    def send_play(self, index, target) -> None:
+    def send_play(self, index, target) -> int:
         # NOTE: Card index argument is indexed from 1, with 0 representing position 10.
         # Indices can change in the middle of a game.
         # Target argument is indexed from 0.
-        self._send_message(f"PLAY {index} {target}")
+        return self._send_message(f"PLAY {index} {target}")
 
-    def send_end(self) -> None:
-        self._send_message("END")
+    def send_end(self) -> int:
+        return self._send_message("END")
 
-    def send_potion(self, action, slot, target) -> None:
-        self._send_message(f"POTION {action} {slot} {target}")
+    def send_potion(self, action, slot, target) -> int:
+        return self._send_message(f"POTION {action} {slot} {target}")
 
-    def send_resign(self) -> None:
-        self._send_message("RESIGN")
+    def send_resign(self) -> int:
+        return self._send_message("RESIGN")
 
-    def send_wait(self, frames: int) -> None:
-        self._send_message(f"WAIT {frames}")
+    def send_wait(self, frames: int) -> int:
+        return self._send_message(f"WAIT {frames}")
 
-    def send_state(self) -> None:
+    def send_state(self) -> int:
         """
         Get the JSON representation of the current game state, regardless of whether or
         not the game is "stable." This method is valid in all game states.
         """
 
-        self._send_message("STATE")
+        return self._send_message("STATE")
 
-    def send_basemod(self, command: str) -> None:
-        self._send_message(f"BASEMOD {command}")
+    def send_basemod(self, command: str) -> int:
+        return self._send_message(f"BASEMOD {command}")
 
-    def send_render(self, render: bool) -> None:
-        self._send_message(f"RENDER {render}")
+    def send_render(self, render: bool) -> int:
+        return self._send_message(f"RENDER {render}")
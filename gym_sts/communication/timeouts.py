@@ -0,0 +1,76 @@
+from typing import Optional
+
+from pydantic import BaseModel, validator
+
+from gym_sts.communication.watchdog import LatencyModel
+
+
+class TimeoutPolicy(BaseModel):
+    """
+    How deadlines are derived from observed latencies. Each type of command gets
+    multiplier × its p99 latency, clamped to [floor, cap].
+    """
+
+    multiplier: float = 10
+    floor: float = 5
+    cap: float = 50
+    # Commands seen fewer times than this use the caller's default timeout
+    min_samples: int = 20
+    # How many recent latencies are kept per command type
+    history: int = 500
+
+    @validator("cap")
+    def cap_is_not_below_floor(cls, v, values, **kwargs):
+        if "floor" in values and v < values["floor"]:
+            raise ValueError("cap must be at least floor")
+        return v
+
+
+class AdaptiveTimeouts:
+    """
+    Per-command-type latency distributions and the deadlines derived from them, so a
+    trivial STATE can fail fast without a START, which boots a run, timing out
+    spuriously.
+    """
+
+    def __init__(self, policy: Optional[TimeoutPolicy] = None):
+        self.policy = policy or TimeoutPolicy()
+        self.latencies: dict[str, LatencyModel] = {}
+
+    def record(self, command_type: str, latency: float) -> None:
+        if command_type not in self.latencies:
+            self.latencies[command_type] = LatencyModel(self.policy.history)
+        self.latencies[command_type].record(latency)
+
+    def timeout(self, command_type: str, default: float) -> float:
+        """
+        Seconds to wait for a command of the given type.
+
+        Args:
+            default: Returned until enough latencies have been recorded.
+        """
+
+        latencies = self.latencies.get(command_type)
+        if latencies is None or len(latencies) < self.policy.min_samples:
+            return default
+
+        p99 = latencies.quantile(0.99)
+        assert p99 is not None
+        deadline = self.policy.multiplier * p99
+        return min(max(deadline, self.policy.floor), self.policy.cap)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        The count, median, p99 and current timeout of each command type, e.g. for
+        logging as metrics.
+        """
+
+        summary = {}
+        for command_type, latencies in self.latencies.items():
+            summary[command_type] = {
+                "count": len(latencies),
+                "p50": latencies.quantile(0.5),
+                "p99": latencies.quantile(0.99),
+                "timeout": self.timeout(command_type, self.policy.cap),
+            }
+        return summary
@@ -0,0 +1,139 @@
+import os
+import socket
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import IO, Any, Optional
+
+
+def init_fifos(filenames):
+    # Create fifos for communication
+    for f in filenames:
+        if os.path.exists(f):
+            os.remove(f)
+        os.mkfifo(f)
+
+
+class Transport(ABC):
+    """
+    The channel between the env and the relay script CommunicationMod runs (see
+    build/relay.sh). The relay picks the matching implementation based on the
+    STS_TRANSPORT environment variable, which should be set to `name`.
+    """
+
+    name: str
+
+    def prepare(self) -> None:
+        """
+        Create whatever the relay expects to exist when the game starts. Called
+        before the game is launched, and by connect() if it hasn't been already.
+        """
+
+        pass
+
+    @abstractmethod
+    def connect(self) -> tuple[Any, IO[str]]:
+        """
+        Block until the relay has connected.
+
+        Returns a readable object with a fileno(), from which the game's messages are
+        read, and a text file to which commands are written.
+        """
+
+        raise NotImplementedError("Not implemented")
+
+    def close(self) -> None:
+        pass
+
+
+class FifoTransport(Transport):
+    """
+    A pair of named pipes. The relay runs two cat processes to copy the game's IO to
+    and from them.
+    """
+
+    name = "fifo"
+
+    def __init__(self, input_path: Path, output_path: Path):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.prepared = False
+
+    def prepare(self) -> None:
+        init_fifos([self.input_path, self.output_path])
+        self.prepared = True
+
+    def connect(self) -> tuple[Any, IO[str]]:
+        if not self.prepared:
+            self.prepare()
+
+        # Opening a fifo blocks until the other end is opened
+        reader = open(self.output_path, "rb", buffering=0)
+        os.set_blocking(reader.fileno(), False)
+        writer = open(self.input_path, "w")
+
+        return reader, writer
+
+    def close(self) -> None:
+        for path in [self.input_path, self.output_path]:
+            if os.path.exists(path):
+                os.remove(path)
+        self.prepared = False
+
+
+class SocketTransport(Transport):
+    """
+    A single bidirectional Unix domain socket, which the relay connects to with socat.
+    This saves a process and a copy per message compared to fifos.
+
+    The socket file must be reachable from the game, e.g. on the output volume shared
+    with the container. Note that Unix socket paths are limited to about 100 bytes.
+    """
+
+    name = "socket"
+
+    def __init__(self, socket_path: Path, accept_timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.accept_timeout = accept_timeout
+        self.server: Optional[socket.socket] = None
+        self.connection: Optional[socket.socket] = None
+
+    def prepare(self) -> None:
+        """
+        Start listening for the relay.
+        """
+
+        if self.server is not None:
+            return
+
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(str(self.socket_path))
+        self.server.listen(1)
+
+    def connect(self) -> tuple[Any, IO[str]]:
+        self.prepare()
+        assert self.server is not None
+
+        self.server.settimeout(self.accept_timeout)
+        self.connection, _ = self.server.accept()
+        self.server.close()
+        self.server = None
+
+        self.connection.setblocking(False)
+        # Commands are tiny, so writes never fill the socket buffer
+        writer = os.fdopen(os.dup(self.connection.fileno()), "w")
+
+        return self.connection, writer
+
+    def close(self) -> None:
+        for sock in [self.server, self.connection]:
+            if sock is not None:
+                sock.close()
+
+        self.server = None
+        self.connection = None
+
+        if self.socket_path.exists():
+            self.socket_path.unlink()
@@ -0,0 +1,149 @@
+import collections
+import logging
+import math
+import time
+from typing import Callable, Optional
+
+from gym_sts import exceptions
+
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyModel:
+    """
+    The distribution of recent command round trips.
+    """
+
+    def __init__(self, history: int = 200):
+        self.latencies: collections.deque[float] = collections.deque(maxlen=history)
+
+    def __len__(self) -> int:
+        return len(self.latencies)
+
+    def record(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Returns None if nothing has been recorded yet.
+        """
+
+        if not self.latencies:
+            return None
+
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)
+        return ordered[max(index, 0)]
+
+
+class Watchdog:
+    """
+    Detects games that have hung, so the Receiver can give up on them long before its
+    timeout.
+
+    A game is declared dead if its process or container has exited, or if a response
+    is overdue compared to recent round trips and the game has stopped using the CPU.
+    A game that's overdue but busy is left alone, since it may just be slow, e.g.
+    while generating a new act.
+    """
+
+    def __init__(
+        self,
+        is_alive: Callable[[], bool],
+        cpu_time: Optional[Callable[[], Optional[float]]] = None,
+        min_stall: float = 5,
+        latency_multiplier: float = 10,
+        idle_cpu: float = 0.02,
+        check_interval: float = 1,
+        history: int = 200,
+    ):
+        """
+        Args:
+            is_alive: Returns whether the game is still running.
+            cpu_time: Returns the CPU seconds the game has used so far, or None if it
+                can't be measured. If not provided, only liveness is checked.
+            min_stall: A response is never considered overdue before this many seconds.
+            latency_multiplier: A response is overdue once it's taken this many times
+                longer than the 99th percentile of recent round trips.
+            idle_cpu: The fraction of a core below which an overdue game is considered
+                hung.
+            check_interval: Minimum seconds between checks. Some probes are slow, e.g.
+                Docker's stats API.
+            history: How many round trips the latency model remembers.
+        """
+
+        self.is_alive = is_alive
+        self.cpu_time = cpu_time
+        self.min_stall = min_stall
+        self.latency_multiplier = latency_multiplier
+        self.idle_cpu = idle_cpu
+        self.check_interval = check_interval
+        self.latencies = LatencyModel(history)
+
+        self._last_check = 0.0
+        self._last_cpu: Optional[tuple[float, float]] = None  # (wall time, CPU time)
+
+    @property
+    def stall_threshold(self) -> float:
+        """
+        Seconds after which a response is overdue.
+        """
+
+        p99 = self.latencies.quantile(0.99)
+        if p99 is None:
+            return self.min_stall
+        return max(self.min_stall, self.latency_multiplier * p99)
+
+    def start(self) -> None:
+        """
+        Called when a new wait for a response begins.
+        """
+
+        self._last_check = time.monotonic()
+        self._last_cpu = None
+
+    def record(self, latency: float) -> None:
+        """
+        Called with the duration of each wait that succeeded.
+        """
+
+        self.latencies.record(latency)
+
+    def check(self, elapsed: float) -> None:
+        """
+        Raise StSTimeoutError if the game looks dead.
+
+        Args:
+            elapsed: Seconds spent waiting for the current response.
+        """
+
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        if not self.is_alive():
+            raise exceptions.StSTimeoutError(
+                f"Game exited while waiting {elapsed:.1f} seconds for a response."
+            )
+
+        if elapsed < self.stall_threshold or self.cpu_time is None:
+            return
+
+        cpu = self.cpu_time()
+        if cpu is None:
+            return
+
+        previous, self._last_cpu = self._last_cpu, (now, cpu)
+        if previous is None:
+            return
+
+        usage = (cpu - previous[1]) / (now - previous[0])
+        if usage < self.idle_cpu:
+            raise exceptions.StSTimeoutError(
+                f"Game is idle ({usage:.1%} CPU) after waiting {elapsed:.1f} seconds "
+                f"for a response, {self.stall_threshold:.1f} seconds being overdue."
+            )
+
+        logger.debug(f"Response overdue, but the game is busy ({usage:.1%} CPU)")
@@ -0,0 +1,12 @@
+from typing import Any
+
+
+def to_json(obj: Any) -> Any:
+    """
+    A `default` for json.dumps() that handles game states decoded by the schema
+    decoder, which are msgspec structs rather than dicts.
+    """
+
+    import msgspec
+
+    return msgspec.to_builtins(obj)
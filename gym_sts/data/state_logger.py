@@ -2,6 +2,7 @@ import datetime
 import json
 from pathlib import Path
 
+from gym_sts.data.serialization import to_json
 from gym_sts.spaces.actions import Action
 from gym_sts.spaces.observations import Observation
 
@@ -34,7 +35,9 @@ class StateLogger:
         now = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
         outpath = self.logdir / f"states_{now}.json"
         with open(outpath, "w") as f:
-            f.write(json.dumps(self.unlogged_actions, indent=self.indent))
+            f.write(
+                json.dumps(self.unlogged_actions, indent=self.indent, default=to_json)
+            )
 
         self.unlogged_actions = []
 
@@ -3,6 +3,33 @@ from gym_sts.spaces.constants.base import ScreenType
 from gym_sts.spaces.observations import Observation
 
 
+# Commands that correspond to at least one action
+ACTION_COMMANDS = {
+    "cancel",
+    "choose",
+    "confirm",
+    "end",
+    "leave",
+    "play",
+    "potion",
+    "proceed",
+    "return",
+    "skip",
+}
+
+
+def accepts_actions(observation: Observation) -> bool:
+    """
+    Whether the game is ready for an action at all. Much cheaper than get_valid(),
+    but it can't tell whether any particular action is valid.
+    """
+
+    if observation.has_error or not observation.stable:
+        return False
+
+    return not ACTION_COMMANDS.isdisjoint(observation._available_commands)
+
+
 def validate_end_turn(action: actions.EndTurn, observation: Observation) -> bool:
     return "end" in observation._available_commands
 
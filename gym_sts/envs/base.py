@@ -1,6 +1,9 @@
 import atexit
+import collections
+import concurrent.futures
 import datetime
 import logging
+import os
 import pathlib
 import random
 import shutil
@@ -8,31 +11,81 @@ import string
 import subprocess
 import tempfile
 import time
-from typing import Callable, Optional, Tuple, Union
+from typing import Callable, Optional, Sequence, Tuple, Union
 
 import docker
 import gymnasium as gym
+import numpy as np
 from docker.models.containers import Container
 
 from gym_sts import constants, exceptions
-from gym_sts.communication import Communicator
+from gym_sts.communication import (
+    AdaptiveTimeouts,
+    Communicator,
+    FifoTransport,
+    SocketTransport,
+    TimeoutPolicy,
+    Transport,
+    Watchdog,
+)
 from gym_sts.data.state_logger import StateLogger
 from gym_sts.spaces.actions import ACTION_SPACE, ACTIONS, Action
-from gym_sts.spaces.observations import OBSERVATION_SPACE, Observation
-
-from .action_validation import validate
-from .types import ResetParams
+from gym_sts.spaces.observations import (
+    Observation,
+    ObservationBuffers,
+    ObservationConfig,
+    make_observation_space,
+)
+
+from .action_validation import accepts_actions, validate
+from .monitoring import (
+    MemoryMonitor,
+    MemorySample,
+    container_cpu_time,
+    container_is_running,
+    container_memory,
+    jvm_heap_used,
+    process_cpu_time,
+    process_rss,
+)
+from .reaper import Reaper
+from .resources import ResourceAllocation
+from .sandbox import link_sandbox
+from .transpositions import TranspositionCache
+from .types import ResetParams, SuperFastModeConfig
 from .utils import Cache, SeedHelpers, full_game_obs_value
 
 
 CONTAINER_OUTDIR = "/game/out"
 CONTAINER_LIBDIR = "/game/lib"
 CONTAINER_MODSDIR = "/game/mods"
+CONTAINER_SUPERFASTMODE_CONFIG = (
+    "/root/.config/ModTheSpire/SuperFastMode/SuperFastModeConfig.properties"
+)
+
+# See build/entrypoint.sh
+CONTAINER_PROFILES = ["default", "lean"]
+
+# Seconds observe() waits for the game to stabilize
+OBSERVE_TIMEOUT = 5.0
+
+# Seconds to wait for a new run to leave the main menu
+START_TIMEOUT = 10.0
 
 
 logger = logging.getLogger(__name__)
 
 
+def verify_image(client: docker.DockerClient) -> None:
+    try:
+        client.images.get(constants.DOCKER_IMAGE_TAG)
+    except docker.errors.ImageNotFound:
+        raise Exception(
+            f"{constants.DOCKER_IMAGE_TAG} image not found. "
+            "Please build it with SlayTheSpireGymEnv.build_image()"
+        )
+
+
 class SlayTheSpireGymEnv(gym.Env):
     def __init__(
         self,
@@ -47,6 +100,24 @@ class SlayTheSpireGymEnv(gym.Env):
         ascension: int = 0,
         log_states: bool = False,
         logged_state_indent: int | None = None,
+        message_decoder: str = "json",
+        sequence_messages: bool = False,
+        transport: str = "fifo",
+        resources: Optional[ResourceAllocation] = None,
+        memory_limit: Union[int, str, None] = None,
+        memory_growth_limit: Union[int, str, None] = None,
+        watchdog: bool = False,
+        timeouts: Optional[TimeoutPolicy] = None,
+        max_pending_teardowns: int = 2,
+        fast_kill: bool = False,
+        profile: Optional[str] = None,
+        superfastmode: Optional[SuperFastModeConfig] = None,
+        docker_client: Optional[docker.DockerClient] = None,
+        isolate: bool = False,
+        transposition_cache: Optional[TranspositionCache] = None,
+        prefetch_runs: bool = False,
+        observation_config: Optional[ObservationConfig] = None,
+        reuse_observation_buffers: bool = False,
         verbose: bool = True,
     ):
         """
@@ -64,6 +135,69 @@ class SlayTheSpireGymEnv(gym.Env):
                 frozen in place, but saving CPU.
             reboot_frequency: Reboot the game every n resets. This stops memory leaks.
             reboot_on_error: Reboot the game if an error (e.g. timeout) occurs.
+            message_decoder: How to decode CommunicationMod messages. "json" decodes
+                into dicts, while "schema" decodes directly into typed structs, which
+                is faster but requires msgspec (the fast extra).
+            sequence_messages: If True, tag commands and responses with sequence ids,
+                so stale responses are discarded by id rather than by draining the
+                fifo before every command. Requires an image built after this option
+                was added.
+            transport: How messages are exchanged with the game. "fifo" relays them
+                through a pair of named pipes, while "socket" uses a single Unix
+                domain socket, which saves a process and a copy per message. The socket
+                transport requires socat (it's installed in the image) and doesn't
+                support sequence_messages.
+            resources: CPUs, a CPU quota and a memory limit for the game. Use a
+                gym_sts.envs.resources.CoreAllocator to divide a host between many envs.
+                Memory and quota limits only apply to headless games. The env doesn't
+                pin its worker; see ResourceAllocation.pin_worker().
+            memory_limit: Reboot the game at the next reset once its processes (or its
+                container) use more than this much memory, either in bytes or in
+                Docker's format, e.g. "3g". Can be combined with reboot_frequency.
+            memory_growth_limit: Like memory_limit, but relative to the game's memory
+                at the first reset after it booted.
+            watchdog: If True, give up waiting for the game as soon as it exits, or
+                once a response is long overdue compared to recent ones and the game
+                has stopped using the CPU, rather than after the 50 second timeout.
+                Combine with reboot_on_error to recover from hung games quickly.
+            timeouts: If provided, each type of command (and observe()) times out
+                according to the latencies observed for it so far, rather than after a
+                fixed 50 (or 5) seconds. See TimeoutPolicy.
+            max_pending_teardowns: Containers are stopped in the background when the
+                game reboots, so the replacement can boot in the meantime. This limits
+                how many may be shutting down at once. 0 stops them synchronously.
+            fast_kill: Kill containers instead of stopping them with a grace period.
+            profile: How headless containers are configured, overriding the profile
+                the image was built with. "lean" disables audio and reduces the virtual
+                screen's depth to fit more games per host, and is best combined with
+                animate=False. See build/entrypoint.sh.
+            superfastmode: Overrides the default SuperFastMode settings. See
+                gym_sts.calibrate for finding the fastest settings that keep the game
+                stable.
+            docker_client: The client used to run containers. Defaults to a new client
+                from the environment. Many envs can share one, see
+                gym_sts.envs.fleet.
+            isolate: Give a local (not headless) game its own copy of the game files
+                and its own config directory (via HOME, XDG_CONFIG_HOME and user.home)
+                inside the output directory, rather than sharing ./tmp and ~/.config,
+                so several local games can run side by side.
+            transposition_cache: If provided, steps that replay a known sequence of
+                actions from the start of a game are answered from the cache, and the
+                game only receives them once the trajectory leaves the cache. Caches
+                may be shared between envs, but not between threads.
+            prefetch_runs: If True, start the next run in the background as soon as a
+                game ends, so the following reset() returns without waiting for the
+                game. Runs are prefetched with the seed reset() would pick, unless the
+                last reset() was given an sts_seed, in which case that seed is reused.
+                reset()s with other seeds (or that reboot) discard the prefetched run.
+            observation_config: How observations are encoded, e.g. with sparse card
+                piles, and which components they include. Defaults to the encoding
+                of OBSERVATION_SPACE.
+            reuse_observation_buffers: If True, encode every observation into the
+                same preallocated buffers (see Observation.serialize_into()), so
+                stepping allocates almost nothing. Each observation returned by
+                step() or reset() is then overwritten by the next one; callers that
+                keep observations must copy them with copy_observation().
             verbose: Controls the verbosity of CommunicationMod.
         """
 
@@ -71,11 +205,11 @@ class SlayTheSpireGymEnv(gym.Env):
         self.mods_dir = pathlib.Path(mods_dir).resolve()
 
         self.headless = headless
-        self.container_name = None
-        if self.headless:
-            self.container_name = "sts-" + "".join(
-                random.choices(string.ascii_lowercase, k=8)
-            )
+        self.isolate = isolate
+        self.instance_name = "sts-" + "".join(
+            random.choices(string.ascii_lowercase, k=8)
+        )
+        self.container_name = self.instance_name if self.headless else None
 
         self._current_dir = pathlib.Path.cwd()
         self._temp_dir = None
@@ -83,12 +217,18 @@ class SlayTheSpireGymEnv(gym.Env):
             self._temp_dir = tempfile.TemporaryDirectory(prefix="sts-")
             output_dir = self._temp_dir.name
         self.output_dir = pathlib.Path(output_dir).resolve()
-        if self.container_name:
-            self.output_dir = self.output_dir / self.container_name
+        if self.headless or self.isolate:
+            self.output_dir = self.output_dir / self.instance_name
             self.output_dir.mkdir(exist_ok=True)
 
+        # Where local games look for ModTheSpire's config
+        self.config_home = pathlib.Path("~/.config").expanduser()
+        if self.isolate:
+            self.config_home = self.output_dir / "config"
+
         self.input_path = self.output_dir / "stsai_input"
         self.output_path = self.output_dir / "stsai_output"
+        self.socket_path = self.output_dir / "stsai.sock"
         self.logfile_path = self.output_dir / "stderr.log"
 
         # Create screenshots directory
@@ -99,13 +239,72 @@ class SlayTheSpireGymEnv(gym.Env):
 
         self.container: Optional[Container] = None
         self.process: Optional[subprocess.Popen] = None
+        self.communicator: Optional[Communicator] = None
+        self.reaper = Reaper(max_pending_teardowns, fast_kill=fast_kill)
+
+        if profile is not None and profile not in CONTAINER_PROFILES:
+            raise ValueError(f"Unrecognized profile {profile}")
+        self.profile = profile
+        self.superfastmode = superfastmode
+        self.client = docker_client
+        self._image_verified = False
+
+        # The transport of a game that has been launched, but not connected to yet
+        self._transport: Optional[Transport] = None
+        # Whether the game has booted, but not been played yet
+        self._fresh_boot = False
+
+        # Signs the game is being pushed too fast. "desyncs" counts actions whose
+        # validity didn't match whether the game returned an error,
+        # "stability_retries" counts waits for a step's result to settle and
+        # "observe_retries" counts extra state requests in observe().
+        self.counters: collections.Counter[str] = collections.Counter()
 
         self.reboot_frequency = reboot_frequency
         self.reset_count = 0
         self.reboot_on_error = reboot_on_error
-
+        self.memory_monitor = MemoryMonitor(memory_limit, memory_growth_limit)
+        self.watchdog: Optional[Watchdog] = None
+        if watchdog:
+            self.watchdog = Watchdog(self._game_is_alive, self._game_cpu_time)
+        self.timeouts: Optional[AdaptiveTimeouts] = None
+        if timeouts is not None:
+            self.timeouts = AdaptiveTimeouts(timeouts)
+
+        self.message_decoder = message_decoder
+        self.sequence_messages = sequence_messages
+
+        if transport not in ["fifo", "socket"]:
+            raise ValueError(f"Unrecognized transport {transport}")
+        if transport == "socket" and sequence_messages:
+            raise ValueError("The socket transport doesn't support sequence_messages")
+        self.transport = transport
+        self.resources = resources
         self.verbose = verbose
 
+        self.transposition_cache = transposition_cache
+        # The cache node of the latest observation, if it's cached
+        self._trie_node: Optional[int] = None
+        # Actions served from the cache, which the game hasn't received yet
+        self._pending_actions: list[int] = []
+        # The observation before the pending actions, which the game is still at
+        self._catch_up_start: Optional[Observation] = None
+
+        self.prefetch_runs = prefetch_runs
+        self._prefetch_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        # Resolves to the Neow observation of the run being prefetched
+        self._prefetch: Optional[concurrent.futures.Future] = None
+        # The Neow observation of a finished prefetch, until reset() uses it
+        self._prefetched: Optional[Observation] = None
+        # The last observation of the game abandoned by the prefetch, which
+        # observe() returns until reset()
+        self._final_observation: Optional[Observation] = None
+        self._prefetch_sts_seed: Optional[str] = None
+        # The env PRNG's state after picking the prefetched run's seed, if it did
+        self._prefetch_rng_state: Optional[tuple] = None
+        # The sts_seed the last reset() was given, if any
+        self._fixed_sts_seed: Optional[str] = None
+
         # Animation can be toggled at any time using set_animate()
         self.animate = animate
 
@@ -121,7 +320,11 @@ class SlayTheSpireGymEnv(gym.Env):
         self.sts_seed: Optional[str] = None  # The seed used by the game.
 
         self.action_space = ACTION_SPACE
-        self.observation_space = OBSERVATION_SPACE
+        self.observation_config = observation_config or ObservationConfig()
+        self.observation_space = make_observation_space(self.observation_config)
+        self.observation_buffers: Optional[ObservationBuffers] = None
+        if reuse_observation_buffers:
+            self.observation_buffers = ObservationBuffers(self.observation_config)
 
         self.observation_cache: Cache[Observation] = Cache()
 
@@ -139,12 +342,22 @@ class SlayTheSpireGymEnv(gym.Env):
 
         atexit.register(self.close)
 
-    def build_image(self) -> None:
+    def build_image(self, profile: str = "default") -> None:
+        """
+        Args:
+            profile: The image's default profile. See build/entrypoint.sh.
+        """
+
+        if profile not in CONTAINER_PROFILES:
+            raise ValueError(f"Unrecognized profile {profile}")
+
         self._generate_communication_mod_config(headless=True)
 
         client = docker.from_env()
         client.images.build(
-            path=str(constants.PROJECT_ROOT / "build"), tag=constants.DOCKER_IMAGE_TAG
+            path=str(constants.PROJECT_ROOT / "build"),
+            tag=constants.DOCKER_IMAGE_TAG,
+            buildargs={"STS_PROFILE": profile},
         )
 
     def _generate_communication_mod_config(self, headless: bool) -> None:
@@ -163,10 +376,16 @@ class SlayTheSpireGymEnv(gym.Env):
             pipe_script = (
                 constants.PROJECT_ROOT / "build" / "pipe_locally.sh"
             ).resolve()
-            config_file = pathlib.Path(
-                "~/.config/ModTheSpire/CommunicationMod/config.properties"
-            ).expanduser()
-            command = f"{pipe_script} {self.input_path} {self.output_path}"
+            config_file = (
+                self.config_home
+                / "ModTheSpire"
+                / "CommunicationMod"
+                / "config.properties"
+            )
+            config_file.parent.mkdir(parents=True, exist_ok=True)
+            command = (
+                f"{pipe_script} {self.input_path} {self.output_path} {self.socket_path}"
+            )
 
         with config_file.open(mode="w") as f:
             f.write(f"command={command}\n")
@@ -181,26 +400,36 @@ class SlayTheSpireGymEnv(gym.Env):
         WARNING: This function will silently overwrite any existing config file.
         """
 
-        config_file = pathlib.Path(
-            "~/.config/ModTheSpire/SuperFastMode/SuperFastModeConfig.properties"
-        ).expanduser()
+        config_file = (
+            self.config_home
+            / "ModTheSpire"
+            / "SuperFastMode"
+            / "SuperFastModeConfig.properties"
+        )
+        config_file.parent.mkdir(parents=True, exist_ok=True)
 
+        config = self.superfastmode or SuperFastModeConfig()
         with config_file.open(mode="w") as f:
-            f.write(
-                "isDeltaMultiplied=true\ndeltaMultiplier=100.0\n"
-                "EXISTS=YES INDEED I EXIST\nisInstantLerp=true\n"
-            )
+            f.write(config.to_properties())
 
     def _run_container(self) -> None:
         logger.info("Starting STS in Docker container")
-        self.client = docker.from_env()
-        try:
-            self.client.images.get(constants.DOCKER_IMAGE_TAG)
-        except docker.errors.ImageNotFound:
-            raise Exception(
-                f"{constants.DOCKER_IMAGE_TAG} image not found. "
-                "Please build it with SlayTheSpireGymEnv.build_image()"
-            )
+        if self.client is None:
+            self.client = docker.from_env()
+        if not self._image_verified:
+            verify_image(self.client)
+            self._image_verified = True
+
+        volumes = {
+            self.output_dir: dict(bind=CONTAINER_OUTDIR, mode="rw"),
+            self.lib_dir: dict(bind=CONTAINER_LIBDIR, mode="ro"),
+            self.mods_dir: dict(bind=CONTAINER_MODSDIR, mode="ro"),
+        }
+        if self.superfastmode is not None:
+            # Mounted over the config baked into the image
+            config_file = self.output_dir / "SuperFastModeConfig.properties"
+            config_file.write_text(self.superfastmode.to_properties())
+            volumes[config_file] = dict(bind=CONTAINER_SUPERFASTMODE_CONFIG, mode="ro")
 
         self.container = self.client.containers.run(
             image=constants.DOCKER_IMAGE_TAG,
@@ -208,23 +437,67 @@ class SlayTheSpireGymEnv(gym.Env):
             remove=True,
             init=True,
             detach=True,
-            volumes={
-                self.output_dir: dict(bind=CONTAINER_OUTDIR, mode="rw"),
-                self.lib_dir: dict(bind=CONTAINER_LIBDIR, mode="ro"),
-                self.mods_dir: dict(bind=CONTAINER_MODSDIR, mode="ro"),
-            },
+            environment=self._container_environment(),
+            volumes=volumes,
+            **(self.resources.container_kwargs() if self.resources else {}),
         )
         logger.info(f"Started docker container {self.container.name}")
         logger.info(f"To view logs, run `docker logs {self.container.name}`.")
 
+    def _relay_environment(self) -> dict[str, str]:
+        """
+        Environment variables read by the relay scripts CommunicationMod runs.
+        """
+
+        return {
+            "STS_SEQUENCED": "1" if self.sequence_messages else "0",
+            "STS_TRANSPORT": self.transport,
+        }
+
+    def _container_environment(self) -> dict[str, str]:
+        environment = self._relay_environment()
+        if self.profile is not None:
+            environment["STS_PROFILE"] = self.profile
+        return environment
+
+    def _local_environment(self) -> dict[str, str]:
+        """
+        Environment variables that point an isolated local game at its own config.
+        """
+
+        if not self.isolate:
+            return {}
+
+        home = self.output_dir / "home"
+        home.mkdir(exist_ok=True)
+
+        # The JVM reads user.home from the password database rather than HOME
+        java_options = f"-Duser.home={home} " + os.environ.get("JAVA_TOOL_OPTIONS", "")
+        return {
+            "HOME": str(home),
+            "XDG_CONFIG_HOME": str(self.config_home),
+            "JAVA_TOOL_OPTIONS": java_options.strip(),
+        }
+
+    def _make_transport(self) -> Transport:
+        if self.transport == "socket":
+            return SocketTransport(self.socket_path)
+        return FifoTransport(self.input_path, self.output_path)
+
     def _run_locally(self) -> None:
         logger.info("Starting STS on the host machine")
 
         # Create a sandbox directory where the subprocess will run
         tmp_dir = self._current_dir / "tmp"
-
-        shutil.copytree(str(self.lib_dir), str(tmp_dir), dirs_exist_ok=True)
-        shutil.copytree(str(self.mods_dir), str(tmp_dir / "mods"), dirs_exist_ok=True)
+        if self.isolate:
+            tmp_dir = self.output_dir / "game"
+
+        # The jars are linked once, but the game writes to its preferences, so they're
+        # restored on every boot
+        link_sandbox(
+            tmp_dir,
+            {self.lib_dir: pathlib.Path("."), self.mods_dir: pathlib.Path("mods")},
+        )
         preferences = constants.PROJECT_ROOT / "build" / "preferences"
         shutil.copytree(
             str(preferences), str(tmp_dir / "preferences"), dirs_exist_ok=True
@@ -241,6 +514,12 @@ class SlayTheSpireGymEnv(gym.Env):
             stdout=self.logfile,
             stderr=self.logfile,
             cwd=tmp_dir,
+            env={
+                **os.environ,
+                **self._relay_environment(),
+                **self._local_environment(),
+            },
+            preexec_fn=self.resources.pin_game if self.resources else None,
         )
 
     def _do_action(self, action: str) -> Observation:
@@ -251,10 +530,13 @@ class SlayTheSpireGymEnv(gym.Env):
         used by agents. Please use step() instead.
         """
 
+        self._finish_prefetch()
+        # The command may have changed the prefetched run
+        self._prefetched = None
         return self.communicator._manual_command(action)
 
     def _end_game(self) -> None:
-        obs = self.observe()
+        obs = self._observe()
 
         if not obs.in_game:
             return
@@ -264,6 +546,7 @@ class SlayTheSpireGymEnv(gym.Env):
         assert obs.screen_type == "MAIN_MENU"
 
     def set_animate(self, animate: bool) -> None:
+        self._finish_prefetch()
         self.animate = animate
         self.communicator.render(self.animate)
 
@@ -280,21 +563,39 @@ class SlayTheSpireGymEnv(gym.Env):
                 add_to_cache to True to override that behavior. Adding the result to the
                 cache can be useful to fix the behavior of methods like valid_actions()
                 in the event of desync.
+
+        Once a game has ended and the next run is being prefetched (see
+        prefetch_runs), the game has moved on, so the ended game's final observation
+        is returned instead, until reset().
         """
 
-        stable = False
+        if self._final_observation is not None:
+            if add_to_cache:
+                self.observation_cache.append(self._final_observation)
+            return self._final_observation
+
+        self._catch_up()
+        return self._observe(add_to_cache)
 
-        for i in range(100):
+    def _observe(self, add_to_cache: bool = False) -> Observation:
+        budget = OBSERVE_TIMEOUT
+        if self.timeouts is not None:
+            budget = self.timeouts.timeout("OBSERVE", budget)
+
+        started = time.monotonic()
+        while True:
             obs = self.communicator.state()
 
             if obs.stable:
-                stable = True
                 break
+            if time.monotonic() - started > budget:
+                raise RuntimeError("Unable to retrieve a stable observation")
 
+            self.counters["observe_retries"] += 1
             time.sleep(0.05)
 
-        if not stable:
-            raise RuntimeError("Unable to retrieve a stable observation")
+        if self.timeouts is not None:
+            self.timeouts.record("OBSERVE", time.monotonic() - started)
 
         if add_to_cache:
             self.observation_cache.append(obs)
@@ -305,6 +606,34 @@ class SlayTheSpireGymEnv(gym.Env):
         logger.debug("Signalling READY")
         self.start_message = self.communicator.ready()
 
+    def sample_memory(self) -> Optional[MemorySample]:
+        """
+        Measure the memory used by the running game, if any.
+        """
+
+        if self.container is not None:
+            return MemorySample(rss=container_memory(self.container), heap_used=None)
+        if self.process is not None:
+            return MemorySample(
+                rss=process_rss(self.process.pid),
+                heap_used=jvm_heap_used(self.process.pid),
+            )
+        return None
+
+    def _game_is_alive(self) -> bool:
+        if self.container is not None:
+            return container_is_running(self.container)
+        if self.process is not None:
+            return self.process.poll() is None
+        return False
+
+    def _game_cpu_time(self) -> Optional[float]:
+        if self.container is not None:
+            return container_cpu_time(self.container)
+        if self.process is not None:
+            return process_cpu_time(self.process.pid)
+        return None
+
     def reboot(self) -> None:
         """
         Close and reopen the game process. Also works for the initial boot.
@@ -336,17 +665,45 @@ class SlayTheSpireGymEnv(gym.Env):
                     for (re)playing known scenarios. If provided, the seed argument must
                     be None.
                 reboot (bool): Force a full reboot of the game.
+
+        If memory limits were set, info["memory"] holds the MemorySample they were
+        checked against.
         """
 
         options = options or {}
         params = ResetParams(seed=seed, **options)
 
+        self._finish_prefetch()
+        prefetched = self._prefetched
+        self._prefetched = None
+        self._final_observation = None
+        requested_sts_seed = None
+        if params.sts_seed is not None:
+            requested_sts_seed = SeedHelpers.validate_seed(params.sts_seed)
+
+        memory = None
+        if self.memory_monitor.enabled:
+            memory = self.sample_memory()
+
         if params.reboot:
             self.reset_count = 0
-        if self.reset_count == 0:
+        elif memory is not None and self.memory_monitor.exceeded(memory):
+            self.reset_count = 0
+
+        # The game is abandoned anyway, so there's no need to catch it up
+        self._pending_actions = []
+        self._trie_node = None
+
+        # A game that was just booted, e.g. by a fleet launcher, is as good as new
+        reboot = self.reset_count == 0 and (params.reboot or not self._fresh_boot)
+        if reboot or not self._can_use_prefetched(params, requested_sts_seed):
+            prefetched = None
+
+        if reboot:
             self.reboot()
-        else:
+        elif prefetched is None:
             self._end_game()
+        self._fresh_boot = False
 
         run_type = "local"
         if self.container is not None:
@@ -375,31 +732,26 @@ class SlayTheSpireGymEnv(gym.Env):
             self.prng = random.Random(self.seed)
 
         self.observation_cache.reset()
-
-        if params.sts_seed is not None:
-            sts_seed = SeedHelpers.validate_seed(params.sts_seed)
+        self._fixed_sts_seed = requested_sts_seed
+
+        if prefetched is not None:
+            logger.debug(f"Using prefetched run {self._prefetch_sts_seed}")
+            self.sts_seed = self._prefetch_sts_seed
+            if self._prefetch_rng_state is not None:
+                self.prng.setstate(self._prefetch_rng_state)
+            obs = prefetched
         else:
-            sts_seed = SeedHelpers.make_seed(self.prng)
-        self.sts_seed = sts_seed
-
-        obs = self.communicator.start("DEFECT", self.ascension, self.sts_seed)
-
-        # In my experience the game isn't actually stable here, and we have
-        # to wait for a bit before the game actually starts.
-        success = False
-        for _ in range(10):
-            if obs.screen_type == "MAIN_MENU":
-                time.sleep(1)
-                obs = self.observe()
+            if requested_sts_seed is not None:
+                sts_seed = requested_sts_seed
             else:
-                success = True
-                break
-        if not success:
-            raise TimeoutError("Could not get out of MAIN_MENU after game start.")
+                sts_seed = SeedHelpers.make_seed(self.prng)
+            self.sts_seed = sts_seed
+            obs = self._start_run(sts_seed)
 
-        assert obs.event_state.event_id == "Neow Event"
         self.observation_cache.append(obs)
 
+        self._root_transpositions(obs)
+
         # Send game's starting state to state logger
         if self.log_states:
             self.state_logger.log(None, None, obs)
@@ -410,33 +762,356 @@ class SlayTheSpireGymEnv(gym.Env):
             "rng_state": self.prng.getstate(),
             "observation": obs,
         }
-        return obs.serialize(), info
+        if self.memory_monitor.enabled:
+            info["memory"] = memory
+        return self._encode(obs), info
+
+    def _start_run(self, sts_seed: str) -> Observation:
+        """
+        Start a new run from the main menu, returning the Neow observation.
+        """
+
+        obs = self.communicator.start("DEFECT", self.ascension, sts_seed)
+
+        # In my experience the game isn't actually stable here, and we have
+        # to wait for a bit before the game actually starts.
+        deadline = time.monotonic() + START_TIMEOUT
+        while obs.screen_type == "MAIN_MENU":
+            if time.monotonic() > deadline:
+                raise TimeoutError("Could not get out of MAIN_MENU after game start.")
+            time.sleep(0.1)
+            obs = self._observe()
+
+        assert obs.event_state.event_id == "Neow Event"
+        return obs
+
+    def _prefetch_run(self, sts_seed: str) -> Observation:
+        self._end_game()
+        return self._start_run(sts_seed)
+
+    def prefetch(self) -> None:
+        """
+        Start the next run in the background, for the next reset() to use. Does
+        nothing if a run is already being prefetched, or if the next reset() will
+        reboot the game anyway.
+
+        The game is abandoned, so the env must be reset before it's stepped again.
+        Called automatically when a game ends if prefetch_runs is set.
+        """
+
+        if self._prefetch is not None or self._prefetched is not None:
+            return
+        if self.communicator is None or self.prng is None or self.reset_count == 0:
+            return
+
+        self._final_observation = self.observation_cache.get()
+        self._pending_actions = []
+        self._trie_node = None
+
+        if self._fixed_sts_seed is not None:
+            self._prefetch_sts_seed = self._fixed_sts_seed
+            self._prefetch_rng_state = None
+        else:
+            # Leave the env's PRNG alone until the run is used
+            prng = random.Random()
+            prng.setstate(self.prng.getstate())
+            self._prefetch_sts_seed = SeedHelpers.make_seed(prng)
+            self._prefetch_rng_state = prng.getstate()
+
+        if self._prefetch_executor is None:
+            self._prefetch_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="sts-prefetch"
+            )
+        logger.debug(f"Prefetching run {self._prefetch_sts_seed}")
+        self._prefetch = self._prefetch_executor.submit(
+            self._prefetch_run, self._prefetch_sts_seed
+        )
+
+    def _finish_prefetch(self) -> None:
+        """
+        Wait for any run being prefetched, since it's using the game. If it
+        succeeded, its Neow observation is kept for the next reset().
+        """
+
+        if self._prefetch is None:
+            return
+
+        future = self._prefetch
+        self._prefetch = None
+        try:
+            self._prefetched = future.result()
+        except Exception:
+            logger.exception("Failed to prefetch a run, rebooting at the next reset")
+            self.reset_count = 0
+            self._fresh_boot = False
+
+    def _can_use_prefetched(
+        self, params: ResetParams, requested_sts_seed: Optional[str]
+    ) -> bool:
+        if params.seed is not None or params.rng_state is not None:
+            return False
+        if self._prefetch_rng_state is None:
+            # Prefetched with the seed the last reset was given
+            return requested_sts_seed == self._prefetch_sts_seed
+        return requested_sts_seed is None
 
     def start(self) -> None:
+        self.launch()
+        self.await_ready()
+
+    def launch(self) -> None:
+        """
+        Start the game without waiting for it to boot. Must be followed by
+        await_ready(). start() does both.
+        """
+
+        self.memory_monitor.reset()
+
+        # Create the transport first, so it's ready whenever the game connects
+        self._transport = self._make_transport()
+        self._transport.prepare()
+
         if self.headless:
             self._run_container()
         else:
             self._run_locally()
 
+    def await_ready(self) -> None:
+        """
+        Block until a game started by launch() has connected.
+        """
+
+        if self._transport is None:
+            raise RuntimeError("Game not launched")
+
         logger.debug("Opening pipe files...")
-        self.communicator = Communicator(self.input_path, self.output_path)
+        self.communicator = Communicator(
+            self._transport,
+            decoder=self.message_decoder,
+            sequenced=self.sequence_messages,
+            watchdog=self.watchdog,
+            timeouts=self.timeouts,
+        )
+        self._transport = None
         logger.debug("Opened pipe files.")
 
         self._ready()
         self.communicator.render(self.animate)
+        self._fresh_boot = True
+
+    def _await_valid_actions(self, obs: Observation) -> Observation:
+        for _ in range(10):
+            if len(obs.valid_actions) > 0:
+                return obs
+
+            # this can indicate instability
+            self.counters["stability_retries"] += 1
+            time.sleep(1)
+            obs = self.observe()
+
+        raise exceptions.StSError("No valid actions.")
+
+    def _catch_up(self) -> None:
+        """
+        Send the game the actions that were answered by the transposition cache.
+        """
+
+        if not self._pending_actions:
+            return
+
+        pending = self._pending_actions
+        start = self._catch_up_start
+        self._pending_actions = []
+        self._catch_up_start = None
+        logger.debug(f"Catching up {len(pending)} cached actions")
+
+        expected = self.observation_cache.get()
+        assert start is not None and expected is not None
+        # Starting from the game's actual state, so that if every action is rejected
+        # the result is compared against the state before them
+        obs = self._replay(start, pending)
+
+        if not self._same_observation(obs, expected):
+            self.counters["transposition_mismatches"] += 1
+            logger.warning("Game diverged from the transposition cache")
+
+        # Later commands should be based on the game's own state
+        self.observation_cache.append(obs)
+
+    def _root_transpositions(self, obs: Observation, setup: str = "") -> None:
+        """
+        Follow the transposition cache from obs, the start of an episode. Subclasses
+        that change the game after reset() without taking actions (e.g. with basemod
+        commands) call this again once they're done, describing the changes in setup,
+        so episodes with different setups don't share cached states.
+        """
+
+        if self.transposition_cache is not None:
+            assert self.sts_seed is not None
+            self._trie_node = self.transposition_cache.root(
+                self.sts_seed, self.ascension, obs.state, setup
+            )
+
+    def _encode(self, obs: Observation) -> dict:
+        if self.observation_buffers is not None:
+            return obs.serialize_into(self.observation_buffers)
+        return obs.serialize(self.observation_config)
+
+    def _same_observation(self, a: Observation, b: Observation) -> bool:
+        # Card uuids differ between runs, so compare the encoded observations
+        a_flat = gym.spaces.flatten(
+            self.observation_space, a.serialize(self.observation_config)
+        )
+        b_flat = gym.spaces.flatten(
+            self.observation_space, b.serialize(self.observation_config)
+        )
+        return np.array_equal(a_flat, b_flat)
+
+    def _replay(
+        self,
+        obs: Observation,
+        actions: Sequence[int],
+        checkpoints: Optional[dict[int, Observation]] = None,
+    ) -> Observation:
+        """
+        Send actions to the game as fast as it accepts them, starting from obs.
+        Returns the observation after the last action.
+
+        Only checks that the game is ready for another action in between, which is
+        much cheaper than working out the valid actions. Rejected actions are skipped,
+        like in step().
+        """
+
+        checkpoints = checkpoints or {}
+        for i, action_id in enumerate(actions, start=1):
+            result = self.communicator._manual_command(ACTIONS[action_id].to_command())
+
+            if not result.has_error:
+                obs = result
+                deadline = time.monotonic() + START_TIMEOUT
+                while not accepts_actions(obs):
+                    if time.monotonic() > deadline:
+                        raise exceptions.StSError(f"No valid actions after action {i}")
+                    self.counters["stability_retries"] += 1
+                    time.sleep(0.05)
+                    obs = self._observe()
+
+            expected = checkpoints.get(i)
+            if expected is not None and not self._same_observation(obs, expected):
+                raise exceptions.StSError(
+                    f"Replay diverged from checkpoint after action {i}"
+                )
+
+        return obs
+
+    def fast_forward(
+        self,
+        sts_seed: str,
+        actions: Sequence[int],
+        checkpoints: Optional[dict[int, Observation]] = None,
+    ) -> Tuple[dict, dict]:
+        """
+        Start a run with the given seed and replay a known list of actions, e.g. to
+        reproduce a bug or resume a logged run. Returns the final observation and info,
+        like reset().
+
+        Unlike step(), the states in between aren't validated, encoded, rewarded or
+        logged, so replays are limited by the game's speed rather than the env's.
+
+        Args:
+            sts_seed: The game seed the actions were recorded with.
+            actions: Action ids, as passed to step(). Actions the game rejects are
+                skipped, since they didn't change the state when recorded either.
+            checkpoints: Maps a number of actions to the observation expected after
+                that many, e.g. Observation(state) for a state logged by log_states.
+                Raises StSError if the game doesn't match.
+        """
+
+        _, info = self.reset(options={"sts_seed": sts_seed})
+        self._trie_node = None
+
+        start_obs = self.observation_cache.get()
+        assert start_obs is not None
+        obs = self._replay(start_obs, actions, checkpoints)
+        self.observation_cache.append(obs)
+
+        info["observation"] = obs
+        return self._encode(obs), info
+
+    def _cached_step(self, action_id: int) -> Optional[tuple]:
+        """
+        The result of step() if it's in the transposition cache.
+        """
+
+        cache = self.transposition_cache
+        if cache is None or self._trie_node is None:
+            return None
+
+        node = cache.lookup(self._trie_node, action_id)
+        if node is None:
+            return None
+
+        prev_obs = self.observation_cache.get()
+        assert prev_obs is not None
+
+        if node.had_error:
+            reward = -1.0
+            obs = prev_obs
+        else:
+            obs = Observation(cache.state(node))
+            reward = self.value_fn(obs) - self.value_fn(prev_obs)
+            if not self._pending_actions:
+                self._catch_up_start = prev_obs
+            self._pending_actions.append(action_id)
+
+            if self.log_states:
+                self.state_logger.log(ACTIONS[action_id], reward, obs)
+
+            self.observation_cache.append(obs)
+
+        self._trie_node = node.id
+        info = {
+            "observation": obs,
+            "had_error": node.had_error,
+            "cached": True,
+        }
+
+        if obs.game_over and self.prefetch_runs:
+            self.prefetch()
+
+        return (
+            self._encode(obs),
+            reward,
+            obs.game_over,
+            False,
+            info,
+        )
 
     def step(self, action_id: int) -> Tuple[dict, float, bool, bool, dict]:
+        self._finish_prefetch()
+
+        cached = self._cached_step(action_id)
+        if cached is not None:
+            return cached
+
         prev_obs = self.observation_cache.get()
         assert prev_obs is not None  # should have been set by reset()
 
         action = ACTIONS[action_id]
-        is_valid = validate(action, prev_obs)
 
         try:
+            # The game may be behind the observations served from the cache
+            if self._pending_actions:
+                self._catch_up()
+                prev_obs = self.observation_cache.get()
+                assert prev_obs is not None
+
+            is_valid = validate(action, prev_obs)
             obs = self.communicator._manual_command(action.to_command())
 
             if obs.has_error == is_valid:
                 # indicates a mismatch in our action validity checking
+                self.counters["desyncs"] += 1
                 logger.error(
                     "Action was %svalid, but obs %s an error.",
                     "" if is_valid else "in",
@@ -452,17 +1127,7 @@ class SlayTheSpireGymEnv(gym.Env):
                 # the error field?
                 obs = prev_obs
             else:
-                success = False
-                for _ in range(10):
-                    if len(obs.valid_actions) == 0:
-                        # this can indicate instability
-                        time.sleep(1)
-                        obs = self.observe()
-                    else:
-                        success = True
-                        break
-                if not success:
-                    raise exceptions.StSError("No valid actions.")
+                obs = self._await_valid_actions(obs)
 
                 reward = self.value_fn(obs) - self.value_fn(prev_obs)
 
@@ -472,12 +1137,26 @@ class SlayTheSpireGymEnv(gym.Env):
 
                 self.observation_cache.append(obs)
 
+            if self.transposition_cache is not None and self._trie_node is not None:
+                self._trie_node = self.transposition_cache.insert(
+                    self._trie_node, action_id, obs.state, had_error
+                )
+
             info = {
                 "observation": obs,
                 "had_error": had_error,
             }
 
-            return obs.serialize(), reward, obs.game_over, False, info
+            if obs.game_over and self.prefetch_runs:
+                self.prefetch()
+
+            return (
+                self._encode(obs),
+                reward,
+                obs.game_over,
+                False,
+                info,
+            )
 
         except Exception as e:
             logger.error(e)
@@ -504,6 +1183,8 @@ class SlayTheSpireGymEnv(gym.Env):
                 raise e
 
             # Reboot and return done=True to trigger a reset
+            self._pending_actions = []
+            self._trie_node = None
             self.reboot()
             obs = prev_obs
 
@@ -513,7 +1194,7 @@ class SlayTheSpireGymEnv(gym.Env):
                 "reboot_error": e,
             }
 
-            return obs.serialize(), 0.0, True, False, info
+            return self._encode(obs), 0.0, True, False, info
 
     def screenshot(self, filename: str) -> None:
         """
@@ -522,6 +1203,8 @@ class SlayTheSpireGymEnv(gym.Env):
         if self.container is None:
             raise NotImplementedError("screenshot only works with headless=True")
 
+        self._finish_prefetch()
+
         # Briefly enable animation ahead of screenshotting
         prev_setting = self.animate
         if not self.animate:
@@ -547,12 +1230,23 @@ class SlayTheSpireGymEnv(gym.Env):
         Terminate the current game process.
         """
 
+        self._finish_prefetch()
+        self._prefetched = None
+        if self.communicator is not None:
+            self.communicator.close()
+            self.communicator = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        self._fresh_boot = False
+
         if self.headless:
             if self.container is not None:
-                logger.debug(f"Stopping container {self.container.name}")
-                self.container.rename(f"{self.container.name}-stopping")
-                self.container.stop()
-                self.container.wait()
+                # Free the name for the replacement. Suffixed, since an earlier
+                # container may still be stopping under the same name.
+                suffix = "".join(random.choices(string.ascii_lowercase, k=4))
+                self.container.rename(f"{self.container.name}-stopping-{suffix}")
+                self.reaper.reap(self.container)
                 self.container = None
             else:
                 logger.debug("No container to stop")
@@ -578,6 +1272,10 @@ class SlayTheSpireGymEnv(gym.Env):
         """
 
         self.stop()
+        self.reaper.wait()
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown()
+            self._prefetch_executor = None
 
         if self._temp_dir is not None:
             self._temp_dir.cleanup()
@@ -0,0 +1,98 @@
+"""
+Bring up many headless envs at once.
+
+Booting a game takes a while, so starting envs one after another makes a training
+job's startup time grow with the number of envs. launch_fleet() starts every game
+concurrently instead, sharing a single Docker client, and hands envs back as soon as
+each is ready, so startup takes about as long as a single boot.
+
+Example:
+
+    envs = list(launch_fleet(32, lib_dir, mods_dir, animate=False))
+"""
+
+import concurrent.futures
+from typing import Any, Iterator, Optional, Sequence
+
+import docker
+
+from gym_sts.envs.base import SlayTheSpireGymEnv, verify_image
+from gym_sts.envs.resources import ResourceAllocation
+
+
+def _boot(env: SlayTheSpireGymEnv) -> SlayTheSpireGymEnv:
+    env.launch()
+    env.await_ready()
+    return env
+
+
+def launch_fleet(
+    num_envs: int,
+    lib_dir: str,
+    mods_dir: str,
+    env_class: type[SlayTheSpireGymEnv] = SlayTheSpireGymEnv,
+    max_workers: Optional[int] = None,
+    resources: Optional[Sequence[ResourceAllocation]] = None,
+    docker_client: Optional[docker.DockerClient] = None,
+    **env_kwargs: Any,
+) -> Iterator[SlayTheSpireGymEnv]:
+    """
+    Boot num_envs headless envs concurrently, yielding each once its game is ready.
+
+    The envs have booted but haven't been reset, and their first reset doesn't boot
+    them again. If any game fails to boot, the envs that haven't been yielded yet are
+    closed and the error is raised.
+
+    Args:
+        env_class: SlayTheSpireGymEnv or a subclass.
+        max_workers: How many games may be booting at once. Defaults to all of them.
+        resources: One allocation per env, e.g. from CoreAllocator.allocate_all().
+            Envs don't pin their workers. A process that drives a single env can
+            call env.resources.pin_worker() itself.
+        docker_client: Shared by every env. Defaults to a new client from the
+            environment, with a connection pool large enough for every worker.
+        env_kwargs: Passed to each env.
+    """
+
+    if resources is not None and len(resources) != num_envs:
+        raise ValueError("Provide exactly one resource allocation per env")
+
+    max_workers = max_workers or num_envs
+    if docker_client is None:
+        docker_client = docker.from_env(max_pool_size=max(max_workers, 10))
+
+    # Fail before any envs are created if the image is missing
+    verify_image(docker_client)
+
+    envs = []
+    for i in range(num_envs):
+        env = env_class(
+            lib_dir,
+            mods_dir,
+            headless=True,
+            docker_client=docker_client,
+            resources=resources[i] if resources is not None else None,
+            **env_kwargs,
+        )
+        env._image_verified = True
+        envs.append(env)
+
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="sts-fleet"
+    )
+    futures = {executor.submit(_boot, env): env for env in envs}
+    yielded = set()
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            env = future.result()
+            yielded.add(env)
+            yield env
+    finally:
+        # Only has work to do if a boot failed or the caller stopped iterating early
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+        for env in envs:
+            if env not in yielded:
+                env.close()
@@ -0,0 +1,253 @@
+"""
+Measurements of a running game's resource usage.
+
+Memory measurements are used to decide when a long-running game should be rebooted.
+
+The game leaks memory over many runs, but how quickly depends on what's played, so
+rebooting every n resets either reboots healthy games or reacts too late to fast
+leaks. A MemoryMonitor instead compares samples taken at episode boundaries against
+an absolute limit and against the game's footprint shortly after it booted.
+
+CPU measurements tell a Watchdog whether an unresponsive game is busy or hung.
+"""
+
+import logging
+import os
+import pathlib
+import re
+import shutil
+import subprocess
+from typing import Optional, Union
+
+import docker
+from docker.models.containers import Container
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+PROC_DIR = pathlib.Path("/proc")
+
+_SIZE_UNITS = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30}
+
+
+def parse_size(size: Union[int, str]) -> int:
+    """
+    Convert a size like 1024, "512m" or "2g" to bytes, using Docker's conventions.
+    """
+
+    if isinstance(size, int):
+        return size
+
+    match = re.fullmatch(r"(\d+)([kmg]?)b?", size.strip().lower())
+    if match is None:
+        raise ValueError(f"Invalid size {size}")
+    return int(match.group(1)) * _SIZE_UNITS[match.group(2)]
+
+
+class MemorySample(BaseModel):
+    """
+    Memory used by a game, in bytes. Values that couldn't be measured are None.
+    """
+
+    # Resident memory of the game's processes, or the container's working set
+    rss: Optional[int]
+    # Used JVM heap, if the JDK tools are available
+    heap_used: Optional[int]
+
+
+def _descendants(pid: int) -> list[int]:
+    pids = [pid]
+    for tasks in (PROC_DIR / str(pid) / "task").glob("*/children"):
+        try:
+            children = tasks.read_text().split()
+        except OSError:
+            continue
+        for child in children:
+            pids.extend(_descendants(int(child)))
+    return pids
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """
+    The total resident memory of a process and its descendants, read from /proc.
+    """
+
+    total = None
+    for p in _descendants(pid):
+        try:
+            status = (PROC_DIR / str(p) / "status").read_text()
+        except OSError:
+            continue
+
+        match = re.search(r"^VmRSS:\s+(\d+) kB", status, re.MULTILINE)
+        if match is not None:
+            total = (total or 0) + int(match.group(1)) * 1024
+
+    return total
+
+
+def process_cpu_time(pid: int) -> Optional[float]:
+    """
+    The CPU seconds used by a process and its descendants so far, read from /proc.
+    """
+
+    ticks_per_second = os.sysconf("SC_CLK_TCK")
+
+    total = None
+    for p in _descendants(pid):
+        try:
+            stat = (PROC_DIR / str(p) / "stat").read_text()
+        except OSError:
+            continue
+
+        # The command name may contain spaces, so split after its closing paren.
+        # utime and stime are the 14th and 15th fields.
+        fields = stat.rpartition(")")[2].split()
+        total = (total or 0) + (int(fields[11]) + int(fields[12])) / ticks_per_second
+
+    return total
+
+
+def jvm_heap_used(pid: int) -> Optional[int]:
+    """
+    The heap used by a local JVM, according to jstat. jstat ships with the JDK rather
+    than the JRE, so this returns None when it's not installed.
+    """
+
+    jstat = shutil.which("jstat")
+    if jstat is None:
+        return None
+
+    try:
+        output = subprocess.run(
+            [jstat, "-gc", str(pid)],
+            capture_output=True,
+            check=True,
+            text=True,
+            timeout=5,
+        ).stdout
+        header, values = output.strip().splitlines()[-2:]
+        stats = dict(zip(header.split(), values.split()))
+        # Survivor, eden and old generation usage, in KB
+        used = sum(float(stats[k]) for k in ["S0U", "S1U", "EU", "OU"])
+    except (OSError, subprocess.SubprocessError, KeyError, ValueError):
+        logger.debug(f"Failed to read the heap of JVM {pid}", exc_info=True)
+        return None
+
+    return int(used * 1024)
+
+
+def container_stats(container: Container) -> Optional[dict]:
+    """
+    A snapshot of `docker stats` for a container, or None if it couldn't be read.
+    """
+
+    try:
+        try:
+            # Skips waiting for a second sample, but needs docker-py 6+
+            return container.stats(stream=False, one_shot=True)
+        except (TypeError, docker.errors.InvalidVersion):
+            return container.stats(stream=False)
+    except docker.errors.APIError:
+        logger.debug(f"Failed to read stats of {container.name}", exc_info=True)
+        return None
+
+
+def container_memory(container: Container) -> Optional[int]:
+    """
+    A container's working set as reported by `docker stats`, i.e. its memory usage
+    minus reclaimable page cache.
+    """
+
+    stats = container_stats(container)
+    if stats is None:
+        return None
+
+    memory = stats.get("memory_stats", {})
+    if "usage" not in memory:
+        return None
+
+    # cgroup v2 reports inactive_file, v1 reports cache
+    details = memory.get("stats", {})
+    reclaimable = details.get("inactive_file", details.get("cache", 0))
+    return memory["usage"] - reclaimable
+
+
+def container_cpu_time(container: Container) -> Optional[float]:
+    """
+    The CPU seconds used by a container so far.
+    """
+
+    stats = container_stats(container)
+    if stats is None:
+        return None
+
+    usage = stats.get("cpu_stats", {}).get("cpu_usage", {}).get("total_usage")
+    if usage is None:
+        return None
+    return usage / 1e9
+
+
+def container_is_running(container: Container) -> bool:
+    try:
+        container.reload()
+    except docker.errors.NotFound:
+        return False
+    return container.status == "running"
+
+
+class MemoryMonitor:
+    """
+    Decides when a game has grown enough to be rebooted.
+    """
+
+    def __init__(
+        self,
+        limit: Union[int, str, None] = None,
+        growth_limit: Union[int, str, None] = None,
+    ):
+        """
+        Args:
+            limit: Reboot once the game uses more than this much memory.
+            growth_limit: Reboot once the game uses this much more memory than at the
+                first sample after it booted.
+        """
+
+        self.limit = None if limit is None else parse_size(limit)
+        self.growth_limit = None if growth_limit is None else parse_size(growth_limit)
+        self.baseline: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit is not None or self.growth_limit is not None
+
+    def reset(self) -> None:
+        """
+        Forget the baseline, e.g. because the game was rebooted.
+        """
+
+        self.baseline = None
+
+    def exceeded(self, sample: MemorySample) -> bool:
+        """
+        Whether the sample crosses a limit. The first sample after a reset becomes the
+        baseline for growth.
+        """
+
+        if sample.rss is None:
+            return False
+
+        if self.baseline is None:
+            self.baseline = sample.rss
+
+        if self.limit is not None and sample.rss > self.limit:
+            logger.info(f"Game uses {sample.rss} bytes, over the limit of {self.limit}")
+            return True
+
+        growth = sample.rss - self.baseline
+        if self.growth_limit is not None and growth > self.growth_limit:
+            logger.info(f"Game grew by {growth} bytes since it booted")
+            return True
+
+        return False
@@ -0,0 +1,80 @@
+import concurrent.futures
+import logging
+
+import docker
+from docker.models.containers import Container
+
+
+logger = logging.getLogger(__name__)
+
+
+class Reaper:
+    """
+    Tears down containers in the background, so a replacement can boot while the old
+    container is still shutting down.
+    """
+
+    def __init__(self, max_pending: int = 2, fast_kill: bool = False):
+        """
+        Args:
+            max_pending: How many containers may be shutting down at once. If the limit
+                is reached, reap() blocks until the oldest is gone. 0 makes reap()
+                synchronous.
+            fast_kill: Kill containers immediately instead of giving them Docker's
+                grace period. Containers only hold disposable state, so this is safe
+                unless something inside them should be flushed to disk first.
+        """
+
+        if max_pending < 0:
+            raise ValueError("max_pending can't be negative")
+
+        self.max_pending = max_pending
+        self.fast_kill = fast_kill
+        self.pending: list[concurrent.futures.Future] = []
+        self._executor = None
+        if max_pending > 0:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_pending, thread_name_prefix="sts-reaper"
+            )
+
+    def _teardown(self, container: Container) -> None:
+        logger.debug(f"Stopping container {container.name}")
+        try:
+            if self.fast_kill:
+                container.kill()
+            else:
+                container.stop()
+            container.wait()
+        except docker.errors.NotFound:
+            # Containers are run with remove=True, so they may be gone already
+            pass
+        except docker.errors.APIError:
+            logger.exception(f"Failed to stop container {container.name}")
+        logger.debug(f"Stopped container {container.name}")
+
+    def reap(self, container: Container) -> None:
+        """
+        Stop a container, without waiting for it unless too many are pending.
+        """
+
+        if self._executor is None:
+            self._teardown(container)
+            return
+
+        self.pending = [f for f in self.pending if not f.done()]
+        if len(self.pending) >= self.max_pending:
+            logger.debug("Too many containers shutting down, waiting for one")
+            concurrent.futures.wait(
+                self.pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            self.pending = [f for f in self.pending if not f.done()]
+
+        self.pending.append(self._executor.submit(self._teardown, container))
+
+    def wait(self) -> None:
+        """
+        Block until every pending container has stopped.
+        """
+
+        concurrent.futures.wait(self.pending)
+        self.pending = []
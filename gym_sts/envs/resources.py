@@ -0,0 +1,300 @@
+"""
+CPU and memory budgets for packing many games onto one host.
+
+Left alone, the JVMs, Xvfb servers and Python workers of every env on a host compete
+for every core, and throughput stops scaling long before the cores run out. A
+CoreAllocator hands each env whole physical cores instead. The game's container is
+confined to them, and the Python worker that talks to it can be pinned to one of their
+SMT siblings, so the two sides of every message exchange share a core's caches.
+
+Example:
+
+    allocator = CoreAllocator()
+    envs = [
+        SlayTheSpireGymEnv(lib_dir, mods_dir, headless=True, resources=allocation)
+        for allocation in allocator.allocate_all(mem_limit="2g")
+    ]
+
+Envs don't pin their workers, since an env may be driven by any thread of a shared
+pool (e.g. ThreadedVectorEnv's). With one env per worker process, call
+allocation.pin_worker() once when the process starts, e.g. in RLlib's env creator.
+
+A CoreAllocator only tracks the cores it handed out in its own process. Separate
+worker processes, e.g. RLlib's rollout workers, should use allocate_worker() instead,
+which derives each worker's cores from its index.
+"""
+
+import os
+import pathlib
+from typing import Iterable, Optional
+
+from pydantic import BaseModel, validator
+
+
+SYSFS_CPU_DIR = pathlib.Path("/sys/devices/system/cpu")
+
+
+def parse_cpu_list(cpu_list: str) -> list[int]:
+    """
+    Parse the kernel's CPU list format, e.g. "0-3,8,10-11".
+    """
+
+    cpus = []
+    for part in cpu_list.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def format_cpu_list(cpus: Iterable[int]) -> str:
+    """
+    The inverse of parse_cpu_list(), e.g. for Docker's cpuset_cpus. Ranges aren't
+    collapsed, which the kernel doesn't require.
+    """
+
+    return ",".join(str(cpu) for cpu in sorted(cpus))
+
+
+def physical_cores(cpus: Optional[Iterable[int]] = None) -> list[list[int]]:
+    """
+    Group logical CPUs by the physical core they belong to.
+
+    Args:
+        cpus: The logical CPUs to consider. Defaults to those this process may run on.
+
+    Returns a list of cores, each a sorted list of logical CPUs. If the topology isn't
+    available, each CPU is assumed to be its own core.
+    """
+
+    if cpus is None:
+        cpus = os.sched_getaffinity(0)
+    available = set(cpus)
+
+    cores: list[list[int]] = []
+    seen: set[int] = set()
+    for cpu in sorted(available):
+        if cpu in seen:
+            continue
+
+        siblings_file = (
+            SYSFS_CPU_DIR / f"cpu{cpu}" / "topology" / "thread_siblings_list"
+        )
+        try:
+            siblings = parse_cpu_list(siblings_file.read_text())
+        except OSError:
+            siblings = [cpu]
+
+        core = sorted(available.intersection(siblings) | {cpu})
+        seen.update(core)
+        cores.append(core)
+
+    return cores
+
+
+class ResourceAllocation(BaseModel):
+    """
+    The resources one env's game and worker may use. Every field is optional, and
+    unset fields are left unrestricted.
+    """
+
+    # Logical CPUs the game may run on
+    game_cpus: Optional[list[int]]
+    # Logical CPUs for the Python process driving the env. See pin_worker().
+    worker_cpus: Optional[list[int]]
+    # A CPU time quota for the game, in (possibly fractional) CPUs
+    cpus: Optional[float]
+    # A memory limit for the game's container, in Docker's format, e.g. "2g"
+    mem_limit: Optional[str]
+
+    @validator("game_cpus", "worker_cpus")
+    def cpus_are_not_empty(cls, v):
+        if v is not None and len(v) == 0:
+            raise ValueError("At least one CPU must be provided")
+        return v
+
+    @validator("cpus")
+    def quota_is_positive(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("cpus must be positive")
+        return v
+
+    def container_kwargs(self) -> dict:
+        """
+        Keyword arguments for docker's containers.run().
+        """
+
+        kwargs: dict = {}
+        if self.game_cpus is not None:
+            kwargs["cpuset_cpus"] = format_cpu_list(self.game_cpus)
+        if self.cpus is not None:
+            kwargs["nano_cpus"] = int(self.cpus * 1e9)
+        if self.mem_limit is not None:
+            kwargs["mem_limit"] = self.mem_limit
+        return kwargs
+
+    def pin_game(self) -> None:
+        """
+        Restrict the calling process to game_cpus. Intended as a preexec_fn for games
+        run locally.
+
+        preexec_fn isn't safe when the parent has other threads: the child may
+        deadlock on a lock another thread held when it forked. This only makes a
+        system call, which takes no locks, but callers shouldn't add anything to it.
+        """
+
+        if self.game_cpus is not None:
+            os.sched_setaffinity(0, self.game_cpus)
+
+    def pin_worker(self) -> None:
+        """
+        Restrict the calling process to worker_cpus. Call it once per worker process,
+        ideally before it starts any threads, which inherit the affinity of the
+        thread that creates them. Threads that already exist are pinned too.
+        """
+
+        if self.worker_cpus is None:
+            return
+
+        # sched_setaffinity(0) only applies to the calling thread
+        try:
+            thread_ids = [int(tid) for tid in os.listdir("/proc/self/task")]
+        except OSError:
+            thread_ids = [0]
+
+        for thread_id in thread_ids:
+            try:
+                os.sched_setaffinity(thread_id, self.worker_cpus)
+            except ProcessLookupError:
+                pass  # The thread has exited
+
+
+class CoreAllocator:
+    """
+    Hands out disjoint sets of physical cores, one set per env.
+
+    When a core has SMT siblings, the last logical CPU of each allocation is reserved
+    for the env's worker and the rest go to the game. Otherwise the worker shares the
+    game's CPUs, since cores are too scarce to dedicate one to a mostly idle worker.
+    """
+
+    def __init__(
+        self,
+        cores_per_game: int = 1,
+        cpus: Optional[Iterable[int]] = None,
+    ):
+        """
+        Args:
+            cores_per_game: Physical cores given to each env.
+            cpus: The logical CPUs to allocate from. Defaults to those this process may
+                run on.
+        """
+
+        if cores_per_game < 1:
+            raise ValueError("cores_per_game must be at least 1")
+
+        self.cores_per_game = cores_per_game
+        self.free_cores = physical_cores(cpus)
+
+    @property
+    def capacity(self) -> int:
+        """
+        How many more allocations can be made.
+        """
+
+        return len(self.free_cores) // self.cores_per_game
+
+    def allocate(
+        self, cpus: Optional[float] = None, mem_limit: Optional[str] = None
+    ) -> ResourceAllocation:
+        """
+        Allocate cores for one env.
+
+        Args:
+            cpus: See ResourceAllocation.
+            mem_limit: See ResourceAllocation.
+        """
+
+        if self.capacity == 0:
+            raise RuntimeError("No free cores left to allocate")
+
+        cores = self.free_cores[: self.cores_per_game]
+        del self.free_cores[: self.cores_per_game]
+        return _allocate_cores(cores, cpus, mem_limit)
+
+    def allocate_all(
+        self, cpus: Optional[float] = None, mem_limit: Optional[str] = None
+    ) -> list[ResourceAllocation]:
+        """
+        Allocate every remaining core, one allocation per env.
+        """
+
+        return [self.allocate(cpus, mem_limit) for _ in range(self.capacity)]
+
+    def release(self, allocation: ResourceAllocation) -> None:
+        """
+        Return an allocation's cores so they can be handed out again.
+        """
+
+        cpus = set(allocation.game_cpus or []) | set(allocation.worker_cpus or [])
+        self.free_cores.extend(physical_cores(cpus))
+        self.free_cores.sort()
+
+
+def _allocate_cores(
+    cores: list[list[int]], cpus: Optional[float], mem_limit: Optional[str]
+) -> ResourceAllocation:
+    # See CoreAllocator for how the cores are split between the game and its worker
+    logical = [cpu for core in cores for cpu in core]
+    if len(cores[-1]) > 1:
+        game_cpus, worker_cpus = logical[:-1], logical[-1:]
+    else:
+        game_cpus, worker_cpus = logical, logical
+
+    return ResourceAllocation(
+        game_cpus=game_cpus,
+        worker_cpus=worker_cpus,
+        cpus=cpus,
+        mem_limit=mem_limit,
+    )
+
+
+def allocate_worker(
+    worker_index: int,
+    num_games: int = 1,
+    cores_per_game: int = 1,
+    cpus: Optional[Iterable[int]] = None,
+) -> list[ResourceAllocation]:
+    """
+    Allocate cores for the games of one of several worker processes, without any
+    shared state. Worker i gets the allocations a CoreAllocator would hand out after
+    i * num_games others, so workers get disjoint cores as long as they all pass the
+    same num_games, cores_per_game and cpus.
+
+    Args:
+        worker_index: The worker's index, e.g. RLlib's EnvContext.worker_index.
+        num_games: How many games every worker runs.
+        cores_per_game: See CoreAllocator.
+        cpus: See CoreAllocator. Since the default depends on the process's
+            affinity, allocate before pinning anything.
+    """
+
+    if worker_index < 0:
+        raise ValueError("worker_index must not be negative")
+    if num_games < 1 or cores_per_game < 1:
+        raise ValueError("num_games and cores_per_game must be at least 1")
+
+    cores = physical_cores(cpus)
+    first = worker_index * num_games
+    if (first + num_games) * cores_per_game > len(cores):
+        raise RuntimeError(f"Not enough cores for worker {worker_index}")
+
+    allocations = []
+    for game in range(first, first + num_games):
+        start, end = game * cores_per_game, (game + 1) * cores_per_game
+        allocations.append(_allocate_cores(cores[start:end], None, None))
+    return allocations
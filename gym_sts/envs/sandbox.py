@@ -0,0 +1,88 @@
+"""
+The directory a local game runs in.
+
+The game's jars are large and never modified, so rather than copying them into the
+sandbox on every boot, they're linked into it once. Hardlinks are used where possible,
+and symlinks when the sandbox is on another filesystem. The sandbox records a
+fingerprint of what it was built from, so later boots skip linking unless the sources
+changed.
+"""
+
+import hashlib
+import logging
+import os
+import pathlib
+
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_FILE = ".sandbox_fingerprint"
+
+
+def fingerprint(sources: dict[pathlib.Path, pathlib.Path]) -> str:
+    """
+    Identifies the contents of the source directories by each file's path, size and
+    modification time, which is enough to notice replaced jars without reading them.
+
+    Args:
+        sources: Maps source directories to where they're linked in the sandbox.
+    """
+
+    digest = hashlib.sha256()
+    for source, dest in sorted(sources.items()):
+        digest.update(f"{source}\0{dest}\0".encode())
+        for path in sorted(source.rglob("*")):
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            relative = path.relative_to(source)
+            digest.update(f"{relative}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    return digest.hexdigest()
+
+
+def link_tree(source: pathlib.Path, dest: pathlib.Path) -> None:
+    """
+    Mirror source's directories in dest, and link each of its files there, replacing
+    existing files. Files in dest that aren't in source are left alone.
+    """
+
+    dest.mkdir(parents=True, exist_ok=True)
+    for path in source.rglob("*"):
+        target = dest / path.relative_to(source)
+        if path.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+            continue
+
+        if target.exists() or target.is_symlink():
+            target.unlink()
+        try:
+            os.link(path, target)
+        except OSError:
+            # e.g. the sandbox is on another filesystem
+            target.symlink_to(path.resolve())
+
+
+def link_sandbox(
+    sandbox: pathlib.Path, sources: dict[pathlib.Path, pathlib.Path]
+) -> bool:
+    """
+    Link read-only sources into the sandbox, unless it was already built from them.
+
+    Args:
+        sources: Maps source directories to the sandbox paths they're linked at,
+            relative to the sandbox.
+
+    Returns whether the sandbox had to be (re)built.
+    """
+
+    key = fingerprint(sources)
+    marker = sandbox / FINGERPRINT_FILE
+    if marker.exists() and marker.read_text() == key:
+        return False
+
+    logger.debug(f"Building sandbox {sandbox}")
+    for source, dest in sources.items():
+        link_tree(source, sandbox / dest)
+
+    marker.write_text(key)
+    return True
@@ -27,19 +27,20 @@ class SingleCombatSTSEnv(SlayTheSpireGymEnv):
         # prng should have already been set in super().reset
         assert self.prng is not None
 
-        self.communicator.basemod("deck remove all")
-
-        for card in self.cards:
-            self.communicator.basemod(f"deck add {card}")
-
-        for relic in self.add_relics:
-            self.communicator.basemod(f"relic add {relic}")
-
         enemy = self.prng.choice(self.enemies)
-        obs = self.communicator.basemod(f"fight {enemy}")
+        commands = [
+            "deck remove all",
+            *[f"deck add {card}" for card in self.cards],
+            *[f"relic add {relic}" for relic in self.add_relics],
+            f"fight {enemy}",
+        ]
+        for command in commands:
+            obs = self.communicator.basemod(command)
 
         assert obs.in_combat
         self.observation_cache.append(obs)
+        # Cached steps depend on the fight, not just the seed
+        self._root_transpositions(obs, setup="\n".join(commands))
 
         info = {
             "seed": self.seed,
@@ -47,7 +48,7 @@ class SingleCombatSTSEnv(SlayTheSpireGymEnv):
             "rng_state": self.prng.getstate(),
             "observation": obs,
         }
-        return obs.serialize(), info
+        return self._encode(obs), info
 
     def step(self, action_id: int):
         ser, reward, should_reset, truncated, info = super().step(action_id)
@@ -56,4 +57,8 @@ class SingleCombatSTSEnv(SlayTheSpireGymEnv):
         if not info["observation"].in_combat:
             should_reset = True
 
+        # The base env only prefetches when the whole game is over
+        if should_reset and self.prefetch_runs:
+            self.prefetch()
+
         return ser, reward, should_reset, truncated, info
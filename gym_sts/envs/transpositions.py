@@ -0,0 +1,251 @@
+"""
+A cache of observations reached by replaying known action sequences.
+
+Games are deterministic given their seed, ascension and the actions taken, and many
+workloads replay the same prefixes over and over, e.g. every run on a fixed seed starts
+with the same Neow event. A TranspositionCache stores every observation the env has
+seen in a trie keyed by (sts_seed, ascension, setup) and then by action ids, where
+setup describes anything done to the game other than actions (e.g. the commands
+SingleCombatSTSEnv sends to start a fight). The env can then serve a step from the
+cache instead of the game, and only catch the game up once the trajectory leaves the
+trie.
+"""
+
+import collections
+import gzip
+import json
+import logging
+import pathlib
+from typing import Any, Optional, Union
+
+from gym_sts.data.serialization import to_json
+
+
+logger = logging.getLogger(__name__)
+
+
+class Node:
+    __slots__ = ["id", "parent", "action", "had_error", "state", "children"]
+
+    def __init__(
+        self,
+        id: int,
+        parent: Optional[int],
+        action: Optional[int],
+        had_error: bool,
+        state: Optional[bytes],
+    ):
+        self.id = id
+        self.parent = parent
+        self.action = action
+        # Whether the game rejected the action, leaving the parent's state unchanged
+        self.had_error = had_error
+        # The game state reached, as JSON. For rejected actions, that's the parent's
+        # state, shared rather than copied, so it outlives the parent.
+        self.state = state
+        self.children: dict[int, int] = {}  # action id -> node id
+
+
+class TranspositionCache:
+    """
+    A bounded trie of game states. When full, the least recently used leaf is evicted.
+
+    Leaves rather than nodes, since a node's ancestors are always used less recently
+    than it (they're only touched on the way to it), but are still needed to reach
+    it. A parent whose last child is evicted becomes the least recently used leaf. If
+    the only leaf is the node just added, i.e. a single trajectory fills the cache,
+    its oldest node is evicted instead, and that node's children are orphaned: they
+    can no longer be looked up from a root, but still serve the trajectory.
+    """
+
+    def __init__(self, max_nodes: int = 100_000):
+        if max_nodes < 1:
+            raise ValueError("max_nodes must be positive")
+
+        self.max_nodes = max_nodes
+        self.nodes: collections.OrderedDict[int, Node] = collections.OrderedDict()
+        # Nodes without children, least recently used first
+        self.leaves: collections.OrderedDict[int, None] = collections.OrderedDict()
+        self.roots: dict[tuple[str, int, str], int] = {}
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self.nodes
+
+    def _add(self, node: Node) -> None:
+        self.nodes[node.id] = node
+        self.leaves[node.id] = None
+        if node.parent is not None:
+            self.leaves.pop(node.parent, None)
+        self._next_id = max(self._next_id, node.id + 1)
+
+        while len(self.nodes) > self.max_nodes:
+            self._evict_one(keep=node.id)
+
+    def _touch(self, node_id: int) -> None:
+        self.nodes.move_to_end(node_id)
+        if node_id in self.leaves:
+            self.leaves.move_to_end(node_id)
+
+    def _evict_one(self, keep: Optional[int] = None) -> None:
+        victim = next((i for i in self.leaves if i != keep), None)
+        if victim is None:
+            victim = next(i for i in self.nodes if i != keep)
+        self._remove(self.nodes[victim])
+
+    def _remove(self, node: Node) -> None:
+        del self.nodes[node.id]
+        self.leaves.pop(node.id, None)
+
+        if node.parent is None:
+            self.roots = {k: v for k, v in self.roots.items() if v != node.id}
+        elif node.parent in self.nodes:
+            parent = self.nodes[node.parent]
+            parent.children.pop(node.action, None)  # type: ignore
+            if not parent.children:
+                self.leaves[parent.id] = None
+                self.leaves.move_to_end(parent.id, last=False)
+
+        for child_id in node.children.values():
+            child = self.nodes.get(child_id)
+            if child is not None:
+                child.parent = None
+
+    def root(self, sts_seed: str, ascension: int, state: Any, setup: str = "") -> int:
+        """
+        Returns the id of the node for the start of a game, adding it if necessary.
+        """
+
+        key = (sts_seed, ascension, setup)
+        node_id = self.roots.get(key)
+        if node_id is not None and node_id in self.nodes:
+            self._touch(node_id)
+            return node_id
+
+        node = Node(self._next_id, None, None, False, self.encode(state))
+        self.roots[key] = node.id
+        self._add(node)
+        return node.id
+
+    def get(self, node_id: int) -> Optional[Node]:
+        return self.nodes.get(node_id)
+
+    def lookup(self, node_id: int, action: int) -> Optional[Node]:
+        """
+        Returns the node reached by taking an action from a node, if it's known.
+        """
+
+        node = self.nodes.get(node_id)
+        child_id = None if node is None else node.children.get(action)
+        if child_id is None or child_id not in self.nodes:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touch(child_id)
+        return self.nodes[child_id]
+
+    def insert(
+        self, node_id: int, action: int, state: Any, had_error: bool = False
+    ) -> Optional[int]:
+        """
+        Record the result of taking an action from a node. Returns the new node's id,
+        or None if the parent has been evicted.
+        """
+
+        parent = self.nodes.get(node_id)
+        if parent is None:
+            return None
+
+        node = Node(
+            self._next_id,
+            node_id,
+            action,
+            had_error,
+            parent.state if had_error else self.encode(state),
+        )
+        parent.children[action] = node.id
+        self._add(node)
+        return node.id
+
+    def state(self, node: Node) -> Any:
+        """
+        The game state at a node. For rejected actions, that's the parent's state.
+        """
+
+        assert node.state is not None
+        return json.loads(node.state)
+
+    @staticmethod
+    def encode(state: Any) -> bytes:
+        return json.dumps(state, default=to_json, separators=(",", ":")).encode()
+
+    def save(self, path: Union[str, pathlib.Path]) -> None:
+        """
+        Write the cache to a gzipped JSON lines file, least recently used first.
+        """
+
+        roots = {node_id: list(key) for key, node_id in self.roots.items()}
+        with gzip.open(path, "wt") as f:
+            for node in self.nodes.values():
+                header = {
+                    "id": node.id,
+                    "parent": node.parent,
+                    "action": node.action,
+                    "had_error": node.had_error,
+                    "root": roots.get(node.id),
+                }
+                state = "null" if node.state is None else node.state.decode()
+                f.write(json.dumps(header)[:-1] + f', "state": {state}}}\n')
+
+    @classmethod
+    def load(
+        cls, path: Union[str, pathlib.Path], max_nodes: int = 100_000
+    ) -> "TranspositionCache":
+        """
+        Read a cache written by save(). If it holds more than max_nodes, the least
+        recently used nodes are evicted.
+        """
+
+        cache = cls(max_nodes)
+        with gzip.open(path, "rt") as f:
+            for line in f:
+                data = json.loads(line)
+                state = data["state"]
+                node = Node(
+                    data["id"],
+                    data["parent"],
+                    data["action"],
+                    data["had_error"],
+                    None if state is None else cls.encode(state),
+                )
+                cache.nodes[node.id] = node
+                cache._next_id = max(cache._next_id, node.id + 1)
+
+                if data["root"] is not None:
+                    sts_seed, ascension, setup = data["root"]
+                    cache.roots[(sts_seed, ascension, setup)] = node.id
+
+        # Parents aren't necessarily saved before their children, since they may
+        # have been used less recently
+        for node in cache.nodes.values():
+            if node.parent in cache.nodes:
+                cache.nodes[node.parent].children[node.action] = node.id  # type: ignore
+            else:
+                node.parent = None
+
+        for node in cache.nodes.values():
+            if not node.children:
+                cache.leaves[node.id] = None
+
+        while len(cache.nodes) > max_nodes:
+            cache._evict_one()
+
+        logger.info(f"Loaded {len(cache)} cached states from {path}")
+        return cache
@@ -18,3 +18,28 @@ class ResetParams(BaseModel):
         if values.get("seed") is not None and v is not None:
             raise ValueError("seed and rng_state cannot both be provided")
         return v
+
+
+class SuperFastModeConfig(BaseModel):
+    """
+    Settings for the SuperFastMode mod, which speeds up the game by scaling the time
+    that passes each frame.
+    """
+
+    # Whether frame times are multiplied at all
+    delta_multiplied: bool = True
+    delta_multiplier: float = 100.0
+    # Skip interpolated movement, e.g. cards sliding into place
+    instant_lerp: bool = True
+
+    def to_properties(self) -> str:
+        """
+        The contents of SuperFastMode's config file.
+        """
+
+        return (
+            f"isDeltaMultiplied={str(self.delta_multiplied).lower()}\n"
+            f"deltaMultiplier={self.delta_multiplier}\n"
+            "EXISTS=YES INDEED I EXIST\n"
+            f"isInstantLerp={str(self.instant_lerp).lower()}\n"
+        )
@@ -0,0 +1,300 @@
+"""Reports the size of each part of an observation, and how long it takes to encode.
+
+For every component of the observation space and each of its fields, prints the
+flattened dimension (what a fully connected policy sees, with discrete values one-hot
+encoded) and the bytes of the encoded arrays by dtype, averaged over the states. For
+each component, also prints the time taken to parse it from the CommunicationMod
+state, to encode (serialize) it, and to decode (deserialize) the encoding.
+
+States are either synthetic combats or states logged with log_states=True:
+
+    python -m gym_sts.observation_report
+    python -m gym_sts.observation_report --states out/states/*.json
+    python -m gym_sts.observation_report --card_encoding sparse --effect_encoding sparse
+"""
+
+import argparse
+import collections
+import inspect
+import json
+import random
+import time
+from typing import Any, Optional
+
+import gymnasium as gym
+import numpy as np
+from pydantic import BaseModel
+
+import gym_sts.spaces.constants.combat as combat_consts
+from gym_sts.spaces.constants.cards import CardCatalog
+from gym_sts.spaces.observations import (
+    Observation,
+    ObservationConfig,
+    make_observation_space,
+)
+
+
+class FieldReport(BaseModel):
+    name: str
+    flatdim: int
+    # Mean bytes of the encoding, by dtype
+    nbytes: dict[str, float]
+    # Mean seconds per state. Only measured for whole components.
+    parse_time: Optional[float] = None
+    encode_time: Optional[float] = None
+    decode_time: Optional[float] = None
+
+    @property
+    def total_bytes(self) -> float:
+        return sum(self.nbytes.values())
+
+
+def _card(card_id: str, rng: random.Random) -> dict:
+    return {
+        "id": card_id,
+        "name": card_id,
+        "cost": rng.randint(0, 3),
+        "upgrades": rng.randint(0, 1),
+        "has_target": rng.random() < 0.5,
+        "exhausts": False,
+        "ethereal": False,
+        "uuid": "",
+        "type": "SKILL",
+        "rarity": "COMMON",
+        "misc": 0,
+        "is_playable": True,
+    }
+
+
+def _powers(rng: random.Random, max_powers: int) -> list[dict]:
+    effects = rng.sample(combat_consts.ALL_EFFECTS, rng.randint(0, max_powers))
+    return [{"id": e, "name": e, "amount": rng.randint(-5, 20)} for e in effects]
+
+
+def synthetic_state(rng: random.Random) -> dict:
+    """
+    A CommunicationMod state for a plausible mid-run combat.
+    """
+
+    card_ids = CardCatalog.ids[1:]  # Not NONE
+
+    def pile(size: int) -> list[dict]:
+        return [_card(rng.choice(card_ids), rng) for _ in range(size)]
+
+    monsters = []
+    for _ in range(rng.randint(1, 3)):
+        monsters.append(
+            {
+                "id": rng.choice(combat_consts.ALL_MONSTER_TYPES[1:]),
+                "name": "",
+                "intent": rng.choice(combat_consts.ALL_INTENTS),
+                "current_hp": rng.randint(1, 100),
+                "max_hp": 100,
+                "block": rng.randint(0, 20),
+                "move_adjusted_damage": rng.randint(0, 30),
+                "move_hits": rng.randint(1, 3),
+                "powers": _powers(rng, 3),
+                "is_gone": False,
+                "half_dead": False,
+            }
+        )
+
+    return {
+        "available_commands": ["play", "end", "key", "click", "wait", "state"],
+        "ready_for_command": True,
+        "in_game": True,
+        "game_state": {
+            "screen_type": "NONE",
+            "screen_state": {},
+            "screen_name": "NONE",
+            "room_phase": "COMBAT",
+            "floor": rng.randint(1, 50),
+            "act": 1,
+            "act_boss": "Hexaghost",
+            "seed": 0,
+            "class": "DEFECT",
+            "ascension_level": 0,
+            "current_hp": 50,
+            "max_hp": 75,
+            "gold": rng.randint(0, 500),
+            "potions": [],
+            "relics": [{"id": "Cracked Core", "name": "Cracked Core", "counter": -1}],
+            "deck": pile(rng.randint(10, 40)),
+            "keys": {"ruby": False, "emerald": False, "sapphire": False},
+            "map": [],
+            "combat_state": {
+                "turn": rng.randint(1, 10),
+                "hand": pile(rng.randint(0, combat_consts.MAX_HAND_SIZE)),
+                "draw_pile": pile(rng.randint(0, 25)),
+                "discard_pile": pile(rng.randint(0, 15)),
+                "exhaust_pile": pile(rng.randint(0, 5)),
+                "limbo": [],
+                "cards_discarded_this_turn": 0,
+                "times_damaged": 0,
+                "player": {
+                    "current_hp": 50,
+                    "max_hp": 75,
+                    "block": rng.randint(0, 30),
+                    "energy": rng.randint(0, 3),
+                    "powers": _powers(rng, 5),
+                    "orbs": [{"id": "Lightning", "name": "Lightning"}],
+                },
+                "monsters": monsters,
+            },
+        },
+    }
+
+
+def load_states(paths: list[str]) -> list[dict]:
+    """
+    Read the states in files written by StateLogger.
+    """
+
+    states = []
+    for path in paths:
+        with open(path) as f:
+            states.extend(entry["state_after"] for entry in json.load(f))
+    return states
+
+
+def measure_bytes(value: Any, totals: collections.Counter) -> None:
+    if isinstance(value, dict):
+        for v in value.values():
+            measure_bytes(v, totals)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            measure_bytes(v, totals)
+    else:
+        array = np.asarray(value)
+        totals[array.dtype.name] += array.nbytes
+
+
+def _serialize(component: Any, config: ObservationConfig) -> Any:
+    if "config" in inspect.signature(component.serialize).parameters:
+        return component.serialize(config)
+    return component.serialize()
+
+
+def report(states: list[dict], config: ObservationConfig) -> list[FieldReport]:
+    space = make_observation_space(config)
+    num_states = len(states)
+
+    reports = []
+    for name, subspace in space.spaces.items():
+        parse_time = encode_time = decode_time = 0.0
+        decodable = True
+        encoded = []
+
+        for state in states:
+            obs = Observation(state)
+            if name == "valid_action_mask":
+                encoded.append(obs.serialize(config)[name])
+                continue
+
+            start = time.perf_counter()
+            component = getattr(obs, name)
+            parse_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            ser = _serialize(component, config)
+            encode_time += time.perf_counter() - start
+            encoded.append(ser)
+
+            if decodable and hasattr(type(component), "deserialize"):
+                start = time.perf_counter()
+                type(component).deserialize(ser)
+                decode_time += time.perf_counter() - start
+            else:
+                decodable = False
+
+        fields: dict[str, tuple[gym.Space, list]] = {name: (subspace, encoded)}
+        if isinstance(subspace, gym.spaces.Dict):
+            for key, field_space in subspace.spaces.items():
+                field_values = [ser[key] for ser in encoded]
+                fields[f"{name}.{key}"] = (field_space, field_values)
+
+        for field_name, (field_space, values) in fields.items():
+            totals: collections.Counter = collections.Counter()
+            for value in values:
+                measure_bytes(value, totals)
+
+            field_report = FieldReport(
+                name=field_name,
+                flatdim=gym.spaces.flatdim(field_space),
+                nbytes={k: v / num_states for k, v in totals.items()},
+            )
+            if field_name == name and name != "valid_action_mask":
+                field_report.parse_time = parse_time / num_states
+                field_report.encode_time = encode_time / num_states
+                if decodable:
+                    field_report.decode_time = decode_time / num_states
+            reports.append(field_report)
+
+    return reports
+
+
+def _format_time(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1e6:.0f}"
+
+
+def print_report(reports: list[FieldReport]) -> None:
+    print(
+        f"{'field':<40} {'flatdim':>8} {'bytes':>8} {'parse us':>9} "
+        f"{'encode us':>10} {'decode us':>10}  dtypes"
+    )
+    for r in reports:
+        dtypes = ", ".join(f"{k}={v:.0f}" for k, v in sorted(r.nbytes.items()))
+        print(
+            f"{r.name:<40} {r.flatdim:>8} {r.total_bytes:>8.0f} "
+            f"{_format_time(r.parse_time):>9} {_format_time(r.encode_time):>10} "
+            f"{_format_time(r.decode_time):>10}  {dtypes}"
+        )
+
+    components = [r for r in reports if "." not in r.name]
+    print(
+        f"{'total':<40} {sum(r.flatdim for r in components):>8} "
+        f"{sum(r.total_bytes for r in components):>8.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--states",
+        nargs="+",
+        default=None,
+        help="Files written by log_states. Defaults to synthetic combat states.",
+    )
+    parser.add_argument("--num_synthetic", default=200, type=int)
+    parser.add_argument("--seed", default=42, type=int)
+    parser.add_argument("--card_encoding", default="dense")
+    parser.add_argument("--effect_encoding", default="dense")
+    parser.add_argument(
+        "--components", nargs="+", default=None, help="Defaults to all of them"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    if args.states:
+        states = load_states(args.states)
+    else:
+        rng = random.Random(args.seed)
+        states = [synthetic_state(rng) for _ in range(args.num_synthetic)]
+
+    config = ObservationConfig(
+        card_encoding=args.card_encoding,
+        effect_encoding=args.effect_encoding,
+        components=args.components,
+    )
+    reports = report(states, config)
+
+    if args.json:
+        for r in reports:
+            print(r.json())
+    else:
+        print(f"{len(states)} states, {config!r}")
+        print_report(reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@
 
 Currently I get about ~1 sps.
 
-TODO: try with and without the superfast mod.
+See gym_sts.calibrate for comparisons across SuperFastMode settings, including with
+the mod's speedups disabled.
 """
 
 import argparse
@@ -6,6 +6,9 @@ from ray.rllib.models import ModelCatalog
 # from ray.rllib.models.tf import tf_modelv2
 from ray.rllib.models.tf import fcnet
 
+from gym_sts.rl.embedding_bag import EmbeddingBagModel
+from gym_sts.spaces import actions
+
 
 class MaskedModel(fcnet.FullyConnectedNetwork):
     def forward(
@@ -23,5 +26,52 @@ class MaskedModel(fcnet.FullyConnectedNetwork):
         return logits, state
 
 
+class FactoredMaskedModel(fcnet.FullyConnectedNetwork):
+    """
+    Like MaskedModel, but rather than a logit per action, the network outputs logits
+    for each action type, slot and target (see gym_sts.spaces.actions), and an
+    action's logit is the sum of its factors' logits. The output layer is a fraction
+    of the size, and what's learned about a slot (e.g. a card in hand) or a target is
+    shared between the actions that use it. Slots aren't shared between action types.
+    """
+
+    def __init__(self, obs_space, action_space, num_outputs, model_config, name):
+        num_factor_logits = (
+            actions.NUM_ACTION_TYPES + actions.NUM_SLOTS + actions.NUM_TARGETS
+        )
+        super().__init__(obs_space, action_space, num_factor_logits, model_config, name)
+        self.num_outputs = num_outputs
+
+        self.type_index = tf.constant(actions.ACTION_TYPE_INDEX)
+        self.slot_index = tf.constant(
+            actions.ACTION_SLOT_INDEX + actions.NUM_ACTION_TYPES
+        )
+        self.target_index = tf.constant(
+            actions.ACTION_TARGET_INDEX + actions.NUM_ACTION_TYPES + actions.NUM_SLOTS
+        )
+
+    def forward(
+        self,
+        input_dict: dict[str, tf.Tensor],
+        state: list[tf.Tensor],
+        seq_lens: tf.Tensor,
+    ) -> tp.Tuple[tf.Tensor, list[tf.Tensor]]:
+        factor_logits, state = super().forward(input_dict, state, seq_lens)
+
+        logits = (
+            tf.gather(factor_logits, self.type_index, axis=1)
+            + tf.gather(factor_logits, self.slot_index, axis=1)
+            + tf.gather(factor_logits, self.target_index, axis=1)
+        )
+
+        mask = input_dict["obs"]["valid_action_mask"]
+        mask = tf.cast(mask, tf.bool)
+        logits = tf.where(mask, logits, tf.float32.min)
+
+        return logits, state
+
+
 def register():
     ModelCatalog.register_custom_model("masked", MaskedModel)
+    ModelCatalog.register_custom_model("factored_masked", FactoredMaskedModel)
+    ModelCatalog.register_custom_model("embedding_bag", EmbeddingBagModel)
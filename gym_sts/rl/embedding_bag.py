@@ -0,0 +1,120 @@
+import typing as tp
+
+import tensorflow as tf
+from ray.rllib.models.tf.tf_modelv2 import TFModelV2
+
+import gym_sts.spaces.constants.cards as card_consts
+import gym_sts.spaces.constants.combat as combat_consts
+
+
+def _is_sparse_pile(obs: tp.Any) -> bool:
+    return isinstance(obs, dict) and set(obs) == {"cards", "counts"}
+
+
+def _is_sparse_effects(obs: tp.Any) -> bool:
+    return isinstance(obs, dict) and set(obs) == {"ids", "amounts"}
+
+
+class EmbeddingBagModel(TFModelV2):
+    """
+    A masked policy for observations with sparse card piles, i.e. encoded with
+    ObservationConfig(card_encoding="sparse").
+
+    Each pile is embedded as the count-weighted sum of its cards' embeddings, which
+    are shared between piles. The pile embeddings are concatenated with the rest of
+    the (flattened) observation and fed to fully connected layers, so the first layer
+    sees a few dozen inputs per pile rather than a count for every card.
+
+    Sparse effects (ObservationConfig(effect_encoding="sparse")) are embedded the
+    same way, weighted by their log-scaled amounts.
+    """
+
+    def __init__(
+        self,
+        obs_space,
+        action_space,
+        num_outputs,
+        model_config,
+        name,
+        card_embedding_dim: int = 32,
+        effect_embedding_dim: int = 16,
+    ):
+        super().__init__(obs_space, action_space, num_outputs, model_config, name)
+
+        hiddens = model_config.get("fcnet_hiddens", [256, 256])
+        activation = model_config.get("fcnet_activation", "relu")
+
+        self.card_embedding = tf.keras.layers.Embedding(
+            card_consts.NUM_CARDS_WITH_UPGRADES, card_embedding_dim
+        )
+        # Including the id of empty slots
+        self.effect_embedding = tf.keras.layers.Embedding(
+            combat_consts.NUM_EFFECTS + 1, effect_embedding_dim
+        )
+        self.policy_layers = [
+            tf.keras.layers.Dense(size, activation=activation) for size in hiddens
+        ]
+        self.logits_layer = tf.keras.layers.Dense(num_outputs)
+        self.value_layers = [
+            tf.keras.layers.Dense(size, activation=activation) for size in hiddens
+        ]
+        self.value_layer = tf.keras.layers.Dense(1)
+
+        self._value: tp.Optional[tf.Tensor] = None
+
+    def _embed_pile(self, pile: dict[str, tf.Tensor]) -> tf.Tensor:
+        cards = tf.cast(pile["cards"], tf.int32)
+        counts = tf.cast(pile["counts"], tf.float32)
+        # Padding has a count of 0, so it doesn't contribute
+        embeddings = self.card_embedding(cards)
+        return tf.reduce_sum(embeddings * tf.expand_dims(counts, -1), axis=1)
+
+    def _embed_effects(self, effects: dict[str, tf.Tensor]) -> tf.Tensor:
+        ids = tf.cast(effects["ids"], tf.int32)
+        amounts = tf.cast(effects["amounts"], tf.float32)
+        # Empty slots have an amount of 0, so they don't contribute
+        weights = tf.sign(amounts) * tf.math.log1p(tf.abs(amounts))
+        embeddings = self.effect_embedding(ids)
+        return tf.reduce_sum(embeddings * tf.expand_dims(weights, -1), axis=1)
+
+    def _features(self, obs: tp.Any) -> list[tf.Tensor]:
+        # Leaves have already been preprocessed by rllib, e.g. Discretes are one-hot
+        if _is_sparse_pile(obs):
+            return [self._embed_pile(obs)]
+        if _is_sparse_effects(obs):
+            return [self._embed_effects(obs)]
+        if isinstance(obs, dict):
+            return [f for key in sorted(obs) for f in self._features(obs[key])]
+        if isinstance(obs, (list, tuple)):
+            return [f for item in obs for f in self._features(item)]
+
+        batch_size = tf.shape(obs)[0]
+        return [tf.reshape(tf.cast(obs, tf.float32), [batch_size, -1])]
+
+    def forward(
+        self,
+        input_dict: dict[str, tf.Tensor],
+        state: list[tf.Tensor],
+        seq_lens: tf.Tensor,
+    ) -> tp.Tuple[tf.Tensor, list[tf.Tensor]]:
+        obs = input_dict["obs"]
+        features = tf.concat(self._features(obs), axis=1)
+
+        x = features
+        for layer in self.policy_layers:
+            x = layer(x)
+        logits = self.logits_layer(x)
+
+        v = features
+        for layer in self.value_layers:
+            v = layer(v)
+        self._value = self.value_layer(v)
+
+        mask = tf.cast(obs["valid_action_mask"], tf.bool)
+        logits = tf.where(mask, logits, tf.float32.min)
+
+        return logits, state
+
+    def value_function(self) -> tf.Tensor:
+        assert self._value is not None
+        return tf.reshape(self._value, [-1])
@@ -18,9 +18,7 @@ class StSCustomMetricCallbacks(DefaultCallbacks):
         **kwargs
     ):
         subenvs = base_env.get_sub_environments()
-        assert len(subenvs) == 1
-
-        obs = subenvs[0].observe()
+        obs = subenvs[env_index].observe()
 
         max_hp = sum(e.max_hp for e in obs.combat_state.enemies)
         enemy_hp = sum(e.current_hp for e in obs.combat_state.enemies)
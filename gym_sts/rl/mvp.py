@@ -11,10 +11,13 @@ from ray.air.integrations.wandb import WandbLoggerCallback
 from ray.rllib.algorithms import ppo
 from ray.rllib.models import preprocessors
 from ray.train.rl import RLTrainer
+from ray.tune.registry import register_env
 
-from gym_sts.envs import base, single_combat
+from gym_sts.envs import base, resources, single_combat
 from gym_sts.rl import action_masking
 from gym_sts.rl.metrics import StSCustomMetricCallbacks
+from gym_sts.rl.vector_env import ThreadedVectorEnv
+from gym_sts.spaces.observations import ObservationConfig, make_observation_space
 
 
 def check_rllib_bug(space: spaces.Space):
@@ -26,8 +29,6 @@ def check_rllib_bug(space: spaces.Space):
         assert space.shape != preprocessors.ATARI_RAM_OBS_SHAPE
 
 
-check_rllib_bug(base.OBSERVATION_SPACE)
-
 action_masking.register()
 
 ENV = ff.DEFINE_dict(
@@ -42,6 +43,21 @@ ENV = ff.DEFINE_dict(
     reboot_frequency=ff.Integer(50, "Reboot game every n resets."),
     reboot_on_error=ff.Boolean(False),
     log_states=ff.Boolean(False),
+    num_envs=ff.Integer(1, "Games per rollout worker, stepped concurrently."),
+    cores_per_game=ff.Integer(
+        0,
+        "Physical cores to give each game, with every rollout worker pinned to its "
+        "games' cores. 0 leaves CPUs unrestricted.",
+    ),
+    card_encoding=ff.String("dense", "dense or sparse (use with embedding_bag)"),
+    effect_encoding=ff.String("dense", "dense or sparse (use with embedding_bag)"),
+    components=ff.StringList(
+        [],
+        "Observation components to include. Defaults to all of them. Single "
+        "combats only need combat_state and persistent_state.",
+    ),
+    # Safe with rllib, which flattens each observation as soon as it's returned
+    reuse_observation_buffers=ff.Boolean(False, "Encode without allocating."),
 )
 
 TUNE = ff.DEFINE_dict(
@@ -87,7 +103,7 @@ RL = ff.DEFINE_dict(
     train_batch_size=ff.Integer(1024),
     num_workers=ff.Integer(0),
     model=dict(
-        custom_model=ff.String("masked"),
+        custom_model=ff.String("masked", "masked, factored_masked or embedding_bag"),
         fcnet_hiddens=ff.Sequence([256, 256, 256, 256]),
         fcnet_activation=ff.String("relu"),
     ),
@@ -111,14 +127,46 @@ SINGLE_COMBAT = ff.DEFINE_dict(
 )
 
 
+def game_kwargs(cfg: dict, num_games: int = 1) -> list[dict]:
+    """
+    The env kwargs for each of the games an env creator starts. If cores_per_game is
+    set, each game gets its own cores, derived from the rollout worker's index so
+    that workers don't overlap, and the worker process is pinned to them.
+    """
+
+    kwargs = dict(cfg)
+    cores_per_game = kwargs.pop("cores_per_game", 0)
+    if not cores_per_game:
+        return [dict(kwargs) for _ in range(num_games)]
+
+    # Each worker runs a single env or ThreadedVectorEnv, see register_vector_env
+    assert getattr(cfg, "vector_index", 0) == 0
+    allocations = resources.allocate_worker(
+        getattr(cfg, "worker_index", 0), num_games, cores_per_game
+    )
+    worker_cpus = {cpu for a in allocations for cpu in a.worker_cpus or []}
+    resources.ResourceAllocation(worker_cpus=sorted(worker_cpus)).pin_worker()
+    return [dict(kwargs, resources=allocation) for allocation in allocations]
+
+
 class Env(base.SlayTheSpireGymEnv):
     def __init__(self, cfg: dict):
-        super().__init__(**cfg)
+        super().__init__(**game_kwargs(cfg)[0])
 
 
 class SingleCombatEnv(single_combat.SingleCombatSTSEnv):
     def __init__(self, cfg: dict):
-        super().__init__(**cfg)
+        super().__init__(**game_kwargs(cfg)[0])
+
+
+def register_vector_env(env_class: type, num_envs: int) -> str:
+    def make_vector_env(cfg: dict) -> ThreadedVectorEnv:
+        kwargs = game_kwargs(cfg, num_envs)
+        return ThreadedVectorEnv(lambda i: env_class(kwargs[i]), num_envs)
+
+    name = f"sts-vector-{env_class.__name__}"
+    register_env(name, make_vector_env)
+    return name
 
 
 def main(_):
@@ -140,9 +188,19 @@ def main(_):
         "reboot_on_error",
         "ascension",
         "log_states",
+        "reuse_observation_buffers",
+        "cores_per_game",
     ]:
         env_config[key] = ENV.value[key]
 
+    observation_config = ObservationConfig(
+        card_encoding=ENV.value["card_encoding"],
+        effect_encoding=ENV.value["effect_encoding"],
+        components=ENV.value["components"] or None,
+    )
+    check_rllib_bug(make_observation_space(observation_config))
+    env_config["observation_config"] = observation_config
+
     if SINGLE_COMBAT.value["use"]:
         env_config["enemies"] = SINGLE_COMBAT.value["enemies"]
         env_config["cards"] = SINGLE_COMBAT.value["cards"]
@@ -154,8 +212,13 @@ def main(_):
 
     rl_config = RL.value.copy()
 
+    env = SingleCombatEnv if SINGLE_COMBAT.value["use"] else Env
+    if ENV.value["num_envs"] > 1:
+        # Each worker owns all of its games, rather than RLlib's num_envs_per_worker
+        env = register_vector_env(env, ENV.value["num_envs"])
+
     ppo_config = {
-        "env": SingleCombatEnv if SINGLE_COMBAT.value["use"] else Env,
+        "env": env,
         "env_config": env_config,
         "framework": "tf2",
         "eager_tracing": True,
@@ -0,0 +1,168 @@
+"""
+An RLlib BaseEnv that plays several games per rollout worker.
+
+Each game spends most of its time waiting on its JVM, so a worker that steps one
+blocking env at a time is bounded by a single game's latency. ThreadedVectorEnv
+steps every game on its own thread instead, and poll() hands back whichever games
+have responded, so the policy can act on them while slower games catch up.
+"""
+
+import concurrent.futures
+import logging
+from typing import Any, Callable, Optional, Union
+
+import gymnasium as gym
+from ray.rllib.env.base_env import _DUMMY_AGENT_ID, ASYNC_RESET_RETURN, BaseEnv
+from ray.rllib.utils.typing import EnvID, MultiEnvDict
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadedVectorEnv(BaseEnv):
+    def __init__(self, make_env: Callable[[int], gym.Env], num_envs: int):
+        """
+        Args:
+            make_env: Creates the env with the given index. Envs are reset (and so
+                booted) concurrently, as soon as they're created.
+            num_envs: How many games this worker plays at once.
+        """
+
+        self.make_env = make_env
+        self.num_envs = num_envs
+        self.envs = [make_env(i) for i in range(num_envs)]
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=num_envs, thread_name_prefix="sts-vector-env"
+        )
+        # Each env has at most one step or reset in flight
+        self._pending: dict[concurrent.futures.Future, tuple[int, str]] = {}
+
+        for env_id in range(num_envs):
+            self._submit_reset(env_id)
+
+    def _submit_reset(
+        self, env_id: int, seed: Optional[int] = None, options: Optional[dict] = None
+    ) -> None:
+        future = self._executor.submit(
+            self.envs[env_id].reset, seed=seed, options=options
+        )
+        self._pending[future] = (env_id, "reset")
+
+    def poll(
+        self,
+    ) -> tuple[
+        MultiEnvDict,
+        MultiEnvDict,
+        MultiEnvDict,
+        MultiEnvDict,
+        MultiEnvDict,
+        MultiEnvDict,
+    ]:
+        """
+        Block until at least one game has responded, and return every game that has.
+        """
+
+        obs: MultiEnvDict = {}
+        rewards: MultiEnvDict = {}
+        terminateds: MultiEnvDict = {}
+        truncateds: MultiEnvDict = {}
+        infos: MultiEnvDict = {}
+
+        if self._pending:
+            done, _ = concurrent.futures.wait(
+                self._pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+        else:
+            done = set()
+
+        for future in done:
+            env_id, kind = self._pending.pop(future)
+
+            try:
+                if kind == "reset":
+                    ob, info = future.result()
+                    reward, terminated, truncated = 0.0, False, False
+                else:
+                    ob, reward, terminated, truncated, info = future.result()
+            except Exception as e:
+                # RLlib restarts the env (see try_restart()) if the algorithm is
+                # configured to restart failed sub-environments, and raises otherwise
+                logger.exception(f"Env {env_id} failed")
+                obs[env_id] = e
+                rewards[env_id] = {}
+                terminateds[env_id] = {"__all__": True}
+                truncateds[env_id] = {"__all__": True}
+                infos[env_id] = {}
+                continue
+
+            obs[env_id] = {_DUMMY_AGENT_ID: ob}
+            rewards[env_id] = {_DUMMY_AGENT_ID: reward}
+            terminateds[env_id] = {_DUMMY_AGENT_ID: terminated, "__all__": terminated}
+            truncateds[env_id] = {_DUMMY_AGENT_ID: truncated, "__all__": truncated}
+            infos[env_id] = {_DUMMY_AGENT_ID: info}
+
+        return obs, rewards, terminateds, truncateds, infos, {}
+
+    def send_actions(self, action_dict: MultiEnvDict) -> None:
+        for env_id, actions in action_dict.items():
+            future = self._executor.submit(
+                self.envs[env_id].step, actions[_DUMMY_AGENT_ID]
+            )
+            self._pending[future] = (env_id, "step")
+
+    def try_reset(
+        self,
+        env_id: Optional[EnvID] = None,
+        *,
+        seed: Optional[int] = None,
+        options: Optional[dict] = None,
+    ) -> tuple[Optional[MultiEnvDict], Optional[MultiEnvDict]]:
+        """
+        Reset in the background. The initial observation is returned by a later
+        poll().
+        """
+
+        env_ids = range(self.num_envs) if env_id is None else [env_id]
+        for i in env_ids:
+            self._submit_reset(i, seed=seed, options=options)
+        return ASYNC_RESET_RETURN, ASYNC_RESET_RETURN
+
+    def try_restart(self, env_id: Optional[EnvID] = None) -> None:
+        """
+        Replace a failed env with a new one. With reboot_on_error, most failures are
+        handled by the env itself, which reboots the game and ends the episode.
+        """
+
+        env_ids = range(self.num_envs) if env_id is None else [env_id]
+        for i in env_ids:
+            try:
+                self.envs[i].close()
+            except Exception:
+                logger.exception(f"Failed to close env {i}")
+            self.envs[i] = self.make_env(i)
+
+    def get_sub_environments(
+        self, as_dict: bool = False
+    ) -> Union[list[gym.Env], dict[int, gym.Env]]:
+        if as_dict:
+            return dict(enumerate(self.envs))
+        return list(self.envs)
+
+    def get_agent_ids(self) -> set[Any]:
+        return {_DUMMY_AGENT_ID}
+
+    def stop(self) -> None:
+        concurrent.futures.wait(self._pending)
+        self._pending = {}
+        self._executor.shutdown()
+        for env in self.envs:
+            env.close()
+
+    @property
+    def observation_space(self) -> gym.Space:
+        return self.envs[0].observation_space
+
+    @property
+    def action_space(self) -> gym.Space:
+        return self.envs[0].action_space
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Optional
 
+import numpy as np
 from gymnasium.spaces import Discrete
 from pydantic import BaseModel, PrivateAttr
 
@@ -105,3 +106,66 @@ def all_actions() -> list[Action]:
 
 ACTIONS = all_actions()
 ACTION_SPACE = Discrete(len(ACTIONS))
+
+
+# A factored view of ACTIONS: each action is an action type, a slot (the card, potion
+# or choice it refers to) and a target. Policies can score each factor separately, and
+# score an action as the sum of its factors' scores, which takes far fewer outputs than
+# scoring every action. Actions without a target use NO_TARGET.
+ACTION_TYPES: list[type[Action]] = [
+    EndTurn,
+    Return,
+    Proceed,
+    Choose,
+    UsePotion,
+    DiscardPotion,
+    PlayCard,
+]
+NUM_ACTION_TYPES = len(ACTION_TYPES)
+# Each type has its own range of slots, so e.g. a hand position and a choice with the
+# same index don't share a score. Types without slots have a single one.
+SLOTS_PER_TYPE = [
+    1,
+    1,
+    1,
+    base_consts.NUM_CHOICES,
+    potion_consts.NUM_POTION_SLOTS,
+    potion_consts.NUM_POTION_SLOTS,
+    combat_consts.MAX_HAND_SIZE,
+]
+SLOT_OFFSETS = [sum(SLOTS_PER_TYPE[:i]) for i in range(NUM_ACTION_TYPES)]
+NUM_SLOTS = sum(SLOTS_PER_TYPE)
+NO_TARGET = combat_consts.MAX_NUM_ENEMIES
+NUM_TARGETS = combat_consts.MAX_NUM_ENEMIES + 1
+
+
+def action_factors(action: Action) -> tuple[int, int, int]:
+    """
+    Returns the (type, slot, target) indices of an action.
+    """
+
+    action_type = ACTION_TYPES.index(type(action))
+
+    slot = 0
+    if isinstance(action, Choose):
+        slot = action.choice_index
+    elif isinstance(action, PotionAction):
+        slot = action.potion_index
+    elif isinstance(action, PlayCard):
+        # Card positions start at 1
+        slot = action.card_position - 1
+
+    assert slot < SLOTS_PER_TYPE[action_type]
+
+    target = getattr(action, "target_index", None)
+    if target is None:
+        target = NO_TARGET
+
+    return action_type, SLOT_OFFSETS[action_type] + slot, target
+
+
+# The factors of each action, indexed by action id
+ACTION_TYPE_INDEX, ACTION_SLOT_INDEX, ACTION_TARGET_INDEX = (
+    np.array(factor, dtype=np.int32)
+    for factor in zip(*(action_factors(action) for action in ACTIONS))
+)
@@ -1 +1,12 @@
-from .observations import OBSERVATION_SPACE, Observation, ObservationError  # noqa: F401
+from .buffers import ObservationBuffers, copy_observation  # noqa: F401
+from .config import (  # noqa: F401
+    COMPONENTS,
+    SINGLE_COMBAT_OBSERVATION_CONFIG,
+    ObservationConfig,
+)
+from .observations import (  # noqa: F401
+    OBSERVATION_SPACE,
+    Observation,
+    ObservationError,
+    make_observation_space,
+)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from typing import Any, Union
+
+import numpy as np
+from gymnasium import spaces
+
+from .config import DEFAULT_OBSERVATION_CONFIG, ObservationConfig
+
+
+# Every component is empty in the main menu
+_EMPTY_STATE = {
+    "available_commands": ["start", "state"],
+    "ready_for_command": True,
+    "in_game": False,
+}
+
+
+class _Stacked:
+    """
+    A Tuple of identical spaces, whose leaves are stacked along one axis.
+    """
+
+    def __init__(self, size: int, inner: Any):
+        self.size = size
+        self.inner = inner
+
+
+def _leaf(space: spaces.Space) -> tuple[tuple[int, ...], np.dtype]:
+    if isinstance(space, spaces.Discrete):
+        return (), np.dtype(np.int64)
+    if isinstance(space, (spaces.MultiBinary, spaces.MultiDiscrete, spaces.Box)):
+        return space.shape, space.dtype
+    raise TypeError(f"Unsupported space: {space}")
+
+
+def write(out: Any, value: Any) -> None:
+    """
+    Copy an encoding, e.g. from serialize(), into views with the same structure.
+    """
+
+    if isinstance(out, dict):
+        for key, view in out.items():
+            write(view, value[key])
+    elif isinstance(out, list):
+        for view, item in zip(out, value):
+            write(view, item)
+    else:
+        out[...] = value
+
+
+def copy_observation(observation: Any) -> Any:
+    """
+    A deep copy of an encoded observation, e.g. one returned by
+    Observation.serialize_into(), which is overwritten by the next call.
+    """
+
+    if isinstance(observation, dict):
+        return {key: copy_observation(value) for key, value in observation.items()}
+    if isinstance(observation, (list, tuple)):
+        return [copy_observation(item) for item in observation]
+    if isinstance(observation, np.ndarray):
+        return observation.copy()
+    return observation
+
+
+class ObservationBuffers:
+    """
+    Preallocated arrays for one encoded observation, shaped like
+    make_observation_space(config). See Observation.serialize_into().
+
+    The encoding is a tree of views into a few arrays, which are reused by every
+    observation. Repeated elements (e.g. the effects of each enemy) share one array,
+    so resetting a component to its empty encoding only copies a few arrays.
+    """
+
+    def __init__(self, config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG):
+        # Avoid a circular import
+        from .observations import Observation, make_observation_space
+
+        self.config = config
+        self.space = make_observation_space(config)
+
+        self._arrays: dict[str, list[np.ndarray]] = {}
+        self.views: dict[str, Any] = {}
+        for name, space in self.space.spaces.items():
+            self._arrays[name] = []
+            tree = self._allocate(space, (), self._arrays[name])
+            self.views[name] = self._view(tree, ())
+
+        write(self.views, Observation(_EMPTY_STATE).serialize(config))
+        self._empty = {
+            name: [array.copy() for array in arrays]
+            for name, arrays in self._arrays.items()
+        }
+
+    @property
+    def components(self) -> list[str]:
+        return [name for name in self.views if name != "valid_action_mask"]
+
+    def _allocate(
+        self, space: spaces.Space, batch: tuple[int, ...], arrays: list[np.ndarray]
+    ) -> Any:
+        if isinstance(space, spaces.Dict):
+            return {
+                key: self._allocate(subspace, batch, arrays)
+                for key, subspace in space.spaces.items()
+            }
+
+        if isinstance(space, spaces.Tuple):
+            first = space.spaces[0]
+            if all(subspace == first for subspace in space.spaces):
+                size = len(space.spaces)
+                return _Stacked(size, self._allocate(first, batch + (size,), arrays))
+            return [self._allocate(subspace, batch, arrays) for subspace in space]
+
+        shape, dtype = _leaf(space)
+        array = np.zeros(batch + shape, dtype=dtype)
+        arrays.append(array)
+        return array
+
+    def _view(self, tree: Any, index: tuple[int, ...]) -> Any:
+        if isinstance(tree, dict):
+            return {key: self._view(value, index) for key, value in tree.items()}
+        if isinstance(tree, _Stacked):
+            return [self._view(tree.inner, index + (i,)) for i in range(tree.size)]
+        if isinstance(tree, list):
+            return [self._view(item, index) for item in tree]
+        # A view, even when it has no dimensions left
+        return tree[index + (Ellipsis,)]
+
+    def clear(self, name: str) -> None:
+        """
+        Reset a component to its empty encoding.
+        """
+
+        for array, empty in zip(self._arrays[name], self._empty[name]):
+            np.copyto(array, empty)
+
+    def copy(self) -> dict[str, Union[dict, np.ndarray]]:
+        return copy_observation(self.views)
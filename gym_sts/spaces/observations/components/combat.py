@@ -11,6 +11,10 @@ import gym_sts.spaces.constants.base as base_consts
 import gym_sts.spaces.constants.combat as combat_consts
 from gym_sts.spaces.constants.cards import CardCatalog
 from gym_sts.spaces.observations import serializers, spaces, types, utils
+from gym_sts.spaces.observations.config import (
+    DEFAULT_OBSERVATION_CONFIG,
+    ObservationConfig,
+)
 
 from .base import ObsComponent
 
@@ -70,7 +74,7 @@ class CombatObs(ObsComponent):
                 self.can_pick_zero = screen_state["can_pick_zero"]
 
     @staticmethod
-    def space() -> Dict:
+    def space(config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG) -> Dict:
         return Dict(
             {
                 "turn": MultiBinary(combat_consts.LOG_MAX_TURN),
@@ -80,15 +84,17 @@ class CombatObs(ObsComponent):
                     [combat_consts.NUM_ORBS] * combat_consts.MAX_ORB_SLOTS
                 ),
                 "block": MultiBinary(combat_consts.LOG_MAX_BLOCK),
-                "effects": spaces.generate_effect_space(),
-                "enemies": Tuple([types.Enemy.space()] * combat_consts.MAX_NUM_ENEMIES),
-                "discard": spaces.generate_card_space(),
-                "draw": spaces.generate_card_space(),
-                "exhaust": spaces.generate_card_space(),
+                "effects": spaces.generate_effect_space(config),
+                "enemies": Tuple(
+                    [types.Enemy.space(config)] * combat_consts.MAX_NUM_ENEMIES
+                ),
+                "discard": spaces.generate_card_space(config),
+                "draw": spaces.generate_card_space(config),
+                "exhaust": spaces.generate_card_space(config),
             }
         )
 
-    def serialize(self) -> dict:
+    def serialize(self, config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG) -> dict:
         turn = utils.to_binary_array(self.turn, combat_consts.LOG_MAX_TURN)
         energy = utils.to_binary_array(self.energy, combat_consts.LOG_MAX_ENERGY)
         block = utils.to_binary_array(self.block, combat_consts.LOG_MAX_BLOCK)
@@ -98,16 +104,16 @@ class CombatObs(ObsComponent):
             card_idx = card.serialize()
             hand[i] = card_idx
 
-        effects = types.Effect.serialize_all(self.effects)
+        effects = types.Effect.serialize_all(self.effects, config)
         orbs = serializers.serialize_orbs(self.orbs)
 
-        enemies = [types.Enemy.serialize_empty()] * combat_consts.MAX_NUM_ENEMIES
+        enemies = [types.Enemy.serialize_empty(config)] * combat_consts.MAX_NUM_ENEMIES
         for i, enemy in enumerate(self.enemies):
-            enemies[i] = enemy.serialize()
+            enemies[i] = enemy.serialize(config)
 
-        discard = serializers.serialize_cards(self.discard)
-        draw = serializers.serialize_cards(self.draw)
-        exhaust = serializers.serialize_cards(self.exhaust)
+        discard = serializers.serialize_pile(self.discard, config)
+        draw = serializers.serialize_pile(self.draw, config)
+        exhaust = serializers.serialize_pile(self.exhaust, config)
 
         response = {
             "turn": turn,
@@ -124,12 +130,37 @@ class CombatObs(ObsComponent):
 
         return response
 
+    def serialize_into(
+        self, out: dict, config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG
+    ) -> None:
+        """
+        Like serialize(), but writes into buffers holding the empty encoding (see
+        ObservationBuffers), so only the parts of the encoding that are present.
+        """
+
+        utils.write_binary_array(self.turn, out["turn"])
+        utils.write_binary_array(self.energy, out["energy"])
+        utils.write_binary_array(self.block, out["block"])
+
+        for card, card_out in zip(self.hand, out["hand"]):
+            card.write(card_out)
+
+        types.Effect.write_all(self.effects, out["effects"], config)
+        serializers.write_orbs(self.orbs, out["orbs"])
+
+        for enemy, enemy_out in zip(self.enemies, out["enemies"]):
+            enemy.write(enemy_out, config)
+
+        serializers.write_pile(self.discard, out["discard"], config)
+        serializers.write_pile(self.draw, out["draw"], config)
+        serializers.write_pile(self.exhaust, out["exhaust"], config)
+
     class SerializedState(BaseModel):
         turn: types.BinaryArray
         hand: list[types.HandCard.SerializedState]
         energy: types.BinaryArray
         block: types.BinaryArray
-        effects: list[dict]
+        effects: Union[list[dict], dict]
         orbs: npt.NDArray[np.uint]
         enemies: list[dict]
         discard: npt.NDArray[np.uint]
@@ -142,6 +173,9 @@ class CombatObs(ObsComponent):
     @classmethod
     def deserialize(cls, data: Union[dict, SerializedState]) -> CombatObs:
         if not isinstance(data, cls.SerializedState):
+            data = dict(data)
+            for pile in ["discard", "draw", "exhaust"]:
+                data[pile] = serializers.densify_pile(data[pile])
             data = cls.SerializedState(**data)
 
         # Instantiate with empty data and update attributes individually,
@@ -152,12 +186,7 @@ class CombatObs(ObsComponent):
         instance.energy = utils.from_binary_array(data.energy)
         instance.block = utils.from_binary_array(data.block)
 
-        instance.effects = []
-        for effect_idx, e in enumerate(data.effects):
-            effect = types.Effect.deserialize(e)
-            if effect.amount != 0:
-                effect.id = combat_consts.ALL_EFFECTS[effect_idx]
-                instance.effects.append(effect)
+        instance.effects = types.Effect.deserialize_all(data.effects)
 
         instance.orbs = []
         for o in data.orbs:
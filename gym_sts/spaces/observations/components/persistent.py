@@ -10,7 +10,11 @@ import gym_sts.spaces.constants.base as base_consts
 import gym_sts.spaces.constants.potions as potion_consts
 import gym_sts.spaces.constants.relics as relic_consts
 from gym_sts.spaces.constants.cards import CardCatalog, CardMetadata
-from gym_sts.spaces.observations import serializers, spaces, types, utils
+from gym_sts.spaces.observations import buffers, serializers, spaces, types, utils
+from gym_sts.spaces.observations.config import (
+    DEFAULT_OBSERVATION_CONFIG,
+    ObservationConfig,
+)
 
 from .base import PydanticComponent
 
@@ -59,7 +63,7 @@ class PersistentStateObs(PydanticComponent):
         return v
 
     @staticmethod
-    def space():
+    def space(config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG):
         return Dict(
             {
                 "floor": MultiBinary(base_consts.LOG_NUM_FLOORS),
@@ -72,14 +76,14 @@ class PersistentStateObs(PydanticComponent):
                     [MultiBinary(relic_consts.LOG_MAX_COUNTER)]
                     * relic_consts.NUM_RELICS
                 ),
-                "deck": spaces.generate_card_space(),
+                "deck": spaces.generate_card_space(config),
                 "keys": MultiBinary(base_consts.NUM_KEYS),
                 "map": types.Map.space(),
                 "screen_type": Discrete(len(base_consts.ScreenType.__members__)),
             }
         )
 
-    def serialize(self) -> dict:
+    def serialize(self, config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG) -> dict:
         floor = utils.to_binary_array(self.floor, base_consts.LOG_NUM_FLOORS)
         health = types.Health(hp=self.hp, max_hp=self.max_hp).serialize()
         gold = utils.to_binary_array(self.gold, base_consts.LOG_MAX_GOLD)
@@ -97,7 +101,7 @@ class PersistentStateObs(PydanticComponent):
             ser = relic.serialize()
             relics[ser["id"]] = ser["counter"]
 
-        deck = serializers.serialize_cards(self.deck)
+        deck = serializers.serialize_pile(self.deck, config)
 
         keys = self.keys.serialize()
         map = self.map.serialize()
@@ -118,6 +122,34 @@ class PersistentStateObs(PydanticComponent):
 
         return response
 
+    def serialize_into(
+        self, out: dict, config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG
+    ) -> None:
+        """
+        Like serialize(), but writes into buffers holding the empty encoding (see
+        ObservationBuffers).
+        """
+
+        utils.write_binary_array(self.floor, out["floor"])
+        utils.write_binary_array(self.hp, out["health"]["hp"])
+        utils.write_binary_array(self.max_hp, out["health"]["max_hp"])
+        utils.write_binary_array(self.gold, out["gold"])
+
+        for potion, potion_out in zip(self.potions, out["potions"]):
+            buffers.write(potion_out, potion.serialize())
+
+        for relic in self.relics:
+            ser = relic.serialize()
+            out["relics"][ser["id"]][...] = ser["counter"]
+
+        serializers.write_pile(self.deck, out["deck"], config)
+
+        out["keys"][...] = self.keys.serialize()
+        buffers.write(out["map"], self.map.serialize())
+        out["screen_type"][...] = list(base_consts.ScreenType.__members__).index(
+            self.screen_type.value
+        )
+
     class SerializedState(BaseModel):
         floor: types.BinaryArray
         health: types.Health.SerializedState
@@ -135,6 +167,8 @@ class PersistentStateObs(PydanticComponent):
     @classmethod
     def deserialize(cls, data: Union[dict, SerializedState]) -> PersistentStateObs:
         if not isinstance(data, cls.SerializedState):
+            data = dict(data)
+            data["deck"] = serializers.densify_pile(data["deck"])
             data = cls.SerializedState(**data)
 
         floor = utils.from_binary_array(data.floor)
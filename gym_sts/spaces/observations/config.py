@@ -0,0 +1,73 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, validator
+
+
+# The components that can be selected with ObservationConfig.components
+COMPONENTS = (
+    "persistent_state",
+    "combat_state",
+    "shop_state",
+    "campfire_state",
+    "card_reward_state",
+    "combat_reward_state",
+    "event_state",
+)
+
+
+class ObservationConfig(BaseModel):
+    """
+    How observations are encoded. The defaults match OBSERVATION_SPACE. Use
+    make_observation_space() for the space matching a config.
+    """
+
+    # "dense" encodes each card pile (deck, draw, discard and exhaust) as a count per
+    # card. "sparse" encodes it as padded lists of the distinct cards in the pile and
+    # their counts, which is far smaller since piles only hold a few dozen cards.
+    card_encoding: Literal["dense", "sparse"] = "dense"
+    # How many distinct cards a sparse pile can hold. Extra cards are dropped.
+    max_distinct_cards: int = 64
+    # "dense" encodes the effects (powers) of the player and each enemy as a sign and
+    # magnitude for every known effect. "sparse" encodes them as a fixed number of
+    # (effect id, signed amount) slots, sorted by id.
+    effect_encoding: Literal["dense", "sparse"] = "dense"
+    # How many effects a sparse encoding can hold. Extra effects are dropped.
+    max_effects: int = 16
+    # Which of COMPONENTS to include, or None for all of them. Excluded components
+    # are left out of the space, and are never parsed or encoded. The
+    # valid_action_mask is always included.
+    components: Optional[frozenset[str]] = None
+
+    @validator("max_distinct_cards", "max_effects")
+    def avoid_rllib_special_case(cls, v: int, field) -> int:
+        # rllib treats observations of shape (128,) as Atari RAM
+        if v == 128:
+            raise ValueError(f"{field.name} can't be 128")
+        if v < 1:
+            raise ValueError(f"{field.name} must be positive")
+        return v
+
+    @validator("components")
+    def known_components(cls, v: Optional[frozenset[str]]) -> Optional[frozenset[str]]:
+        if v is not None:
+            unknown = v - set(COMPONENTS)
+            if unknown:
+                raise ValueError(f"Unknown components: {sorted(unknown)}")
+        return v
+
+    def includes(self, component: str) -> bool:
+        return self.components is None or component in self.components
+
+    class Config:
+        # Hashable, so encodings can be cached per config
+        frozen = True
+
+
+DEFAULT_OBSERVATION_CONFIG = ObservationConfig()
+
+# SingleCombatSTSEnv never leaves combat, so the shop, campfire, event and reward
+# screens are always empty. Pass this as its observation_config to leave them out
+# (which changes the observation space, so policies trained on the default don't fit).
+SINGLE_COMBAT_OBSERVATION_CONFIG = ObservationConfig(
+    components=frozenset({"persistent_state", "combat_state"})
+)
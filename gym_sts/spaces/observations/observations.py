@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import functools
-from typing import Union
+from typing import Any, Callable, Optional, Union
 
 import numpy as np
 from gymnasium import spaces
@@ -10,81 +10,138 @@ from pydantic import BaseModel
 from gym_sts.spaces import actions
 from gym_sts.spaces.constants.base import ScreenType
 
-from . import components
+from . import buffers, components
+from .config import DEFAULT_OBSERVATION_CONFIG, ObservationConfig
 
 
 class ObservationError(Exception):
     pass
 
 
-OBSERVATION_SPACE = spaces.Dict(
-    {
-        "persistent_state": components.PersistentStateObs.space(),
-        "combat_state": components.CombatObs.space(),
+def make_observation_space(
+    config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG,
+) -> spaces.Dict:
+    """
+    The space of observations encoded with the given config.
+    """
+
+    component_spaces = {
+        "persistent_state": components.PersistentStateObs.space(config),
+        "combat_state": components.CombatObs.space(config),
         "shop_state": components.ShopObs.space(),
         "campfire_state": components.CampfireObs.space(),
         "card_reward_state": components.CardRewardObs.space(),
         "combat_reward_state": components.CombatRewardObs.space(),
         "event_state": components.EventStateObs.space(),
-        "valid_action_mask": spaces.MultiBinary(len(actions.ACTIONS)),
     }
-)
+
+    return spaces.Dict(
+        {
+            **{
+                name: space
+                for name, space in component_spaces.items()
+                if config.includes(name)
+            },
+            "valid_action_mask": spaces.MultiBinary(len(actions.ACTIONS)),
+        }
+    )
+
+
+OBSERVATION_SPACE = make_observation_space()
 
 
 class Observation:
     class SerializedState(BaseModel):
-        campfire_state: components.CampfireObs.SerializedState
-        card_reward_state: components.CardRewardObs.SerializedState
-        combat_state: components.CombatObs.SerializedState
-        combat_reward_state: components.CombatRewardObs.SerializedState
-        persistent_state: components.PersistentStateObs.SerializedState
-        shop_state: components.ShopObs.SerializedState
+        # Components left out by ObservationConfig.components are missing
+        campfire_state: Optional[components.CampfireObs.SerializedState]
+        card_reward_state: Optional[components.CardRewardObs.SerializedState]
+        combat_state: Optional[components.CombatObs.SerializedState]
+        combat_reward_state: Optional[components.CombatRewardObs.SerializedState]
+        persistent_state: Optional[components.PersistentStateObs.SerializedState]
+        shop_state: Optional[components.ShopObs.SerializedState]
 
     def __init__(self, state: Union[dict, SerializedState]):
-        if isinstance(state, dict):
-            game_state = state.get("game_state", {})
-            screen_type = game_state.get("screen_type", ScreenType.NONE)
-            screen_state = game_state.get("screen_state", {})
+        if isinstance(state, self.SerializedState):
+            # Missing components are left to be parsed lazily from the empty state
+            # below, i.e. they're empty
+            if state.campfire_state is not None:
+                self.campfire_state = components.CampfireObs.deserialize(
+                    state.campfire_state
+                )
+            if state.card_reward_state is not None:
+                self.card_reward_state = components.CardRewardObs.deserialize(
+                    state.card_reward_state
+                )
+            if state.combat_state is not None:
+                self.combat_state = components.CombatObs.deserialize(state.combat_state)
+            if state.combat_reward_state is not None:
+                self.combat_reward_state = components.CombatRewardObs.deserialize(
+                    state.combat_reward_state
+                )
+            if state.persistent_state is not None:
+                self.persistent_state = components.PersistentStateObs.deserialize(
+                    state.persistent_state
+                )
+            if state.shop_state is not None:
+                self.shop_state = components.ShopObs.deserialize(state.shop_state)
 
-            self.persistent_state = components.PersistentStateObs(**game_state)
+            # TODO this doesn't really work because we assume the keys will be present
+            # replace with a pydantic model?
+            self.state = {}
+        else:
+            # Keep a reference to the raw CommunicationMod response, which is either a
+            # dict or a dict-like struct (see gym_sts.communication.schema).
+            # Components are parsed from it lazily, the first time each one is
+            # accessed, since many observations (e.g. polling for stability) never
+            # read most of them.
+            self.state = state
 
-            self.combat_state = components.CombatObs(game_state)
-            self.combat_reward_state = components.CombatRewardObs(game_state)
+        self._serialized: Optional[dict] = None
+        self._serialized_config: Optional[ObservationConfig] = None
 
-            shop_state = screen_state if screen_type == ScreenType.SHOP_SCREEN else {}
-            self.shop_state = components.ShopObs(**shop_state)
+    @property
+    def _game_state(self) -> dict:
+        return self.state.get("game_state", {})
 
-            campfire_state = screen_state if screen_type == ScreenType.REST else {}
-            self.campfire_state = components.CampfireObs(**campfire_state)
+    def _screen_state(self, screen_type: ScreenType) -> dict:
+        """
+        Returns the raw screen state if the game is on the given screen, otherwise an
+        empty dict.
+        """
 
-            card_reward_state = (
-                screen_state if screen_type == ScreenType.CARD_REWARD else {}
-            )
-            self.card_reward_state = components.CardRewardObs(**card_reward_state)
+        game_state = self._game_state
+        if game_state.get("screen_type", ScreenType.NONE) != screen_type:
+            return {}
 
-            self.event_state = components.EventStateObs(state)
+        return game_state.get("screen_state", {})
 
-            # Keep a reference to the raw CommunicationMod response
-            self.state = state
-        else:
-            self.campfire_state = components.CampfireObs.deserialize(
-                state.campfire_state
-            )
-            self.card_reward_state = components.CardRewardObs.deserialize(
-                state.card_reward_state
-            )
-            self.combat_state = components.CombatObs.deserialize(state.combat_state)
-            self.combat_reward_state = components.CombatRewardObs.deserialize(
-                state.combat_reward_state
-            )
-            self.persistent_state = components.PersistentStateObs.deserialize(
-                state.persistent_state
-            )
-            self.shop_state = components.ShopObs.deserialize(state.shop_state)
+    @functools.cached_property
+    def persistent_state(self) -> components.PersistentStateObs:
+        return components.PersistentStateObs(**self._game_state)
 
-            # TODO this doesn't really work because we assume the keys will be present
-            # replace with a pydantic model?
-            self.state = {}
+    @functools.cached_property
+    def combat_state(self) -> components.CombatObs:
+        return components.CombatObs(self._game_state)
+
+    @functools.cached_property
+    def combat_reward_state(self) -> components.CombatRewardObs:
+        return components.CombatRewardObs(self._game_state)
+
+    @functools.cached_property
+    def shop_state(self) -> components.ShopObs:
+        return components.ShopObs(**self._screen_state(ScreenType.SHOP_SCREEN))
+
+    @functools.cached_property
+    def campfire_state(self) -> components.CampfireObs:
+        return components.CampfireObs(**self._screen_state(ScreenType.REST))
+
+    @functools.cached_property
+    def card_reward_state(self) -> components.CardRewardObs:
+        return components.CardRewardObs(**self._screen_state(ScreenType.CARD_REWARD))
+
+    @functools.cached_property
+    def event_state(self) -> components.EventStateObs:
+        return components.EventStateObs(self.state)
 
     @property
     def has_error(self) -> bool:
@@ -152,20 +209,79 @@ class Observation:
 
         return get_valid(self)
 
-    def serialize(self) -> dict:
+    def serialize(self, config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG) -> dict:
+        """
+        Encode the observation to match make_observation_space(config), which by
+        default is OBSERVATION_SPACE.
+
+        The encoding is computed on the first call and reused afterwards, so repeated
+        calls (e.g. when step() falls back to the previous observation) are free.
+        Callers should treat the result as read-only.
+        """
+
+        if self._serialized is not None and self._serialized_config == config:
+            return self._serialized
+
         valid_action_mask = np.zeros([len(actions.ACTIONS)], dtype=bool)
         for action in self.valid_actions:
             valid_action_mask[action._id] = True
 
+        # Excluded components are never parsed, since they're parsed lazily
+        encoders = self._encoders(config)
+        self._serialized_config = config
+        self._serialized = {
+            name: encode() for name, encode in encoders.items() if config.includes(name)
+        }
+        self._serialized["valid_action_mask"] = valid_action_mask
+
+        return self._serialized
+
+    def serialize_into(
+        self, observation_buffers: buffers.ObservationBuffers, copy: bool = False
+    ) -> dict:
+        """
+        Like serialize(), but writes the encoding into preallocated buffers and
+        returns views of them, so encoding allocates almost nothing. The encoding
+        matches make_observation_space(observation_buffers.config).
+
+        Args:
+            observation_buffers: The buffers to write into. The views returned by
+                earlier calls with the same buffers are overwritten.
+            copy: If True, return a copy of the encoding, for callers that keep
+                observations around (e.g. in a replay buffer).
+        """
+
+        config = observation_buffers.config
+        views = observation_buffers.views
+        encoders = self._encoders(config)
+
+        for name in observation_buffers.components:
+            component = getattr(self, name)
+            if hasattr(component, "serialize_into"):
+                observation_buffers.clear(name)
+                component.serialize_into(views[name], config)
+            else:
+                # Small components are encoded as usual, then copied in
+                buffers.write(views[name], encoders[name]())
+
+        valid_action_mask = views["valid_action_mask"]
+        valid_action_mask.fill(False)
+        for action in self.valid_actions:
+            valid_action_mask[action._id] = True
+
+        if copy:
+            return observation_buffers.copy()
+        return views
+
+    def _encoders(self, config: ObservationConfig) -> dict[str, Callable[[], Any]]:
         return {
-            "persistent_state": self.persistent_state.serialize(),
-            "combat_state": self.combat_state.serialize(),
-            "shop_state": self.shop_state.serialize(),
-            "campfire_state": self.campfire_state.serialize(),
-            "card_reward_state": self.card_reward_state.serialize(),
-            "combat_reward_state": self.combat_reward_state.serialize(),
-            "event_state": self.event_state.serialize(),
-            "valid_action_mask": valid_action_mask,
+            "persistent_state": lambda: self.persistent_state.serialize(config),
+            "combat_state": lambda: self.combat_state.serialize(config),
+            "shop_state": lambda: self.shop_state.serialize(),
+            "campfire_state": lambda: self.campfire_state.serialize(),
+            "card_reward_state": lambda: self.card_reward_state.serialize(),
+            "combat_reward_state": lambda: self.combat_reward_state.serialize(),
+            "event_state": lambda: self.event_state.serialize(),
         }
 
     @classmethod
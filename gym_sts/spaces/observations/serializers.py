@@ -1,9 +1,86 @@
+import collections
+from typing import Union
+
 import numpy as np
 import numpy.typing as npt
 
 from gym_sts.spaces.constants import cards as card_consts
 from gym_sts.spaces.constants import combat as combat_consts
 from gym_sts.spaces.observations import types
+from gym_sts.spaces.observations.config import (
+    DEFAULT_OBSERVATION_CONFIG,
+    ObservationConfig,
+)
+
+
+def serialize_pile(
+    cards: list[types.Card], config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG
+) -> Union[npt.NDArray[np.uint], dict]:
+    """
+    Encode a pile of cards to match spaces.generate_card_space(config).
+    """
+
+    if config.card_encoding == "dense":
+        return serialize_cards(cards)
+
+    # Cards are listed in index order, padded with the NONE card, which has index 0
+    size = config.max_distinct_cards
+    counts = _count_cards(cards)
+    indices = sorted(counts)[:size]
+
+    sparse_cards = np.zeros(size, dtype=np.int32)
+    sparse_cards[: len(indices)] = indices
+    sparse_counts = np.zeros(size, dtype=np.uint8)
+    sparse_counts[: len(indices)] = [counts[card_idx] for card_idx in indices]
+
+    return {"cards": sparse_cards, "counts": sparse_counts}
+
+
+def _count_cards(cards: list[types.Card]) -> dict[int, int]:
+    # Copies of each card by index, capped like in the dense encoding
+    counts = collections.Counter(card.serialize(discrete=True) for card in cards)
+    return {
+        card_idx: min(count, card_consts.MAX_COPIES_OF_CARD)
+        for card_idx, count in counts.items()
+    }
+
+
+def write_pile(
+    cards: list[types.Card],
+    out: Union[npt.NDArray[np.uint], dict],
+    config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG,
+) -> None:
+    """
+    Like serialize_pile(), but writes into buffers holding the empty encoding (see
+    ObservationBuffers).
+    """
+
+    if config.card_encoding == "dense":
+        for card in cards:
+            card_idx = card.serialize(discrete=True)
+            if out[card_idx] < card_consts.MAX_COPIES_OF_CARD:
+                out[card_idx] += 1
+        return
+
+    counts = _count_cards(cards)
+    for i, card_idx in enumerate(sorted(counts)[: config.max_distinct_cards]):
+        out["cards"][i] = card_idx
+        out["counts"][i] = counts[card_idx]
+
+
+def densify_pile(pile: Union[npt.NDArray[np.uint], dict]) -> npt.NDArray[np.uint]:
+    """
+    Convert a pile encoded by serialize_pile() to the dense encoding.
+    """
+
+    if not isinstance(pile, dict):
+        return pile
+
+    dense = np.zeros(card_consts.NUM_CARDS_WITH_UPGRADES, dtype=np.uint8)
+    dense[np.asarray(pile["cards"], dtype=np.int64)] += np.asarray(
+        pile["counts"], dtype=np.uint8
+    )
+    return dense
 
 
 def serialize_cards(cards: list[types.Card]) -> npt.NDArray[np.uint]:
@@ -25,3 +102,12 @@ def serialize_orbs(orbs: list[types.Orb]) -> npt.NDArray[np.uint]:
         serialized[i] = orb.serialize()
 
     return serialized
+
+
+def write_orbs(orbs: list[types.Orb], out: npt.NDArray[np.uint]) -> None:
+    """
+    Like serialize_orbs(), but writes into a buffer holding the empty encoding.
+    """
+
+    for i, orb in enumerate(orbs):
+        out[i] = orb.serialize()
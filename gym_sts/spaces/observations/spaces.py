@@ -1,11 +1,30 @@
-from gymnasium.spaces import Dict, Discrete, MultiBinary, MultiDiscrete, Tuple
+import numpy as np
+from gymnasium.spaces import Box, Dict, Discrete, MultiBinary, MultiDiscrete, Tuple
 
 import gym_sts.spaces.constants.base as base_consts
 import gym_sts.spaces.constants.cards as card_consts
 import gym_sts.spaces.constants.combat as combat_consts
+from gym_sts.spaces.observations.config import (
+    DEFAULT_OBSERVATION_CONFIG,
+    ObservationConfig,
+)
 
 
-def generate_card_space():
+def generate_card_space(config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG):
+    if config.card_encoding == "sparse":
+        # Boxes rather than MultiDiscretes, which rllib would one-hot encode
+        size = config.max_distinct_cards
+        return Dict(
+            {
+                "cards": Box(
+                    0, card_consts.NUM_CARDS_WITH_UPGRADES - 1, (size,), dtype=np.int32
+                ),
+                "counts": Box(
+                    0, card_consts.MAX_COPIES_OF_CARD, (size,), dtype=np.uint8
+                ),
+            }
+        )
+
     # Generally beyond some number of cards you don't actually care
     # how many cards you have
     # But this could be optimized
@@ -14,7 +33,22 @@ def generate_card_space():
     )
 
 
-def generate_effect_space():
+def generate_effect_space(config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG):
+    if config.effect_encoding == "sparse":
+        # Empty slots have the id NUM_EFFECTS
+        size = config.max_effects
+        return Dict(
+            {
+                "ids": Box(0, combat_consts.NUM_EFFECTS, (size,), dtype=np.int32),
+                "amounts": Box(
+                    -combat_consts.MAX_EFFECT,
+                    combat_consts.MAX_EFFECT,
+                    (size,),
+                    dtype=np.int32,
+                ),
+            }
+        )
+
     effect_space = Dict(
         {
             "sign": Discrete(2),
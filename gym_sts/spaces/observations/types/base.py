@@ -11,10 +11,21 @@ import gym_sts.spaces.constants.base as base_consts
 import gym_sts.spaces.constants.combat as combat_consts
 import gym_sts.spaces.constants.shop as shop_consts
 from gym_sts.spaces.observations import spaces, utils
+from gym_sts.spaces.observations.config import (
+    DEFAULT_OBSERVATION_CONFIG,
+    ObservationConfig,
+)
 
 
 BinaryArray = npt.NDArray[np.uint]
 
+EFFECT_INDICES = {effect_id: i for i, effect_id in enumerate(combat_consts.ALL_EFFECTS)}
+
+# A few effects are listed twice in ALL_EFFECTS, and the dense encoding sets both
+EFFECT_DENSE_INDICES: dict[str, list[int]] = {}
+for i, effect_id in enumerate(combat_consts.ALL_EFFECTS):
+    EFFECT_DENSE_INDICES.setdefault(effect_id, []).append(i)
+
 
 class ShopMixin(BaseModel):
     price: int = Field(..., ge=0, lt=2**shop_consts.SHOP_LOG_MAX_PRICE)
@@ -64,7 +75,16 @@ class Effect(BaseModel):
         }
 
     @staticmethod
-    def serialize_all(effects: list[Effect]) -> list[dict]:
+    def serialize_all(
+        effects: list[Effect], config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG
+    ) -> Union[list[dict], dict]:
+        """
+        Encode a creature's effects to match spaces.generate_effect_space(config).
+        """
+
+        if config.effect_encoding == "sparse":
+            return Effect._serialize_sparse(effects, config.max_effects)
+
         serialized = []
         effect_map = {effect.id: effect for effect in effects}
 
@@ -81,6 +101,70 @@ class Effect(BaseModel):
 
         return serialized
 
+    @staticmethod
+    def _serialize_sparse(effects: list[Effect], size: int) -> dict:
+        indexed = sorted(
+            (EFFECT_INDICES[effect.id], effect.amount)
+            for effect in effects
+            if effect.id in EFFECT_INDICES
+        )[:size]
+
+        ids = np.full(size, combat_consts.NUM_EFFECTS, dtype=np.int32)
+        amounts = np.zeros(size, dtype=np.int32)
+        if indexed:
+            ids[: len(indexed)], amounts[: len(indexed)] = zip(*indexed)
+
+        return {"ids": ids, "amounts": amounts}
+
+    @staticmethod
+    def write_all(
+        effects: list[Effect],
+        out: Union[list[dict], dict],
+        config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG,
+    ) -> None:
+        """
+        Like serialize_all(), but writes into buffers holding the empty encoding (see
+        ObservationBuffers).
+        """
+
+        if config.effect_encoding == "sparse":
+            indexed = sorted(
+                (EFFECT_INDICES[effect.id], effect.amount)
+                for effect in effects
+                if effect.id in EFFECT_INDICES
+            )[: config.max_effects]
+            for i, (effect_idx, amount) in enumerate(indexed):
+                out["ids"][i] = effect_idx
+                out["amounts"][i] = amount
+            return
+
+        for effect in effects:
+            for effect_idx in EFFECT_DENSE_INDICES.get(effect.id, []):
+                encoding = out[effect_idx]
+                encoding["sign"][...] = int(effect.amount < 0)
+                utils.write_binary_array(abs(effect.amount), encoding["value"])
+
+    @classmethod
+    def deserialize_all(cls, data: Union[list, dict]) -> list[Effect]:
+        """
+        Decode the output of serialize_all(), in either encoding.
+        """
+
+        effects = []
+        if isinstance(data, dict):
+            for effect_idx, amount in zip(data["ids"], data["amounts"]):
+                if effect_idx < combat_consts.NUM_EFFECTS and amount != 0:
+                    effect_id = combat_consts.ALL_EFFECTS[effect_idx]
+                    effects.append(cls(id=effect_id, amount=int(amount)))
+            return effects
+
+        for effect_idx, e in enumerate(data):
+            effect = cls.deserialize(e)
+            if effect.amount != 0:
+                effect.id = combat_consts.ALL_EFFECTS[effect_idx]
+                effects.append(effect)
+        return effects
+
     class SerializedState(BaseModel):
         sign: int = Field(..., ge=0, le=1)
         value: BinaryArray
@@ -202,49 +286,66 @@ class Enemy(BaseModel):
         return max(0, v)
 
     @staticmethod
-    def space() -> Dict:
+    def space(config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG) -> Dict:
         return Dict(
             {
                 "id": Discrete(combat_consts.NUM_MONSTER_TYPES),
                 "intent": Discrete(combat_consts.NUM_INTENTS),
                 "attack": Attack.space(),
                 "block": MultiBinary(combat_consts.LOG_MAX_BLOCK),
-                "effects": spaces.generate_effect_space(),
+                "effects": spaces.generate_effect_space(config),
                 "health": spaces.generate_health_space(),
             }
         )
 
     @staticmethod
-    def serialize_empty() -> dict:
+    def serialize_empty(config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG) -> dict:
         serialized = {
             "id": 0,
             "intent": 0,
             "attack": Attack(damage=0, times=0).serialize(),
             "block": utils.to_binary_array(0, combat_consts.LOG_MAX_BLOCK),
-            "effects": Effect.serialize_all([]),
+            "effects": Effect.serialize_all([], config),
             "health": Health(hp=0, max_hp=0).serialize(),
         }
 
         return serialized
 
-    def serialize(self) -> dict:
+    def serialize(self, config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG) -> dict:
         serialized = {
             "id": combat_consts.ALL_MONSTER_TYPES.index(self.id),
             "intent": combat_consts.ALL_INTENTS.index(self.intent),
             "attack": Attack(damage=self.damage, times=self.times).serialize(),
             "block": utils.to_binary_array(self.block, combat_consts.LOG_MAX_BLOCK),
-            "effects": Effect.serialize_all(self.effects),
+            "effects": Effect.serialize_all(self.effects, config),
             "health": Health(hp=self.current_hp, max_hp=self.max_hp).serialize(),
         }
 
         return serialized
 
+    def write(
+        self, out: dict, config: ObservationConfig = DEFAULT_OBSERVATION_CONFIG
+    ) -> None:
+        """
+        Like serialize(), but writes into buffers holding the empty encoding (see
+        ObservationBuffers).
+        """
+
+        out["id"][...] = combat_consts.ALL_MONSTER_TYPES.index(self.id)
+        out["intent"][...] = combat_consts.ALL_INTENTS.index(self.intent)
+        utils.write_binary_array(self.damage, out["attack"]["damage"])
+        utils.write_binary_array(self.times, out["attack"]["times"])
+        utils.write_binary_array(self.block, out["block"])
+        Effect.write_all(self.effects, out["effects"], config)
+        utils.write_binary_array(self.current_hp, out["health"]["hp"])
+        utils.write_binary_array(self.max_hp, out["health"]["max_hp"])
+
     class SerializedState(BaseModel):
         id: int
         intent: int
         attack: Attack.SerializedState
         block: BinaryArray
-        effects: list[dict]
+        effects: Union[list[dict], dict]
         health: Health.SerializedState
 
         class Config:
@@ -255,12 +356,7 @@ class Enemy(BaseModel):
         if not isinstance(data, cls.SerializedState):
             data = cls.SerializedState(**data)
 
-        effects = []
-        for effect_idx, e in enumerate(data.effects):
-            effect = Effect.deserialize(e)
-            if effect.amount != 0:
-                effect.id = combat_consts.ALL_EFFECTS[effect_idx]
-                effects.append(effect)
+        effects = Effect.deserialize_all(data.effects)
 
         health = Health.deserialize(data.health)
         attack = Attack.deserialize(data.attack)
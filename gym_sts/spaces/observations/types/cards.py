@@ -125,6 +125,17 @@ class HandCard(Card):
             "is_playable": int(self.is_playable),
         }
 
+    def write(self, out: dict) -> None:
+        """
+        Like serialize(), but writes into the views of an existing encoding.
+        """
+
+        # An upgrade bit followed by the card index, as in Card._serialize()
+        card = out["card"]
+        card[0] = int(self.upgrades > 0)
+        utils.write_binary_array(CardCatalog.ids.index(self.id), card[1:])
+        out["is_playable"][...] = int(self.is_playable)
+
     class SerializedState(BaseModel):
         card: BinaryArray
         is_playable: int = Field(..., ge=0, le=1)
@@ -23,6 +23,26 @@ def to_binary_array(n: int, digits: int) -> np.ndarray:
     return np.array(array, dtype=np.uint8)
 
 
+def write_binary_array(n: int, out: np.ndarray) -> None:
+    """
+    Like to_binary_array(), but writes the digits into an existing array.
+    """
+
+    out.fill(0)
+
+    idx = 0
+    n_copy = n
+    while n_copy > 0:
+        if idx >= len(out):
+            raise ValueError(
+                f"{n} is too large to represent with {len(out)} binary digits"
+            )
+
+        n_copy, r = divmod(n_copy, 2)
+        out[idx] = r
+        idx += 1
+
+
 def from_binary_array(array: Union[list[int], npt.NDArray[np.uint]]) -> int:
     total = 0
     place_value = 1
@@ -0,0 +1,155 @@
+import json
+
+import numpy as np
+import pytest
+
+from gym_sts.communication.decoding import make_decoder
+from gym_sts.spaces.observations import Observation
+
+
+def _card(card_id: str, name: str, **kwargs) -> dict:
+    card = {
+        "id": card_id,
+        "name": name,
+        "cost": 1,
+        "upgrades": 0,
+        "has_target": False,
+        "exhausts": False,
+        "ethereal": False,
+        "uuid": "abc",
+        "type": "SKILL",
+        "rarity": "BASIC",
+        "misc": 0,
+        "is_playable": True,
+    }
+    card.update(kwargs)
+    return card
+
+
+COMBAT_MESSAGE = {
+    "available_commands": ["play", "end", "key", "click", "wait", "state"],
+    "ready_for_command": True,
+    "in_game": True,
+    "game_state": {
+        "screen_type": "NONE",
+        "screen_state": {},
+        "screen_name": "NONE",
+        "room_phase": "COMBAT",
+        "floor": 1,
+        "act": 1,
+        "act_boss": "Hexaghost",
+        "seed": 1234,
+        "class": "DEFECT",
+        "ascension_level": 0,
+        "current_hp": 70,
+        "max_hp": 75,
+        "gold": 99,
+        "potions": [
+            {
+                "id": "Potion Slot",
+                "name": "Potion Slot",
+                "requires_target": False,
+                "can_use": False,
+                "can_discard": False,
+            }
+        ],
+        "relics": [{"id": "Cracked Core", "name": "Cracked Core", "counter": -1}],
+        "deck": [_card("Zap", "Zap"), _card("Strike_B", "Strike", has_target=True)],
+        "keys": {"ruby": False, "emerald": True, "sapphire": False},
+        "map": [
+            {"x": 0, "y": 0, "symbol": "M", "children": [{"x": 1, "y": 1}]},
+            {"x": 1, "y": 1, "symbol": "E", "children": [], "is_burning": True},
+        ],
+        "combat_state": {
+            "turn": 1,
+            "hand": [_card("Zap", "Zap")],
+            "draw_pile": [_card("Strike_B", "Strike", has_target=True)],
+            "discard_pile": [],
+            "exhaust_pile": [],
+            "limbo": [],
+            "cards_discarded_this_turn": 0,
+            "times_damaged": 0,
+            "player": {
+                "current_hp": 70,
+                "max_hp": 75,
+                "block": 5,
+                "energy": 3,
+                "powers": [{"id": "Focus", "name": "Focus", "amount": -1}],
+                "orbs": [{"id": "Lightning", "name": "Lightning"}, {"id": "Empty"}],
+            },
+            "monsters": [
+                {
+                    "id": "JawWorm",
+                    "name": "Jaw Worm",
+                    "intent": "ATTACK",
+                    "current_hp": 40,
+                    "max_hp": 42,
+                    "block": 0,
+                    "move_adjusted_damage": 11,
+                    "move_hits": 1,
+                    "powers": [{"id": "Strength", "name": "Strength", "amount": 3}],
+                    "is_gone": False,
+                    "half_dead": False,
+                }
+            ],
+        },
+    },
+}
+
+
+def _assert_equal(a, b):
+    if isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for key in a:
+            _assert_equal(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            _assert_equal(x, y)
+    else:
+        assert np.array_equal(a, b)
+
+
+def test_schema_decoder_matches_json_decoder():
+    pytest.importorskip("msgspec")
+
+    message = json.dumps(COMBAT_MESSAGE)
+    from_json = Observation(make_decoder("json")(message))
+    from_schema = Observation(make_decoder("schema")(message))
+
+    assert not isinstance(from_schema.state, dict)
+    assert from_schema.stable
+    assert from_schema.in_combat
+    assert from_schema.screen_type == "NONE"
+    assert from_schema.persistent_state == from_json.persistent_state
+    assert from_schema.combat_state == from_json.combat_state
+    _assert_equal(from_json.serialize(), from_schema.serialize())
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        COMBAT_MESSAGE,
+        {"available_commands": ["start", "state"], "ready_for_command": True},
+        {"error": "Invalid command", "ready_for_command": True},
+    ],
+)
+def test_schema_decoder_gives_the_same_output_as_json_loads(message: dict):
+    msgspec = pytest.importorskip("msgspec")
+
+    encoded = json.dumps(message)
+    decoded = make_decoder("schema")(encoded)
+    assert msgspec.to_builtins(decoded) == json.loads(encoded)
+
+
+def test_schema_decoder_falls_back_to_dict():
+    pytest.importorskip("msgspec")
+
+    # floor should be an int
+    message = json.dumps({"ready_for_command": True, "game_state": {"floor": "1"}})
+    state = make_decoder("schema")(message)
+
+    assert isinstance(state, dict)
+
+    with pytest.raises(json.JSONDecodeError):
+        make_decoder("schema")("{not json")
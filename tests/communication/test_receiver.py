@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+from gym_sts import exceptions
+from gym_sts.communication.receiver import Receiver, peek_ready
+
+
+def _message(ready: bool) -> dict:
+    return {
+        "available_commands": ["state"],
+        "ready_for_command": ready,
+        "in_game": True,
+        "game_state": {"screen_type": "NONE"},
+    }
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        (b'{"ready_for_command": true, "in_game": false}', True),
+        (b'{"ready_for_command":false}', False),
+        (b'{"in_game": false, "ready_for_command": true}', True),
+        (b'{"error": "Invalid command"}', None),
+        (b'{"text": "\\"ready_for_command\\": false"}', None),
+    ],
+)
+def test_peek_ready(message: bytes, expected):
+    assert peek_ready(message) is expected
+
+
+@pytest.fixture
+def pipe():
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    reader = open(r, "rb", buffering=0)
+    writer = open(w, "w")
+    yield reader, writer
+    reader.close()
+    writer.close()
+
+
+def test_receiver_skips_intermediate_states(pipe):
+    reader, writer = pipe
+    receiver = Receiver(reader, timeout=1)
+
+    for ready in [False, False, True]:
+        writer.write(json.dumps(_message(ready)) + "\n")
+    writer.flush()
+
+    state = receiver.receive_game_state()
+
+    assert state == _message(True)
+    assert receiver.num_skipped == 2
+    assert receiver.num_parsed == 1
+
+
+def test_receiver_times_out(pipe):
+    reader, writer = pipe
+    receiver = Receiver(reader, timeout=0.2)
+
+    writer.write(json.dumps(_message(False)) + "\n")
+    writer.flush()
+
+    with pytest.raises(exceptions.StSTimeoutError):
+        receiver.receive_game_state()
+
+
+def test_receiver_skips_responses_to_earlier_commands(pipe):
+    reader, writer = pipe
+    receiver = Receiver(reader, timeout=1, sequenced=True)
+
+    stale = dict(_message(True), in_game=False)
+    for seq, message in [(2, stale), (3, _message(True)), (4, stale)]:
+        writer.write(f"{seq} {json.dumps(message)}\n")
+    writer.flush()
+
+    # Responses to later commands are accepted too
+    assert receiver.receive_game_state(seq=3) == _message(True)
+    assert receiver.receive_game_state(seq=3) == stale
+    assert receiver.num_stale == 1
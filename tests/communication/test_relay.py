@@ -0,0 +1,84 @@
+import json
+import os
+import pathlib
+import select
+import shutil
+import subprocess
+
+import pytest
+
+
+RELAY = pathlib.Path(__file__).parents[2] / "gym_sts" / "build" / "relay.sh"
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("bash") is None or shutil.which("awk") is None,
+    reason="The relay needs bash and awk",
+)
+
+
+def read_line(fd: int, buffer: bytearray, timeout: float = 5) -> str:
+    while b"\n" not in buffer:
+        ready, _, _ = select.select([fd], [], [], timeout)
+        assert ready, "Timed out waiting for the relay"
+        buffer += os.read(fd, 4096)
+    line, _, rest = bytes(buffer).partition(b"\n")
+    buffer[:] = rest
+    return line.decode()
+
+
+@pytest.fixture
+def relay(tmp_path):
+    input_path = tmp_path / "input"
+    output_path = tmp_path / "output"
+    os.mkfifo(input_path)
+    os.mkfifo(output_path)
+
+    # O_RDWR, so opening a fifo doesn't wait for the other end
+    input_fd = os.open(input_path, os.O_RDWR)
+    output_fd = os.open(output_path, os.O_RDWR)
+
+    # The relay's stdout goes to the game, and its stdin comes from the game
+    process = subprocess.Popen(
+        ["bash", "-c", f'source "{RELAY}" && relay "$0" "$1"', input_path, output_path],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        env={**os.environ, "STS_SEQUENCED": "1"},
+    )
+    yield process, input_fd, output_fd
+
+    process.stdin.close()
+    process.wait(timeout=5)
+    process.stdout.close()
+    os.close(input_fd)
+    os.close(output_fd)
+
+
+def test_responses_are_tagged_with_their_command(relay):
+    process, input_fd, output_fd = relay
+    from_host = bytearray()
+
+    def send(command):
+        os.write(input_fd, f"{command}\n".encode())
+        # As received by the game
+        return process.stdout.readline().decode().rstrip("\n")
+
+    def respond(**message):
+        process.stdin.write((json.dumps(message) + "\n").encode())
+        process.stdin.flush()
+        seq, _, response = read_line(output_fd, from_host).partition(" ")
+        assert json.loads(response) == message
+        return int(seq)
+
+    # Both commands are forwarded before the game responds to the first
+    assert send("1 STATE") == "STATE"
+    assert send("2 CHOOSE 0") == "CHOOSE 0"
+    assert respond(ready_for_command=False) == 0
+    assert respond(ready_for_command=True, n=1) == 1
+    assert respond(ready_for_command=False) == 1
+    assert respond(ready_for_command=True, n=2) == 2
+
+    # A message that doesn't respond to any command keeps the previous id
+    assert respond(ready_for_command=True, n=0) == 2
+
+    assert send("3 STATE") == "STATE"
+    assert respond(ready_for_command=True, n=3) == 3
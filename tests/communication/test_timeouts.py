@@ -0,0 +1,29 @@
+import pytest
+
+from gym_sts.communication.timeouts import AdaptiveTimeouts, TimeoutPolicy
+
+
+def test_timeouts_per_command_type():
+    timeouts = AdaptiveTimeouts(TimeoutPolicy(floor=1, cap=30, min_samples=10))
+
+    for _ in range(9):
+        timeouts.record("STATE", 0.01)
+    assert timeouts.timeout("STATE", default=50) == 50
+
+    timeouts.record("STATE", 0.01)
+    assert timeouts.timeout("STATE", default=50) == 1
+
+    for _ in range(10):
+        timeouts.record("START", 2)
+    assert timeouts.timeout("START", default=50) == 20
+
+    for _ in range(10):
+        timeouts.record("START", 10)
+    assert timeouts.timeout("START", default=50) == 30
+
+    assert timeouts.summary()["STATE"]["count"] == 10
+
+
+def test_timeout_policy_validation():
+    with pytest.raises(ValueError):
+        TimeoutPolicy(floor=10, cap=5)
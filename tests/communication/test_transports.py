@@ -0,0 +1,103 @@
+import os
+import select
+import socket
+import threading
+
+import pytest
+
+from gym_sts.communication.transports import FifoTransport, SocketTransport
+
+
+def read_message(reader) -> bytes:
+    # Readers are non-blocking
+    ready, _, _ = select.select([reader], [], [], 5)
+    assert ready, "Timed out waiting for a message"
+    return os.read(reader.fileno(), 4096)
+
+
+def test_fifo_round_trip(tmp_path):
+    transport = FifoTransport(tmp_path / "input", tmp_path / "output")
+    transport.prepare()
+
+    # Like the relay, which opens its ends of the fifos as the game starts
+    relay = {}
+
+    def open_relay():
+        # In the order the host opens them, since each open waits for the other end
+        relay["output"] = open(transport.output_path, "w")
+        relay["input"] = open(transport.input_path, "r")
+
+    thread = threading.Thread(target=open_relay)
+    thread.start()
+    reader, writer = transport.connect()
+    thread.join(timeout=5)
+
+    try:
+        writer.write("STATE\n")
+        writer.flush()
+        assert relay["input"].readline() == "STATE\n"
+
+        relay["output"].write('{"ready_for_command": true}\n')
+        relay["output"].flush()
+        assert read_message(reader) == b'{"ready_for_command": true}\n'
+    finally:
+        reader.close()
+        writer.close()
+        relay["input"].close()
+        relay["output"].close()
+
+    transport.close()
+    assert not transport.input_path.exists()
+    assert not transport.output_path.exists()
+
+
+def test_socket_round_trip(tmp_path):
+    transport = SocketTransport(tmp_path / "sts.sock", accept_timeout=5)
+    transport.prepare()
+    assert transport.socket_path.exists()
+
+    # Like socat in the relay
+    relay = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    relay.connect(str(transport.socket_path))
+    reader, writer = transport.connect()
+
+    try:
+        writer.write("STATE\n")
+        writer.flush()
+        assert relay.recv(4096) == b"STATE\n"
+
+        relay.sendall(b'{"ready_for_command": true}\n')
+        assert read_message(reader) == b'{"ready_for_command": true}\n'
+    finally:
+        writer.close()
+        relay.close()
+
+    transport.close()
+    assert transport.connection is None
+    assert not transport.socket_path.exists()
+
+
+def test_socket_accept_timeout(tmp_path):
+    transport = SocketTransport(tmp_path / "sts.sock", accept_timeout=0.1)
+    try:
+        with pytest.raises(socket.timeout):
+            transport.connect()
+    finally:
+        transport.close()
+
+    assert transport.server is None
+    assert not transport.socket_path.exists()
+
+
+def test_prepare_replaces_a_stale_socket(tmp_path):
+    path = tmp_path / "sts.sock"
+    path.write_text("left over from an earlier game")
+
+    transport = SocketTransport(path, accept_timeout=5)
+    transport.prepare()
+    try:
+        relay = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        relay.connect(str(path))
+        relay.close()
+    finally:
+        transport.close()
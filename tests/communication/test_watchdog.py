@@ -0,0 +1,57 @@
+import os
+import time
+
+import pytest
+
+from gym_sts import exceptions
+from gym_sts.communication.receiver import Receiver
+from gym_sts.communication.watchdog import LatencyModel, Watchdog
+
+
+@pytest.fixture
+def reader():
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    with open(r, "rb", buffering=0) as reader, open(w, "w"):
+        yield reader
+
+
+def test_latency_quantile():
+    latencies = LatencyModel(history=100)
+    assert latencies.quantile(0.99) is None
+
+    for i in range(1, 101):
+        latencies.record(i)
+
+    assert latencies.quantile(0.99) == 99
+    assert latencies.quantile(0.5) == 50
+
+
+def test_dead_game_aborts_wait(reader):
+    watchdog = Watchdog(lambda: False, check_interval=0.1)
+    receiver = Receiver(reader, timeout=10, watchdog=watchdog)
+
+    start = time.monotonic()
+    with pytest.raises(exceptions.StSTimeoutError, match="exited"):
+        receiver.receive_game_state()
+    assert time.monotonic() - start < 1
+
+
+def test_idle_game_aborts_wait(reader):
+    watchdog = Watchdog(lambda: True, lambda: 1.0, min_stall=0.2, check_interval=0.1)
+    receiver = Receiver(reader, timeout=10, watchdog=watchdog)
+
+    start = time.monotonic()
+    with pytest.raises(exceptions.StSTimeoutError, match="idle"):
+        receiver.receive_game_state()
+    assert time.monotonic() - start < 1
+
+
+def test_busy_game_is_left_alone(reader):
+    watchdog = Watchdog(
+        lambda: True, time.monotonic, min_stall=0.1, check_interval=0.05
+    )
+    receiver = Receiver(reader, timeout=0.5, watchdog=watchdog)
+
+    with pytest.raises(exceptions.StSTimeoutError, match="Waited 0.5 seconds"):
+        receiver.receive_game_state()
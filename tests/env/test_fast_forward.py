@@ -0,0 +1,154 @@
+import pytest
+
+from gym_sts import exceptions
+from gym_sts.envs.action_validation import accepts_actions
+from gym_sts.envs.base import SlayTheSpireGymEnv
+from gym_sts.envs.transpositions import TranspositionCache
+from gym_sts.spaces.actions import ACTIONS, Proceed
+from gym_sts.spaces.observations import Observation
+
+
+def make_obs(commands, ready=True):
+    return Observation(
+        {"available_commands": commands, "ready_for_command": ready, "in_game": True}
+    )
+
+
+def test_accepts_actions():
+    assert accepts_actions(make_obs(["choose", "state"]))
+    assert not accepts_actions(make_obs(["choose", "state"], ready=False))
+    assert not accepts_actions(make_obs(["wait", "key", "click", "state"]))
+    assert not accepts_actions(Observation({"error": "Invalid command"}))
+
+
+class FakeCommunicator:
+    def __init__(self, responses):
+        self.responses = responses
+        self.commands = []
+
+    def _manual_command(self, command):
+        self.commands.append(command)
+        return self.responses.pop(0)
+
+    def state(self):
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+
+def test_replay():
+    env = SlayTheSpireGymEnv("lib", "mods")
+    try:
+        final = make_obs(["proceed"])
+        env.communicator = FakeCommunicator(
+            [
+                Observation({"error": "Invalid command"}),
+                # Still animating, so the env polls for the state
+                make_obs(["state"]),
+                make_obs(["state"], ready=False),
+                final,
+            ]
+        )
+
+        proceed = next(i for i, a in enumerate(ACTIONS) if isinstance(a, Proceed))
+        start = make_obs(["proceed"])
+        assert env._replay(start, [proceed, proceed]) is final
+        assert env.communicator.commands == ["PROCEED", "PROCEED"]
+        assert env.counters["stability_retries"] == 1
+        assert env.counters["observe_retries"] == 1
+    finally:
+        env.close()
+
+
+def test_catch_up_compares_against_cached_state():
+    env = SlayTheSpireGymEnv("lib", "mods")
+    try:
+        env.communicator = FakeCommunicator([Observation({"error": "Invalid command"})])
+
+        proceed = next(i for i, a in enumerate(ACTIONS) if isinstance(a, Proceed))
+        start = make_obs(["proceed"])
+        expected = make_obs(["choose"])
+        env.observation_cache.append(expected)
+        env._pending_actions = [proceed]
+        env._catch_up_start = start
+
+        # The game rejected the action, so it's still at the start
+        env._catch_up()
+        assert env.counters["transposition_mismatches"] == 1
+        assert env.observation_cache.get() is start
+        assert not env._pending_actions
+    finally:
+        env.close()
+
+
+PROCEED = next(i for i, a in enumerate(ACTIONS) if isinstance(a, Proceed))
+
+
+class FakeGameEnv(SlayTheSpireGymEnv):
+    """
+    An env whose game is a FakeCommunicator. Every run starts at make_obs(["proceed"]).
+    """
+
+    def __init__(self, responses, **kwargs):
+        super().__init__("lib", "mods", value_fn=lambda obs: 0.0, **kwargs)
+        self.responses = responses
+
+    def start(self):
+        self.communicator = FakeCommunicator(self.responses)
+
+    def _end_game(self):
+        pass
+
+    def _start_run(self, sts_seed):
+        return make_obs(["proceed"])
+
+
+def test_fast_forward():
+    first, second = make_obs(["choose"]), make_obs(["proceed", "choose"])
+    env = FakeGameEnv([Observation({"error": "Invalid command"}), first, second])
+    try:
+        _, info = env.fast_forward(
+            "ABC", [PROCEED] * 3, checkpoints={1: make_obs(["proceed"]), 2: first}
+        )
+
+        # Every action is sent, and the rejected one is checked against the start
+        assert env.communicator.commands == ["PROCEED"] * 3
+        assert info["sts_seed"] == "ABC"
+        assert info["observation"] is second
+        assert env.observation_cache.get() is second
+    finally:
+        env.close()
+
+
+def test_fast_forward_checks_checkpoints():
+    env = FakeGameEnv([make_obs(["choose"]), make_obs(["choose"])])
+    try:
+        with pytest.raises(exceptions.StSError, match="after action 1"):
+            env.fast_forward("ABC", [PROCEED] * 2, checkpoints={1: make_obs(["end"])})
+        # Replaying stops at the first mismatch
+        assert env.communicator.commands == ["PROCEED"]
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("rejected", [False, True])
+def test_cached_steps_are_caught_up(rejected: bool):
+    cached = make_obs(["choose"])
+    response = Observation({"error": "Invalid command"}) if rejected else cached
+    latest = make_obs(["choose", "state"])
+    env = FakeGameEnv([response, latest], transposition_cache=TranspositionCache())
+    try:
+        env.reset(options={"sts_seed": "ABC"})
+        env.transposition_cache.insert(env._trie_node, PROCEED, cached.state)
+
+        _, _, _, _, info = env.step(PROCEED)
+        assert info["cached"]
+        assert env.communicator.commands == []
+
+        # Observing sends the game the cached action first
+        assert env.observe() is latest
+        assert env.communicator.commands == ["PROCEED"]
+        assert env.counters["transposition_mismatches"] == int(rejected)
+    finally:
+        env.close()
@@ -0,0 +1,49 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from gym_sts.envs.base import SlayTheSpireGymEnv
+from gym_sts.envs.fleet import launch_fleet
+
+
+class FakeEnv(SlayTheSpireGymEnv):
+    boot_time = 0.3
+    fail = False
+
+    def launch(self):
+        pass
+
+    def await_ready(self):
+        time.sleep(self.boot_time)
+        if self.fail:
+            raise RuntimeError("Boot failed")
+        self.booted = True
+
+    def stop(self):
+        self.booted = False
+
+
+@pytest.fixture
+def client():
+    return SimpleNamespace(images=SimpleNamespace(get=lambda tag: None))
+
+
+def test_envs_boot_concurrently(client):
+    start = time.monotonic()
+    envs = list(launch_fleet(8, "lib", "mods", env_class=FakeEnv, docker_client=client))
+
+    assert time.monotonic() - start < 8 * FakeEnv.boot_time / 2
+    assert len(envs) == 8
+    assert all(env.booted and env.client is client for env in envs)
+
+    for env in envs:
+        env.close()
+
+
+def test_failed_boot_closes_remaining_envs(client):
+    class FailingEnv(FakeEnv):
+        fail = True
+
+    with pytest.raises(RuntimeError, match="Boot failed"):
+        list(launch_fleet(2, "lib", "mods", env_class=FailingEnv, docker_client=client))
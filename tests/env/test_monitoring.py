@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from gym_sts.envs.monitoring import MemoryMonitor, MemorySample, parse_size, process_rss
+
+
+@pytest.mark.parametrize(
+    "size, expected", [(1024, 1024), ("512", 512), ("2k", 2048), ("3G", 3 << 30)]
+)
+def test_parse_size(size, expected):
+    assert parse_size(size) == expected
+
+
+def test_process_rss():
+    rss = process_rss(os.getpid())
+    assert rss is not None and rss > 0
+
+
+def test_memory_monitor():
+    monitor = MemoryMonitor(limit="1g", growth_limit="100m")
+
+    assert not monitor.exceeded(MemorySample(rss=500 << 20, heap_used=None))
+    assert not monitor.exceeded(MemorySample(rss=None, heap_used=None))
+    assert monitor.exceeded(MemorySample(rss=700 << 20, heap_used=None))
+
+    monitor.reset()
+    assert not monitor.exceeded(MemorySample(rss=900 << 20, heap_used=None))
+    assert monitor.exceeded(MemorySample(rss=1100 << 20, heap_used=None))
@@ -0,0 +1,78 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from gym_sts.envs.base import SlayTheSpireGymEnv
+
+
+class FakeEnv(SlayTheSpireGymEnv):
+    def start(self):
+        self.communicator = SimpleNamespace()
+        self.runs = []
+
+    def stop(self):
+        self._finish_prefetch()
+
+    def _end_game(self):
+        pass
+
+    def _start_run(self, sts_seed):
+        self.runs.append((sts_seed, threading.current_thread().name))
+        return SimpleNamespace(state={}, serialize=lambda config: {})
+
+
+@pytest.fixture
+def env():
+    env = FakeEnv("lib", "mods", prefetch_runs=True)
+    yield env
+    env.close()
+
+
+def test_prefetched_run_is_used(env):
+    _, info = env.reset(seed=1)
+    env.prefetch()
+    _, prefetched_info = env.reset()
+
+    assert len(env.runs) == 2
+    seed, thread = env.runs[1]
+    assert thread.startswith("sts-prefetch")
+    assert prefetched_info["sts_seed"] == seed
+
+    # Prefetching doesn't change which seeds are played
+    other = FakeEnv("lib", "mods")
+    try:
+        other.reset(seed=1)
+        _, other_info = other.reset()
+        assert other_info["sts_seed"] == seed
+        assert other_info["rng_state"] == prefetched_info["rng_state"]
+    finally:
+        other.close()
+
+
+def test_fixed_seed_is_prefetched(env):
+    env.reset(options={"sts_seed": "ABC"})
+    env.prefetch()
+    env.reset(options={"sts_seed": "ABC"})
+    assert [seed for seed, _ in env.runs] == ["ABC", "ABC"]
+
+    # A different seed discards the prefetched run
+    env.prefetch()
+    env.reset(options={"sts_seed": "DEF"})
+    assert [seed for seed, _ in env.runs] == ["ABC", "ABC", "ABC", "DEF"]
+
+
+def test_observe_before_reset_returns_final_observation(env):
+    env.reset(seed=1)
+    final = SimpleNamespace(state={"game_over": True})
+    env.observation_cache.append(final)
+    env.prefetch()
+
+    # E.g. metrics callbacks reading the finished episode
+    assert env.observe() is final
+    assert env.observe() is final
+
+    _, info = env.reset()
+    assert len(env.runs) == 2
+    assert info["observation"] is not final
+    assert info["sts_seed"] == env.runs[1][0]
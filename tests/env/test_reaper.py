@@ -0,0 +1,55 @@
+import threading
+import time
+
+from gym_sts.envs.reaper import Reaper
+
+
+class FakeContainer:
+    def __init__(self, name: str, stop_time: float = 0.2):
+        self.name = name
+        self.stop_time = stop_time
+        self.stopped = threading.Event()
+        self.killed = False
+
+    def stop(self):
+        time.sleep(self.stop_time)
+        self.stopped.set()
+
+    def kill(self):
+        self.killed = True
+        self.stopped.set()
+
+    def wait(self):
+        self.stopped.wait()
+
+
+def test_reap_does_not_block():
+    reaper = Reaper(max_pending=2)
+    container = FakeContainer("a")
+
+    start = time.monotonic()
+    reaper.reap(container)
+    assert time.monotonic() - start < 0.1
+    assert not container.stopped.is_set()
+
+    reaper.wait()
+    assert container.stopped.is_set()
+
+
+def test_reap_blocks_when_too_many_are_pending():
+    reaper = Reaper(max_pending=1)
+    first, second = FakeContainer("a"), FakeContainer("b")
+
+    reaper.reap(first)
+    reaper.reap(second)
+    assert first.stopped.is_set()
+
+    reaper.wait()
+
+
+def test_fast_kill_and_synchronous_reaping():
+    reaper = Reaper(max_pending=0, fast_kill=True)
+    container = FakeContainer("a")
+
+    reaper.reap(container)
+    assert container.killed
@@ -0,0 +1,100 @@
+import os
+import threading
+
+import pytest
+
+from gym_sts.envs import resources
+from gym_sts.envs.resources import CoreAllocator, parse_cpu_list
+
+
+@pytest.fixture
+def smt_topology(tmp_path, monkeypatch):
+    # 4 cores with 2 threads each, numbered like Linux does: cpu N and N + 4 are
+    # siblings
+    for cpu in range(8):
+        topology = tmp_path / f"cpu{cpu}" / "topology"
+        topology.mkdir(parents=True)
+        core = cpu % 4
+        (topology / "thread_siblings_list").write_text(f"{core},{core + 4}\n")
+
+    monkeypatch.setattr(resources, "SYSFS_CPU_DIR", tmp_path)
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+
+
+def test_allocations_are_disjoint_cores(smt_topology):
+    allocator = CoreAllocator(cpus=range(8))
+    allocations = allocator.allocate_all(cpus=1.5, mem_limit="2g")
+
+    assert len(allocations) == 4
+    assert allocations[0].game_cpus == [0]
+    assert allocations[0].worker_cpus == [4]
+    assert allocations[0].container_kwargs() == {
+        "cpuset_cpus": "0",
+        "nano_cpus": 1_500_000_000,
+        "mem_limit": "2g",
+    }
+
+    with pytest.raises(RuntimeError):
+        allocator.allocate()
+
+    allocator.release(allocations[2])
+    assert allocator.allocate().game_cpus == [2]
+
+
+def test_allocation_without_smt(tmp_path, monkeypatch):
+    monkeypatch.setattr(resources, "SYSFS_CPU_DIR", tmp_path / "missing")
+
+    allocator = CoreAllocator(cores_per_game=2, cpus=range(5))
+    allocation = allocator.allocate()
+
+    assert allocation.game_cpus == allocation.worker_cpus == [0, 1]
+    assert allocator.capacity == 1
+
+
+def test_workers_get_disjoint_cores(smt_topology):
+    # Computed separately, like in separate worker processes
+    first = resources.allocate_worker(0, num_games=2, cpus=range(8))
+    second = resources.allocate_worker(1, num_games=2, cpus=range(8))
+
+    def cpus(allocations):
+        return {cpu for a in allocations for cpu in a.game_cpus + a.worker_cpus}
+
+    assert cpus(first) == {0, 1, 4, 5}
+    assert cpus(second) == {2, 3, 6, 7}
+    assert [a.game_cpus for a in first] == [[0], [1]]
+
+    # The same allocations a single CoreAllocator hands out
+    assert first + second == CoreAllocator(cpus=range(8)).allocate_all()
+
+    with pytest.raises(RuntimeError):
+        resources.allocate_worker(2, num_games=2, cpus=range(8))
+
+
+def test_pin_worker_pins_every_thread():
+    original = sorted(os.sched_getaffinity(0))
+    if len(original) < 2:
+        pytest.skip("Needs at least 2 CPUs")
+
+    started = threading.Event()
+    done = threading.Event()
+
+    def wait():
+        started.set()
+        done.wait()
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    started.wait()
+
+    allocation = resources.ResourceAllocation(worker_cpus=original[:1])
+    try:
+        allocation.pin_worker()
+        assert os.sched_getaffinity(0) == {original[0]}
+        assert os.sched_getaffinity(thread.native_id) == {original[0]}
+    finally:
+        done.set()
+        thread.join()
+        resources.ResourceAllocation(worker_cpus=original).pin_worker()
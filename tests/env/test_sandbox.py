@@ -0,0 +1,28 @@
+import os
+import pathlib
+
+from gym_sts.envs.sandbox import link_sandbox
+
+
+def test_link_sandbox(tmp_path):
+    lib = tmp_path / "lib"
+    mods = tmp_path / "mods"
+    lib.mkdir()
+    mods.mkdir()
+    (lib / "desktop-1.0.jar").write_text("game")
+    (mods / "BaseMod.jar").write_text("mod")
+
+    sandbox = tmp_path / "sandbox"
+    sources = {lib: pathlib.Path("."), mods: pathlib.Path("mods")}
+
+    assert link_sandbox(sandbox, sources)
+    assert (sandbox / "desktop-1.0.jar").read_text() == "game"
+    assert os.path.samefile(sandbox / "mods" / "BaseMod.jar", mods / "BaseMod.jar")
+
+    # Nothing changed, so nothing is relinked
+    assert not link_sandbox(sandbox, sources)
+
+    (mods / "BaseMod.jar").write_text("updated mod")
+    os.utime(mods / "BaseMod.jar", ns=(0, 0))
+    assert link_sandbox(sandbox, sources)
+    assert (sandbox / "mods" / "BaseMod.jar").read_text() == "updated mod"
@@ -0,0 +1,15 @@
+from gym_sts import constants
+from gym_sts.envs.types import SuperFastModeConfig
+
+
+def test_default_config_matches_image():
+    baked = constants.PROJECT_ROOT / "build" / "superfastmode.config.properties"
+    assert SuperFastModeConfig().to_properties() == baked.read_text()
+
+
+def test_config_properties():
+    config = SuperFastModeConfig(delta_multiplier=250, instant_lerp=False)
+    properties = config.to_properties()
+
+    assert "deltaMultiplier=250.0\n" in properties
+    assert "isInstantLerp=false\n" in properties
@@ -0,0 +1,95 @@
+from gym_sts.envs.transpositions import TranspositionCache
+
+
+def test_lookup():
+    cache = TranspositionCache()
+    root = cache.root("SEED", 0, {"floor": 0})
+    assert cache.root("SEED", 0, {"floor": 0}) == root
+    assert cache.root("SEED", 1, {"floor": 0}) != root
+    # E.g. SingleCombatSTSEnv's fights
+    assert cache.root("SEED", 0, {"floor": 0}, setup="fight Cultist") != root
+
+    assert cache.lookup(root, 3) is None
+    child = cache.insert(root, 3, {"floor": 1})
+    rejected = cache.insert(child, 5, None, had_error=True)
+
+    node = cache.lookup(root, 3)
+    assert node is not None and node.id == child
+    assert cache.state(node) == {"floor": 1}
+
+    # Rejected actions leave the state unchanged
+    node = cache.lookup(child, 5)
+    assert node is not None and node.id == rejected
+    assert cache.state(node) == {"floor": 1}
+
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_eviction():
+    cache = TranspositionCache(max_nodes=4)
+    old_root = cache.root("OLD", 0, {})
+    old_child = cache.insert(old_root, 0, {})
+    new_root = cache.root("NEW", 0, {})
+    new_child = cache.insert(new_root, 0, {})
+
+    # Evicts the least recently used leaf, then its parent, which becomes a leaf
+    cache.insert(new_child, 0, {})
+    assert len(cache) == 4
+    assert old_child not in cache and old_root in cache
+    cache.insert(new_child, 1, {})
+    assert old_root not in cache
+    assert ("OLD", 0, "") not in cache.roots
+    assert cache.lookup(new_root, 0) is not None
+
+
+def test_eviction_along_one_trajectory():
+    cache = TranspositionCache(max_nodes=5)
+    node = cache.root("SEED", 0, {"floor": 0})
+    rejected = cache.insert(node, 9, None, had_error=True)
+
+    for floor in range(1, 20):
+        node = cache.insert(node, 0, {"floor": floor})
+        # The trajectory keeps going, with its most recent nodes cached
+        assert node is not None and node in cache
+        assert len(cache) == min(floor + 2, 5)
+
+    found = cache.lookup(node - 1, 0)
+    assert found is not None and cache.state(found) == {"floor": 19}
+    assert rejected not in cache
+
+
+def test_rejected_action_outlives_parent():
+    cache = TranspositionCache(max_nodes=2)
+    root = cache.root("SEED", 0, {"floor": 0})
+    rejected = cache.insert(root, 1, None, had_error=True)
+    assert rejected is not None
+    cache.insert(rejected, 2, {"floor": 1})
+
+    node = cache.get(rejected)
+    assert root not in cache and node is not None
+    assert cache.state(node) == {"floor": 0}
+
+
+def test_save_and_load(tmp_path):
+    cache = TranspositionCache()
+    root = cache.root("SEED", 0, {"floor": 0})
+    first = cache.insert(root, 1, {"floor": 1})
+    second = cache.insert(first, 2, None, had_error=True)
+    cache.insert(root, 4, {"floor": 2})
+
+    # Make the root more recently used than its children
+    cache.root("SEED", 0, {"floor": 0})
+
+    path = tmp_path / "cache.jsonl.gz"
+    cache.save(path)
+    loaded = TranspositionCache.load(path)
+
+    assert len(loaded) == 4
+    assert loaded.roots == {("SEED", 0, ""): root}
+    node = loaded.lookup(root, 1)
+    assert node is not None and loaded.state(node) == {"floor": 1}
+    node = loaded.lookup(first, 2)
+    assert node is not None and node.id == second and node.had_error
+
+    # New nodes don't reuse ids
+    assert loaded.insert(root, 5, {}) not in [root, first, second]
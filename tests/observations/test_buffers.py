@@ -0,0 +1,55 @@
+import random
+
+import gymnasium as gym
+import numpy as np
+import pytest
+
+from gym_sts.observation_report import synthetic_state
+from gym_sts.spaces.observations import (
+    Observation,
+    ObservationBuffers,
+    ObservationConfig,
+    copy_observation,
+)
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        ObservationConfig(),
+        ObservationConfig(card_encoding="sparse", effect_encoding="sparse"),
+        ObservationConfig(components=["combat_state", "persistent_state"]),
+    ],
+)
+def test_serialize_into_matches_serialize(config):
+    buffers = ObservationBuffers(config)
+    rng = random.Random(0)
+
+    # Every state is written over the last, so stale values would show up
+    for _ in range(20):
+        state = synthetic_state(rng)
+        expected = Observation(state).serialize(config)
+        views = Observation(state).serialize_into(buffers)
+
+        assert buffers.space.contains(views)
+        assert np.array_equal(
+            gym.spaces.flatten(buffers.space, views),
+            gym.spaces.flatten(buffers.space, expected),
+        )
+
+
+def test_views_are_reused():
+    buffers = ObservationBuffers()
+    rng = random.Random(0)
+    first = Observation(synthetic_state(rng))
+
+    views = first.serialize_into(buffers)
+    kept = first.serialize_into(buffers, copy=True)
+    assert Observation(synthetic_state(rng)).serialize_into(buffers) is views
+
+    flat = gym.spaces.flatten(buffers.space, kept)
+    assert not np.array_equal(flat, gym.spaces.flatten(buffers.space, views))
+    assert np.array_equal(flat, gym.spaces.flatten(buffers.space, first.serialize()))
+    assert np.array_equal(
+        gym.spaces.flatten(buffers.space, copy_observation(kept)), flat
+    )
@@ -0,0 +1,53 @@
+import random
+
+import gymnasium as gym
+import numpy as np
+import pydantic
+import pytest
+
+from gym_sts.observation_report import synthetic_state
+from gym_sts.spaces.observations import (
+    SINGLE_COMBAT_OBSERVATION_CONFIG,
+    Observation,
+    ObservationConfig,
+    make_observation_space,
+)
+
+
+def test_excluded_components_are_skipped():
+    config = SINGLE_COMBAT_OBSERVATION_CONFIG
+    space = make_observation_space(config)
+    assert set(space.spaces) == {
+        "persistent_state",
+        "combat_state",
+        "valid_action_mask",
+    }
+
+    obs = Observation(synthetic_state(random.Random(0)))
+    ser = obs.serialize(config)
+    assert space.contains(ser)
+    # Components are parsed lazily, so excluded ones are never parsed
+    assert "shop_state" not in vars(obs)
+    assert "event_state" not in vars(obs)
+
+    # The full encoding is cached separately
+    assert set(obs.serialize()) == set(make_observation_space().spaces)
+
+
+def test_unknown_component():
+    with pytest.raises(pydantic.ValidationError):
+        ObservationConfig(components=["combat_state", "map"])
+
+
+def test_deserialize_without_every_component():
+    state = synthetic_state(random.Random(0))
+    ser = Observation(state).serialize(SINGLE_COMBAT_OBSERVATION_CONFIG)
+
+    obs = Observation.deserialize(ser)
+    space = make_observation_space()["combat_state"]
+    assert np.array_equal(
+        gym.spaces.flatten(space, obs.combat_state.serialize()),
+        gym.spaces.flatten(space, ser["combat_state"]),
+    )
+    # Missing components are empty
+    assert obs.shop_state == Observation({}).shop_state
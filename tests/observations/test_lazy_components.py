@@ -0,0 +1,28 @@
+from gym_sts.spaces.observations import Observation
+
+
+MAIN_MENU_STATE = {
+    "available_commands": ["start", "state"],
+    "ready_for_command": True,
+    "in_game": False,
+}
+
+
+def test_components_are_built_on_first_access():
+    obs = Observation(MAIN_MENU_STATE)
+
+    assert obs.stable
+    assert "persistent_state" not in vars(obs)
+    assert "combat_state" not in vars(obs)
+
+    assert obs.combat_state.enemies == []
+    assert "combat_state" in vars(obs)
+    assert "persistent_state" not in vars(obs)
+
+
+def test_serialization_is_reused():
+    obs = Observation(MAIN_MENU_STATE)
+
+    ser = obs.serialize()
+    assert obs.serialize() is ser
+    assert not ser["valid_action_mask"].any()
@@ -0,0 +1,39 @@
+import numpy as np
+
+from gym_sts.spaces.constants import combat as combat_consts
+from gym_sts.spaces.observations import (
+    ObservationConfig,
+    components,
+    make_observation_space,
+    types,
+)
+
+
+SPARSE = ObservationConfig(effect_encoding="sparse", max_effects=4)
+
+
+def test_sparse_effects_roundtrip():
+    effects = [
+        types.Effect(id="Thorns", amount=3),
+        types.Effect(id="Conserve", amount=-2),
+    ]
+
+    ser = types.Effect.serialize_all(effects, SPARSE)
+    empty = combat_consts.NUM_EFFECTS
+    thorns = combat_consts.ALL_EFFECTS.index("Thorns")
+    assert list(ser["ids"]) == [0, thorns, empty, empty]
+    assert list(ser["amounts"]) == [-2, 3, 0, 0]
+
+    assert types.Effect.deserialize_all(ser) == sorted(
+        effects, key=lambda e: combat_consts.ALL_EFFECTS.index(e.id)
+    )
+
+
+def test_sparse_effects_space():
+    state = components.CombatObs({})
+    state.effects = [types.Effect(id="Thorns", amount=3)]
+
+    ser = state.serialize(SPARSE)
+    assert make_observation_space(SPARSE)["combat_state"].contains(ser)
+    assert np.all(ser["enemies"][0]["effects"]["amounts"] == 0)
+    assert components.CombatObs.deserialize(ser).effects == state.effects
@@ -0,0 +1,43 @@
+import numpy as np
+
+from gym_sts.spaces.observations import (
+    Observation,
+    ObservationConfig,
+    components,
+    make_observation_space,
+    serializers,
+    types,
+)
+
+
+SPARSE = ObservationConfig(card_encoding="sparse")
+
+MAIN_MENU_STATE = {
+    "available_commands": ["start", "state"],
+    "ready_for_command": True,
+    "in_game": False,
+}
+
+
+def test_sparse_pile_roundtrip():
+    cards = [types.Card.deserialize(i) for i in [10, 10, 21]]
+    state = components.PersistentStateObs(deck=cards)
+
+    ser = state.serialize(SPARSE)
+    assert list(ser["deck"]["cards"][:3]) == [10, 21, 0]
+    assert list(ser["deck"]["counts"][:3]) == [2, 1, 0]
+    assert make_observation_space(SPARSE)["persistent_state"].contains(ser)
+
+    dense = serializers.densify_pile(ser["deck"])
+    assert np.array_equal(dense, state.serialize()["deck"])
+    assert components.PersistentStateObs.deserialize(ser).deck == state.deck
+
+
+def test_sparse_observation():
+    obs = Observation(MAIN_MENU_STATE)
+
+    dense = obs.serialize()
+    sparse = obs.serialize(SPARSE)
+    assert sparse is not dense
+    assert obs.serialize(SPARSE) is sparse
+    assert make_observation_space(SPARSE).contains(sparse)
@@ -0,0 +1,44 @@
+from gym_sts.spaces import actions
+
+
+def test_action_factors_are_unique():
+    factors = set(
+        zip(
+            actions.ACTION_TYPE_INDEX,
+            actions.ACTION_SLOT_INDEX,
+            actions.ACTION_TARGET_INDEX,
+        )
+    )
+    assert len(factors) == len(actions.ACTIONS)
+
+    assert actions.ACTION_TYPE_INDEX.max() < actions.NUM_ACTION_TYPES
+    assert actions.ACTION_SLOT_INDEX.max() < actions.NUM_SLOTS
+    assert actions.ACTION_TARGET_INDEX.max() < actions.NUM_TARGETS
+
+
+def test_slots_are_not_shared_between_types():
+    # Each slot index belongs to a single (type, slot within the type) pair
+    slots: dict[int, tuple[int, int]] = {}
+    for action in actions.ACTIONS:
+        action_type, slot, _ = actions.action_factors(action)
+        pair = (action_type, slot - actions.SLOT_OFFSETS[action_type])
+        assert slots.setdefault(slot, pair) == pair
+
+    choose = actions.action_factors(actions.Choose(choice_index=0))
+    use_potion = actions.action_factors(actions.UsePotion(potion_index=0))
+    discard_potion = actions.action_factors(actions.DiscardPotion(potion_index=0))
+    play = actions.action_factors(actions.PlayCard(card_position=1))
+    assert len({choose[1], use_potion[1], discard_potion[1], play[1]}) == 4
+
+
+def test_action_factors():
+    play = actions.PlayCard(card_position=1, target_index=2)
+    play_type = actions.ACTION_TYPES.index(actions.PlayCard)
+    assert actions.action_factors(play) == (
+        play_type,
+        actions.SLOT_OFFSETS[play_type],
+        2,
+    )
+
+    end = actions.EndTurn()
+    assert actions.action_factors(end) == (0, 0, actions.NO_TARGET)
@@ -0,0 +1,31 @@
+import json
+import random
+
+from gym_sts import observation_report
+from gym_sts.spaces.observations import ObservationConfig, make_observation_space
+
+
+def test_report_covers_every_component():
+    rng = random.Random(0)
+    states = [observation_report.synthetic_state(rng) for _ in range(3)]
+    config = ObservationConfig(card_encoding="sparse")
+    reports = {r.name: r for r in observation_report.report(states, config)}
+
+    space = make_observation_space(config)
+    for name in space.spaces:
+        assert name in reports
+
+    combat = reports["combat_state"]
+    assert combat.encode_time is not None and combat.decode_time is not None
+    assert combat.total_bytes > 0
+    # Fields add up to their component
+    fields = [r for name, r in reports.items() if name.startswith("combat_state.")]
+    assert sum(r.flatdim for r in fields) == combat.flatdim
+    assert sum(r.total_bytes for r in fields) == combat.total_bytes
+
+
+def test_load_states(tmp_path):
+    state = observation_report.synthetic_state(random.Random(0))
+    path = tmp_path / "states.json"
+    path.write_text(json.dumps([{"action": None, "reward": 0, "state_after": state}]))
+    assert observation_report.load_states([str(path)]) == [state]
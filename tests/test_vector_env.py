@@ -0,0 +1,138 @@
+import threading
+
+import gymnasium as gym
+import pytest
+
+
+pytest.importorskip("ray")
+
+from ray.rllib.env.base_env import _DUMMY_AGENT_ID, ASYNC_RESET_RETURN  # noqa: E402
+
+from gym_sts.rl.vector_env import ThreadedVectorEnv  # noqa: E402
+
+
+class FakeEnv(gym.Env):
+    observation_space = gym.spaces.Discrete(10)
+    action_space = gym.spaces.Discrete(2)
+
+    def __init__(self, index, episode_length=2, fail=False, barrier=None):
+        self.index = index
+        self.episode_length = episode_length
+        self.fail = fail
+        self.barrier = barrier
+        self.steps = 0
+        self.resets = 0
+        self.closed = False
+
+    def reset(self, *, seed=None, options=None):
+        if self.barrier is not None:
+            # Only passes if every env resets at the same time
+            self.barrier.wait(timeout=10)
+        self.steps = 0
+        self.resets += 1
+        return 0, {"index": self.index}
+
+    def step(self, action):
+        if self.fail:
+            raise RuntimeError("game crashed")
+        self.steps += 1
+        terminated = self.steps >= self.episode_length
+        return self.steps, float(action), terminated, False, {"index": self.index}
+
+    def close(self):
+        self.closed = True
+
+
+def poll_all(vector_env, num_envs):
+    """
+    Poll until every env has responded once.
+    """
+
+    results = {}
+    for _ in range(100):
+        obs, rewards, terminateds, truncateds, infos, _ = vector_env.poll()
+        for env_id in obs:
+            assert env_id not in results
+            results[env_id] = (
+                obs[env_id],
+                rewards[env_id],
+                terminateds[env_id],
+                infos[env_id],
+            )
+        if len(results) == num_envs:
+            return results
+    raise AssertionError(f"Only {len(results)} of {num_envs} envs responded")
+
+
+@pytest.fixture
+def make_vector_env():
+    vector_envs = []
+
+    def make(num_envs=3, **kwargs):
+        vector_env = ThreadedVectorEnv(lambda i: FakeEnv(i, **kwargs), num_envs)
+        vector_envs.append(vector_env)
+        return vector_env
+
+    yield make
+    for vector_env in vector_envs:
+        vector_env.stop()
+
+
+def test_concurrent_reset_and_step(make_vector_env):
+    vector_env = make_vector_env(barrier=threading.Barrier(3))
+
+    results = poll_all(vector_env, 3)
+    for env_id, (obs, rewards, terminateds, infos) in results.items():
+        assert obs == {_DUMMY_AGENT_ID: 0}
+        assert infos[_DUMMY_AGENT_ID]["index"] == env_id
+        assert not terminateds["__all__"]
+
+    vector_env.send_actions({i: {_DUMMY_AGENT_ID: 1} for i in range(3)})
+    # One operation in flight per env
+    assert len(vector_env._pending) == 3
+
+    results = poll_all(vector_env, 3)
+    for obs, rewards, terminateds, _ in results.values():
+        assert obs == {_DUMMY_AGENT_ID: 1}
+        assert rewards == {_DUMMY_AGENT_ID: 1.0}
+        assert not terminateds["__all__"]
+    assert not vector_env._pending
+
+
+def test_done_then_reset(make_vector_env):
+    vector_env = make_vector_env(num_envs=2, episode_length=1)
+    poll_all(vector_env, 2)
+
+    vector_env.send_actions({0: {_DUMMY_AGENT_ID: 0}})
+    results = poll_all(vector_env, 1)
+    assert results[0][2] == {_DUMMY_AGENT_ID: True, "__all__": True}
+
+    assert vector_env.try_reset(0) == (ASYNC_RESET_RETURN, ASYNC_RESET_RETURN)
+    results = poll_all(vector_env, 1)
+    assert results[0][0] == {_DUMMY_AGENT_ID: 0}
+    assert vector_env.get_sub_environments()[0].resets == 2
+    assert vector_env.get_sub_environments()[1].resets == 1
+
+
+def test_failing_sub_env(make_vector_env):
+    vector_env = make_vector_env(num_envs=2)
+    poll_all(vector_env, 2)
+
+    failing = vector_env.get_sub_environments()[1]
+    failing.fail = True
+    vector_env.send_actions({i: {_DUMMY_AGENT_ID: 0} for i in range(2)})
+
+    results = poll_all(vector_env, 2)
+    obs, rewards, terminateds, _ = results[1]
+    assert isinstance(obs, RuntimeError)
+    assert terminateds == {"__all__": True}
+    # The other env is unaffected
+    assert results[0][0] == {_DUMMY_AGENT_ID: 1}
+
+    vector_env.try_restart(1)
+    assert failing.closed
+    assert vector_env.get_sub_environments()[1] is not failing
+
+    vector_env.try_reset(1)
+    results = poll_all(vector_env, 1)
+    assert results[1][0] == {_DUMMY_AGENT_ID: 0}